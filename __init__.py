@@ -1,11 +1,18 @@
 """My Agent package."""
 
-try:
-    from . import my_agent_app
-    from .my_agent_app import root_agent
-except ImportError:
-    # Fallback for when module is not run as a package
-    import my_agent_app  # type: ignore
-    from my_agent_app import root_agent  # type: ignore
+import importlib
 
 __all__ = ["my_agent_app", "root_agent"]
+
+
+def __getattr__(name: str):
+    # Resolved lazily so importing this package stays cheap (see
+    # my_agent_app/__init__.py).
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        my_agent_app = importlib.import_module(".my_agent_app", __name__)
+    except ImportError:
+        # Fallback for when module is not run as a package
+        my_agent_app = importlib.import_module("my_agent_app")
+    return my_agent_app if name == "my_agent_app" else my_agent_app.root_agent
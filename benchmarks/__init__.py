@@ -0,0 +1,5 @@
+"""Latency and throughput benchmarks for the agent's tools.
+
+The tools are called directly, without the LLM, against synthetic datasets
+built in a temporary directory. See ``benchmarks/run.py`` for usage.
+"""
@@ -0,0 +1,175 @@
+"""Synthetic datasets for the tool benchmarks.
+
+``write_scaled_catalog`` multiplies ``megaGymDataset.csv`` so catalog-bound
+tools can be measured at 10x and 100x the shipped size with the same mix of
+types, body parts and levels. ``populate_databases`` fills scratch profile
+and session databases with realistic rows (real plan JSON, several sessions
+per member, refinement history on some sessions) through the same
+migrations the agent uses, storing payloads as content-addressed blobs.
+"""
+
+import csv
+import random
+from datetime import datetime, timedelta
+
+from my_agent_app import agent
+from my_agent_app.blobs import session_payload_values
+from my_agent_app.serialization import WRITE_FORMAT, dumps
+from my_agent_app.db import get_connection
+
+SESSIONS_PER_USER = 10
+REFINED_SESSION_EVERY = 5
+REFINEMENTS_PER_SESSION = 3
+INSERT_CHUNK_SIZE = 5000
+
+
+def member_name(i: int) -> str:
+    """Return the synthetic name of member ``i``."""
+    return f"Member {i}"
+
+
+def write_scaled_catalog(source_path: str, target_path: str, scale: int) -> int:
+    """Write a copy of the exercise CSV with every row repeated ``scale`` times.
+
+    Copies after the first get a " (variant N)" title suffix and a fresh
+    leading index so the result still parses as the original dataset does.
+
+    Returns:
+        The number of exercise rows written.
+    """
+    with open(source_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    title = header.index("Title")
+    written = 0
+    with open(target_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for copy in range(scale):
+            for row in rows:
+                row = list(row)
+                row[0] = str(written)
+                if copy and row[title]:
+                    row[title] = f"{row[title]} (variant {copy})"
+                writer.writerow(row)
+                written += 1
+    return written
+
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _executemany(path: str, sql: str, rows) -> None:
+    conn = get_connection(path)
+    for chunk in _chunks(rows, INSERT_CHUNK_SIZE):
+        with conn:
+            conn.executemany(sql, chunk)
+
+
+def populate_databases(session_rows: int, seed: int = 7) -> dict:
+    """Fill the agent's (scratch) databases with ``session_rows`` sessions.
+
+    Writes to ``agent.DB_PATH`` and ``agent.SESSIONS_PATH``; point those at a
+    temporary directory first. Every member gets ``SESSIONS_PER_USER``
+    sessions with increasing ``last_updated`` times, and every
+    ``REFINED_SESSION_EVERY``-th session gets ``REFINEMENTS_PER_SESSION``
+    refinements.
+
+    Returns:
+        ``user_names`` and ``session_ids`` samples for the benchmark inputs,
+        plus the row counts written.
+    """
+    rng = random.Random(seed)
+    agent.init_database()
+    agent.init_sessions_database()
+    users = max(1, session_rows // SESSIONS_PER_USER)
+    goals = list(agent.GOAL_EXERCISE_TYPES)
+
+    profiles = []
+    for i in range(users):
+        profiles.append({
+            "profile_id": i + 1,
+            "name": member_name(i),
+            "age": rng.randint(16, 75),
+            "height": "5'10\"",
+            "weight": rng.randint(110, 280),
+            "exercise_goal": goals[i % len(goals)],
+            "injury": "None",
+        })
+    _executemany(
+        agent.DB_PATH,
+        """
+        INSERT INTO user_profiles (id, name, age, height, weight, exercise_goal, injury)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            (p["profile_id"], p["name"], p["age"], p["height"], p["weight"],
+             p["exercise_goal"], p["injury"])
+            for p in profiles
+        ),
+    )
+
+    plans = [agent.generate_weekly_workout_plan_from_profile(profile) for profile in profiles]
+    sessions_conn = get_connection(agent.SESSIONS_PATH)
+    started = datetime(2024, 1, 1)
+
+    def session_rows_iter():
+        # Payload blobs are written on the same connection, so each chunk
+        # commits its blobs together with the sessions that reference them.
+        for i in range(session_rows):
+            stamp = (started + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S")
+            profile = profiles[i % users]
+            yield (
+                i + 1,
+                profile["profile_id"],
+                profile["name"],
+                *session_payload_values(sessions_conn, profile, plans[i % users], WRITE_FORMAT),
+                WRITE_FORMAT,
+                stamp,
+                stamp,
+                REFINEMENTS_PER_SESSION if i % REFINED_SESSION_EVERY == 0 else 0,
+            )
+
+    _executemany(
+        agent.SESSIONS_PATH,
+        """
+        INSERT INTO sessions (session_id, user_id, user_name, profile_data, workout_plan,
+                              profile_hash, plan_hash, payload_format, created_at,
+                              last_updated, refinement_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        session_rows_iter(),
+    )
+
+    refined = range(1, session_rows + 1, REFINED_SESSION_EVERY)
+    _executemany(
+        agent.SESSIONS_PATH,
+        """
+        INSERT INTO session_refinements
+            (session_id, created_at, refinement_type, details, details_format)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (
+            (session_id, "2024-06-01T00:00:00", "difficulty_increase",
+             dumps({"note": f"refinement {n}"}, WRITE_FORMAT), WRITE_FORMAT)
+            for session_id in refined
+            for n in range(REFINEMENTS_PER_SESSION)
+        ),
+    )
+
+    return {
+        "users": users,
+        "sessions": session_rows,
+        "refinements": len(refined) * REFINEMENTS_PER_SESSION,
+        "user_names": [member_name(i) for i in range(users)],
+        "session_ids": list(refined),
+    }
@@ -0,0 +1,139 @@
+"""Per-worker memory and throughput of lazily loading vs. pre-forked workers.
+
+For 1, 4 and 16 workers, forks the workers and has each run the same mix of
+catalog tools (weekly plans with and without constraints, exercise lookups
+by goal, exercise details) on a scratch copy of the dataset:
+
+- ``lazy``: nothing is loaded before forking, so every worker parses the CSV
+  and builds its own catalog and plan templates, as separately started
+  processes do;
+- ``prefork``: ``prefork.preload`` compiles and maps the catalog, warms the
+  derived data and freezes the heap before forking.
+
+Each worker reports its time to first response, its throughput and its
+memory (RSS, PSS and USS from ``/proc/self/smaps_rollup``). The aggregate
+throughput is calls divided by the wall time from the first fork to the
+last exit (the preload is not included), so it only scales with workers on
+a machine with spare cores.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.prefork
+    python -m benchmarks.prefork --workers 1 4 16 --calls 3000
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from my_agent_app import agent, prefork
+
+DEFAULT_WORKERS = (1, 4, 16)
+DEFAULT_CALLS = 2000
+INJURIES = ("None", "bad knee", "lower back pain", "shoulder strain")
+EQUIPMENT = ("", "dumbbells and bands", "body only")
+
+
+def _call(i: int):
+    goals = list(agent.GOAL_EXERCISE_TYPES)
+    goal = goals[i % len(goals)]
+    kind = i % 4
+    if kind == 3:
+        return agent.get_exercises_by_goal_and_body_part(goal, agent.plan_body_parts(goal))
+    if kind == 2:
+        return agent.get_exercise_details([(i * 37 + j * 101) % 2900 for j in range(5)])
+    profile = {
+        "profile_id": i,
+        "name": f"Member {i}",
+        "age": 25 + i % 50,
+        "weight": 170,
+        "exercise_goal": goal,
+        "injury": INJURIES[i % len(INJURIES)],
+    }
+    return agent.generate_weekly_workout_plan_from_profile(profile, EQUIPMENT[i % len(EQUIPMENT)])
+
+
+def _worker(index: int, calls: int, report_fd: int) -> None:
+    started = time.perf_counter()
+    _call(index)
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(calls):
+        _call(index + i)
+    elapsed = time.perf_counter() - started
+    result = {"first_ms": first * 1000, "calls_per_s": calls / elapsed, **prefork.memory_usage()}
+    os.write(report_fd, (json.dumps(result) + "\n").encode("ascii"))
+
+
+def run_mode(mode: str, workers: int, calls: int) -> dict:
+    """Fork ``workers`` workers in ``mode`` and aggregate their reports."""
+    if mode == "prefork":
+        prefork.preload()
+    read_fd, write_fd = os.pipe()
+    started = time.perf_counter()
+    codes = prefork.serve(lambda index: _worker(index, calls, write_fd), workers, warm=False)
+    wall = time.perf_counter() - started
+    os.close(write_fd)
+    with os.fdopen(read_fd, "r", encoding="ascii") as f:
+        reports = [json.loads(line) for line in f]
+    if any(codes) or len(reports) != workers:
+        raise RuntimeError(f"{mode} workers failed with exit codes {codes}")
+    return {
+        "mode": mode,
+        "workers": workers,
+        "first_ms": statistics.mean(r["first_ms"] for r in reports),
+        "rss_kib": statistics.mean(r["rss"] for r in reports),
+        "pss_kib": statistics.mean(r["pss"] for r in reports),
+        "uss_kib": statistics.mean(r["uss"] for r in reports),
+        "total_pss_kib": sum(r["pss"] for r in reports),
+        "worker_calls_per_s": statistics.mean(r["calls_per_s"] for r in reports),
+        "calls_per_s": workers * (calls + 1) / wall,
+    }
+
+
+def run(worker_counts=DEFAULT_WORKERS, calls: int = DEFAULT_CALLS) -> list:
+    """Measure both modes for every worker count on a scratch dataset copy."""
+    results = []
+    original = agent.DATASET_PATH
+    with tempfile.TemporaryDirectory(prefix="agent-prefork-") as tmp:
+        agent.DATASET_PATH = os.path.join(tmp, os.path.basename(original))
+        shutil.copy2(original, agent.DATASET_PATH)
+        try:
+            # Lazy runs first: the parent has loaded nothing and no compiled
+            # catalog or search index exists yet next to the copy.
+            for workers in worker_counts:
+                results.append(run_mode("lazy", workers, calls))
+            for workers in worker_counts:
+                results.append(run_mode("prefork", workers, calls))
+        finally:
+            agent.DATASET_PATH = original
+            gc.unfreeze()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=list(DEFAULT_WORKERS))
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS, help="Tool calls per worker")
+    args = parser.parse_args(argv)
+
+    print(f"{os.cpu_count()} CPUs; {args.calls} tool calls per worker")
+    print(f"{'mode':<9}{'workers':>8}{'first ms':>10}{'RSS MiB':>9}{'PSS MiB':>9}{'USS MiB':>9}"
+          f"{'total PSS MiB':>15}{'calls/s/worker':>16}{'calls/s':>10}")
+    for r in run(args.workers, args.calls):
+        print(
+            f"{r['mode']:<9}{r['workers']:>8}{r['first_ms']:>10.1f}{r['rss_kib'] / 1024:>9.1f}"
+            f"{r['pss_kib'] / 1024:>9.1f}{r['uss_kib'] / 1024:>9.1f}"
+            f"{r['total_pss_kib'] / 1024:>15.1f}{r['worker_calls_per_s']:>16.0f}"
+            f"{r['calls_per_s']:>10.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+"""Bytes per tool response in the full and compact response modes.
+
+Tool results are serialized into the model's context, so their JSON size is
+a direct proxy for input tokens (roughly four bytes per token for this
+English/JSON mix). Each tool is called with representative arguments against
+scratch databases, once with ``AGENT_RESPONSE_MODE=full`` and once with
+``compact``, and the mean response size is reported.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.responses
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+
+from my_agent_app import agent, responses
+from my_agent_app.db import close_all_connections
+from my_agent_app.schema import forget_schema
+
+from . import datasets
+
+BYTES_PER_TOKEN = 4
+SESSION_ROWS = 200
+PROFILES = [
+    {"profile_id": 1, "name": datasets.member_name(0), "age": 34, "height": "5'10\"",
+     "weight": 180, "exercise_goal": "Strength Building", "injury": "bad knee"},
+    {"profile_id": 2, "name": datasets.member_name(1), "age": 67, "height": "5'4\"",
+     "weight": 150, "exercise_goal": "Weight Loss", "injury": "None"},
+    {"profile_id": 3, "name": datasets.member_name(2), "age": 25, "height": "6'1\"",
+     "weight": 200, "exercise_goal": "Cardio", "injury": "lower back pain"},
+]
+
+# (label, tool, list of keyword-argument dicts)
+CALLS = [
+    ("collect_user_profile_form", agent.collect_user_profile_form, [{}]),
+    ("generate_weekly_workout_plan_from_profile", agent.generate_weekly_workout_plan_from_profile,
+     [{"profile": p} for p in PROFILES]),
+    ("generate_weekly_workout_plan_from_profile[constrained]",
+     agent.generate_weekly_workout_plan_from_profile,
+     [{"profile": p, "available_equipment": "dumbbells and bands"} for p in PROFILES]),
+    ("get_exercises_by_goal_and_body_part", agent.get_exercises_by_goal_and_body_part,
+     [{"goal": p["exercise_goal"], "body_parts": agent.plan_body_parts(p["exercise_goal"])}
+      for p in PROFILES]),
+    ("search_exercises", agent.search_exercises,
+     [{"query": q} for q in ("band exercises for lower back", "kettlebell swing", "plank")]),
+    ("get_user_sessions", agent.get_user_sessions,
+     [{"user_name": datasets.member_name(i)} for i in range(3)]),
+    ("get_latest_user_session", agent.get_latest_user_session,
+     [{"user_name": datasets.member_name(i)} for i in range(3)]),
+    ("get_exercise_details", agent.get_exercise_details,
+     [{"exercise_ids": [12, 345, 678]}]),
+]
+
+
+def _size(result) -> int:
+    return len(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+
+def measure() -> list:
+    """Return mean response bytes per tool in both modes."""
+    rows = []
+    original = (agent.DB_PATH, agent.SESSIONS_PATH, responses.RESPONSE_MODE)
+    with tempfile.TemporaryDirectory(prefix="agent-responses-") as tmp:
+        try:
+            agent.DB_PATH = os.path.join(tmp, "user_profiles.db")
+            agent.SESSIONS_PATH = os.path.join(tmp, "sessions.db")
+            datasets.populate_databases(SESSION_ROWS)
+            for label, tool, calls in CALLS:
+                sizes = {}
+                for mode in responses.RESPONSE_MODES:
+                    responses.RESPONSE_MODE = mode
+                    sizes[mode] = statistics.mean(_size(tool(**kwargs)) for kwargs in calls)
+                rows.append({"tool": label, **sizes})
+        finally:
+            agent.DB_PATH, agent.SESSIONS_PATH, responses.RESPONSE_MODE = original
+            close_all_connections()
+            forget_schema()
+    return rows
+
+
+def main(argv=None) -> int:
+    argparse.ArgumentParser(description=__doc__.split("\n\n")[0]).parse_args(argv)
+    rows = measure()
+    print(f"{'tool':<56}{'full B':>9}{'compact B':>11}{'saved':>8}{'~tokens saved':>15}")
+    for row in rows:
+        full, compact = row["full"], row["compact"]
+        print(
+            f"{row['tool']:<56}{full:>9.0f}{compact:>11.0f}{1 - compact / full:>8.0%}"
+            f"{(full - compact) / BYTES_PER_TOKEN:>15.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
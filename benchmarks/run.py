@@ -0,0 +1,515 @@
+"""Benchmark every ``root_agent`` tool without the LLM.
+
+Each tool is called directly with generated arguments against synthetic
+datasets in a temporary directory: catalog-bound tools at several multiples
+of ``megaGymDataset.csv``, database-bound tools at several session table
+sizes. Every case reports p50/p95/p99 latency and throughput; the async
+wrappers are also driven concurrently to measure event-loop stalls, and the
+plans of the SQL the tools run (captured by ``queryplans.py``) are checked on
+every populated database.
+
+Results are written as JSON and compared with a stored baseline; a case
+whose p95 latency grows by more than the tolerance is reported as a
+regression and the exit status is 1. Latencies depend on the machine, so no
+baseline is committed: store one with ``--save-baseline`` on the base branch
+first. Without a baseline the run exits 2 unless ``--no-compare`` is given.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.run
+    python -m benchmarks.run --catalog-scales 1 10 100 --session-rows 1000 1000000
+    python -m benchmarks.run --only get_user_sessions get_latest_user_session
+    python -m benchmarks.run --save-baseline
+    python -m benchmarks.run --no-compare
+
+A tool registered on ``root_agent`` without an entry in ``CASES`` is listed
+as skipped, so new tools are not silently left out.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from my_agent_app import agent, cohort, usercache
+from my_agent_app.catalog import clear_catalog_cache, get_catalog
+from my_agent_app.db import close_all_connections
+from my_agent_app.queryplans import capture_tool_queries
+from my_agent_app.schema import check_query_plans, forget_schema
+
+from . import datasets
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, "results", "latest.json")
+DEFAULT_CATALOG_SCALES = (1, 10, 100)
+DEFAULT_SESSION_ROWS = (1000, 10000, 100000)
+DEFAULT_ITERATIONS = 200
+WARMUP_CALLS = 5
+ASYNC_CONCURRENCY = 64
+COHORT_SIZE = 10000
+# p95 changes smaller than this are treated as timer noise.
+NOISE_FLOOR_MS = 0.05
+
+GOALS = list(agent.GOAL_EXERCISE_TYPES)
+INJURIES = ("None", "bad knee", "lower back pain", "shoulder impingement")
+EQUIPMENT = ("", "dumbbells and bands", "kettlebells", "bodyweight only")
+SEARCH_QUERIES = (
+    "band exercises for lower back",
+    "dumbbell chest press",
+    "plank",
+    "explosive jump squat",
+    "kettlebell swing for hamstrings",
+)
+
+
+def _member(ctx: dict, i: int) -> str:
+    names = ctx["user_names"]
+    return names[(i * 7919) % len(names)]
+
+
+def _session(ctx: dict, i: int) -> int:
+    session_ids = ctx["session_ids"]
+    return session_ids[(i * 7919) % len(session_ids)]
+
+
+def _profile(i: int) -> dict:
+    return {
+        "profile_id": i + 1,
+        "name": datasets.member_name(i),
+        "age": 14 + (i * 7) % 60,
+        "weight": 100 + (i * 13) % 200,
+        "exercise_goal": GOALS[i % len(GOALS)],
+        "injury": "None",
+    }
+
+
+# (case, tool or function name, dimension, argument factory, max calls).
+# The dimension names the dataset the case scales with: "catalog",
+# "sessions" or "none". Argument factories run outside the timed region.
+CASES = [
+    ("collect_user_profile_form", "collect_user_profile_form", "none",
+     lambda ctx, i: {}, None),
+    ("save_user_profile", "save_user_profile", "sessions",
+     lambda ctx, i: {
+         "name": f"Bench {i}", "age": 30, "height": "5'10\"", "weight": 170,
+         "exercise_goal": GOALS[i % len(GOALS)], "injury": "None",
+     }, None),
+    ("get_latest_user_profile", "get_latest_user_profile", "sessions",
+     lambda ctx, i: {}, None),
+    ("generate_weekly_workout_plan_from_profile", "generate_weekly_workout_plan_from_profile",
+     "catalog", lambda ctx, i: {"profile": _profile(i)}, None),
+    ("generate_weekly_workout_plan_from_profile[constrained]",
+     "generate_weekly_workout_plan_from_profile", "catalog",
+     lambda ctx, i: {
+         "profile": {**_profile(i), "injury": INJURIES[i % len(INJURIES)]},
+         "available_equipment": EQUIPMENT[i % len(EQUIPMENT)],
+     }, None),
+    ("save_session", "save_session", "sessions",
+     lambda ctx, i: {
+         "user_id": 1, "user_name": _member(ctx, i),
+         "profile_data": ctx["profile"], "workout_plan": ctx["plan"],
+     }, None),
+    ("get_user_sessions", "get_user_sessions", "sessions",
+     lambda ctx, i: {"user_name": _member(ctx, i)}, None),
+    ("get_user_sessions[summary]", "get_user_sessions", "sessions",
+     lambda ctx, i: {"user_name": _member(ctx, i), "fields": "summary"}, None),
+    ("get_latest_user_session", "get_latest_user_session", "sessions",
+     lambda ctx, i: {"user_name": _member(ctx, i)}, None),
+    ("add_refinement_to_session", "add_refinement_to_session", "sessions",
+     lambda ctx, i: {
+         "session_id": _session(ctx, i), "refinement_type": "focus_change",
+         "refinement_details": {"focus": "legs", "request": i},
+     }, None),
+    ("get_session_refinements", "get_session_refinements", "sessions",
+     lambda ctx, i: {"session_id": _session(ctx, i)}, None),
+    # The synthetic sessions are not archived, so this times the index lookup.
+    ("get_archived_sessions", "get_archived_sessions", "sessions",
+     lambda ctx, i: {"user_name": _member(ctx, i)}, None),
+    ("search_exercises", "search_exercises", "catalog",
+     lambda ctx, i: {"query": SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}, None),
+    ("search_exercises[filtered]", "search_exercises", "catalog",
+     lambda ctx, i: {
+         "query": SEARCH_QUERIES[i % len(SEARCH_QUERIES)], "level": "Beginner", "limit": 5,
+     }, None),
+    ("get_exercise_details", "get_exercise_details", "catalog",
+     lambda ctx, i: {"exercise_ids": [(i * 37 + j * 101) % 2900 for j in range(5)]}, None),
+    # Not tools, but on the path of the plan tool.
+    ("get_exercises_by_goal_and_body_part", "get_exercises_by_goal_and_body_part", "catalog",
+     lambda ctx, i: {
+         "goal": GOALS[i % len(GOALS)], "body_parts": ["Chest", "Quadriceps"],
+         "difficulty": ("Beginner", "Intermediate")[i % 2],
+     }, None),
+    ("get_exercises_by_goal_and_body_part[min_rating]", "get_exercises_by_goal_and_body_part",
+     "catalog",
+     lambda ctx, i: {
+         "goal": GOALS[i % len(GOALS)], "body_parts": ["Chest", "Quadriceps"],
+         "difficulty": ("Beginner", "Intermediate")[i % 2], "k": 3, "min_rating": 7.0,
+     }, None),
+    ("catalog_cold_load", "catalog_cold_load", "catalog", lambda ctx, i: {}, 5),
+    (f"generate_cohort_plans[{COHORT_SIZE}]", "generate_cohort_plans", "catalog",
+     lambda ctx, i: ctx["cohort"], 5),
+]
+
+# Async wrapper driven concurrently per session table size.
+ASYNC_CASES = [
+    ("get_latest_user_session", lambda ctx, i: {"user_name": _member(ctx, i)}),
+    ("save_session", lambda ctx, i: {
+        "user_id": 1, "user_name": _member(ctx, i),
+        "profile_data": ctx["profile"], "workout_plan": ctx["plan"],
+    }),
+]
+
+
+def _catalog_cold_load() -> dict:
+    clear_catalog_cache()
+    catalog = get_catalog(agent.DATASET_PATH)
+    return {"status": "success", "exercises": len(catalog)}
+
+
+EXTRA_FUNCTIONS = {
+    "get_exercises_by_goal_and_body_part": agent.get_exercises_by_goal_and_body_part,
+    "catalog_cold_load": _catalog_cold_load,
+    "generate_cohort_plans": cohort.generate_cohort_plans,
+}
+
+
+def tool_functions() -> dict:
+    """Map tool names on ``root_agent`` to their synchronous implementations."""
+    functions = {}
+    for tool in agent.root_agent.tools:
+        func = getattr(tool, "__wrapped__", tool)
+        functions[func.__name__] = func
+    return functions
+
+
+def async_tools() -> dict:
+    """Map tool names on ``root_agent`` to the callables ADK would invoke."""
+    return {getattr(tool, "__name__", str(tool)): tool for tool in agent.root_agent.tools}
+
+
+def percentile(sorted_samples: list, pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def summarize(samples: list, errors: int = 0) -> dict:
+    """Latency percentiles (ms) and throughput for per-call durations in seconds."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "mean_ms": round(total / len(ordered) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "ops_per_sec": round(len(ordered) / total, 1) if total else None,
+    }
+
+
+def _is_error(result) -> bool:
+    return isinstance(result, dict) and result.get("status") == "error"
+
+
+def time_calls(func: Callable, make_args: Callable, ctx: dict, iterations: int) -> dict:
+    """Call ``func`` ``iterations`` times after a warm-up and summarize the timings."""
+    for i in range(min(WARMUP_CALLS, iterations)):
+        func(**make_args(ctx, -1 - i))
+    samples = []
+    errors = 0
+    for i in range(iterations):
+        kwargs = make_args(ctx, i)
+        started = time.perf_counter()
+        result = func(**kwargs)
+        samples.append(time.perf_counter() - started)
+        errors += _is_error(result)
+    return summarize(samples, errors)
+
+
+def time_concurrent(tool: Callable, make_args: Callable, ctx: dict, calls: int) -> dict:
+    """Await ``calls`` concurrent invocations of an async tool on one event loop.
+
+    Per-call latency includes time queued for the tool executor. A ticker
+    task measures how late the loop wakes it, which is the stall every other
+    conversation on the loop would see.
+    """
+
+    async def main():
+        samples = []
+        errors = 0
+        max_lag = 0.0
+        done = False
+
+        async def ticker():
+            nonlocal max_lag
+            while not done:
+                started = time.perf_counter()
+                await asyncio.sleep(0.001)
+                max_lag = max(max_lag, time.perf_counter() - started - 0.001)
+
+        async def one(kwargs):
+            nonlocal errors
+            started = time.perf_counter()
+            result = await tool(**kwargs)
+            samples.append(time.perf_counter() - started)
+            errors += _is_error(result)
+
+        tick = asyncio.ensure_future(ticker())
+        started = time.perf_counter()
+        for first in range(0, calls, ASYNC_CONCURRENCY):
+            batch = range(first, min(calls, first + ASYNC_CONCURRENCY))
+            await asyncio.gather(*(one(make_args(ctx, i)) for i in batch))
+        elapsed = time.perf_counter() - started
+        done = True
+        await tick
+        summary = summarize(samples, errors)
+        summary["ops_per_sec"] = round(len(samples) / elapsed, 1)
+        summary["concurrency"] = ASYNC_CONCURRENCY
+        summary["max_loop_lag_ms"] = round(max_lag * 1000, 3)
+        return summary
+
+    return asyncio.run(main())
+
+
+def _selected(name: str, only: Optional[list]) -> bool:
+    return not only or any(name == o or name.startswith(o + "[") for o in only)
+
+
+def _run_cases(dimension: str, scale: int, ctx: dict, functions: dict,
+               iterations: int, only: Optional[list], results: list) -> None:
+    for case, name, case_dimension, make_args, max_calls in CASES:
+        if case_dimension != dimension or not _selected(case, only) or name not in functions:
+            continue
+        calls = min(iterations, max_calls) if max_calls else iterations
+        summary = time_calls(functions[name], make_args, ctx, calls)
+        results.append({"case": case, "dimension": dimension, "scale": scale, **summary})
+        _print_row(results[-1])
+
+
+def run(
+    catalog_scales=DEFAULT_CATALOG_SCALES,
+    session_rows=DEFAULT_SESSION_ROWS,
+    iterations: int = DEFAULT_ITERATIONS,
+    only: Optional[list] = None,
+    user_cache: bool = False,
+) -> dict:
+    """Build the synthetic datasets, run every case and return the report.
+
+    Session and profile reads bypass the per-user cache unless ``user_cache``
+    is set, so repeated reads of the same members time the database path
+    (``python -m benchmarks.usercache`` measures the cache).
+    """
+    functions = {**tool_functions(), **EXTRA_FUNCTIONS}
+    covered = {name for _, name, _, _, _ in CASES}
+    skipped = sorted(name for name in tool_functions() if name not in covered)
+    results = []
+    datasets_built = []
+    plan_problems = []
+    original_paths = (agent.DATASET_PATH, agent.DB_PATH, agent.SESSIONS_PATH)
+    original_cache_size = usercache.CACHE_SIZE
+    # The SQL the tools run, checked against every populated database.
+    tool_queries = capture_tool_queries()
+    if not user_cache:
+        usercache.CACHE_SIZE = 0
+
+    with tempfile.TemporaryDirectory(prefix="agent-bench-") as tmp:
+        try:
+            agent.DB_PATH = os.path.join(tmp, "catalog_profiles.db")
+            agent.SESSIONS_PATH = os.path.join(tmp, "catalog_sessions.db")
+            cohort_inputs = [_profile(i) for i in range(COHORT_SIZE)]
+            catalog_ctx = {
+                "cohort": {
+                    "goals": [p["exercise_goal"] for p in cohort_inputs],
+                    "ages": [p["age"] for p in cohort_inputs],
+                    "weights": [p["weight"] for p in cohort_inputs],
+                }
+            }
+            for scale in catalog_scales:
+                path = os.path.join(tmp, f"megaGymDataset_{scale}x.csv")
+                rows = datasets.write_scaled_catalog(original_paths[0], path, scale)
+                agent.DATASET_PATH = path
+                clear_catalog_cache()
+                datasets_built.append({"dimension": "catalog", "scale": scale, "exercises": rows})
+                _run_cases("catalog", scale, catalog_ctx, functions, iterations, only, results)
+            agent.DATASET_PATH = original_paths[0]
+            clear_catalog_cache()
+
+            sample_plan = agent.generate_weekly_workout_plan_from_profile(_profile(0))
+            for rows in session_rows:
+                agent.DB_PATH = os.path.join(tmp, f"user_profiles_{rows}.db")
+                agent.SESSIONS_PATH = os.path.join(tmp, f"sessions_{rows}.db")
+                started = time.perf_counter()
+                ctx = datasets.populate_databases(rows)
+                datasets_built.append({
+                    "dimension": "sessions",
+                    "scale": rows,
+                    "users": ctx["users"],
+                    "refinements": ctx["refinements"],
+                    "build_seconds": round(time.perf_counter() - started, 2),
+                })
+                ctx.update(profile=_profile(0), plan=sample_plan)
+                for path, queries in (
+                    (agent.DB_PATH, tool_queries["profiles"]),
+                    (agent.SESSIONS_PATH, tool_queries["sessions"]),
+                ):
+                    for name, detail in check_query_plans(path, queries):
+                        plan_problems.append({"scale": rows, "query": name, "plan": detail})
+
+                _run_cases("sessions", rows, ctx, functions, iterations, only, results)
+                wrappers = async_tools()
+                for name, make_args in ASYNC_CASES:
+                    case = f"async:{name}"
+                    if name not in wrappers or not _selected(case, only):
+                        continue
+                    summary = time_concurrent(wrappers[name], make_args, ctx, iterations)
+                    results.append(
+                        {"case": case, "dimension": "sessions", "scale": rows, **summary}
+                    )
+                    _print_row(results[-1])
+                close_all_connections()
+                forget_schema()
+
+            _run_cases("none", 1, {}, functions, iterations, only, results)
+        finally:
+            agent.DATASET_PATH, agent.DB_PATH, agent.SESSIONS_PATH = original_paths
+            usercache.CACHE_SIZE = original_cache_size
+            usercache.clear()
+            clear_catalog_cache()
+            close_all_connections()
+            forget_schema()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "numpy": cohort.np is not None,
+            "iterations": iterations,
+            "user_cache": user_cache,
+        },
+        "datasets": datasets_built,
+        "results": results,
+        "query_plan_problems": plan_problems,
+        "skipped_tools": skipped,
+    }
+
+
+def _key(result: dict) -> tuple:
+    return result["case"], result["dimension"], result["scale"]
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Return the cases whose p95 latency regressed against ``baseline``.
+
+    Each regression is a dict with the case key, both p95 values and the
+    ratio. Cases missing from the baseline are not compared.
+    """
+    previous = {_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get(_key(result))
+        if not before:
+            continue
+        p95, base = result["p95_ms"], before["p95_ms"]
+        if p95 > base * (1 + tolerance) and p95 - base > NOISE_FLOOR_MS:
+            regressions.append({
+                "case": result["case"],
+                "dimension": result["dimension"],
+                "scale": result["scale"],
+                "baseline_p95_ms": base,
+                "p95_ms": p95,
+                "ratio": round(p95 / base, 2) if base else None,
+            })
+    return regressions
+
+
+def _print_row(result: dict) -> None:
+    print(
+        f"{result['case']:<50} {result['dimension']:>8}={result['scale']:<8} "
+        f"p50 {result['p50_ms']:>9.3f}ms  p95 {result['p95_ms']:>9.3f}ms  "
+        f"p99 {result['p99_ms']:>9.3f}ms  {result['ops_per_sec'] or 0:>10.1f} ops/s"
+        + (f"  errors {result['errors']}" if result["errors"] else "")
+        + (f"  loop lag {result['max_loop_lag_ms']}ms" if "max_loop_lag_ms" in result else ""),
+        flush=True,
+    )
+
+
+def _write_json(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command-line entry point; exits 1 on a regression or plan problem, 2 without a baseline."""
+    parser = argparse.ArgumentParser(description="Benchmark the agent's tools without the LLM.")
+    parser.add_argument("--catalog-scales", type=int, nargs="+", default=list(DEFAULT_CATALOG_SCALES),
+                        help="Multiples of megaGymDataset.csv to benchmark")
+    parser.add_argument("--session-rows", type=int, nargs="+", default=list(DEFAULT_SESSION_ROWS),
+                        help="Session table sizes to benchmark")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help="Timed calls per case")
+    parser.add_argument("--only", nargs="+", help="Run only these cases")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON report")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed p95 growth over the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Also store this run as the new baseline")
+    parser.add_argument("--no-compare", action="store_true",
+                        help="Only write the report; do not compare with a baseline")
+    parser.add_argument("--user-cache", action="store_true",
+                        help="Serve session/profile reads from the per-user cache")
+    args = parser.parse_args(argv)
+    compare_baseline = not (args.save_baseline or args.no_compare)
+    if compare_baseline and not os.path.exists(args.baseline):
+        print(
+            f"No baseline at {args.baseline}. Store one on the base branch with\n"
+            f"    python -m benchmarks.run --save-baseline\n"
+            f"or pass --no-compare to run without comparing.",
+            file=sys.stderr,
+        )
+        return 2
+
+    report = run(args.catalog_scales, args.session_rows, args.iterations, args.only, args.user_cache)
+    for name in report["skipped_tools"]:
+        print(f"skipped {name}: no entry in benchmarks.run.CASES")
+    for problem in report["query_plan_problems"]:
+        print(f"query plan at {problem['scale']} sessions: {problem['query']}: {problem['plan']}")
+
+    regressions = []
+    if compare_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+        for r in regressions:
+            print(
+                f"REGRESSION {r['case']} {r['dimension']}={r['scale']}: "
+                f"p95 {r['baseline_p95_ms']}ms -> {r['p95_ms']}ms (x{r['ratio']})"
+            )
+        if not regressions:
+            print(f"No p95 regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+    _write_json(args.output, report)
+    print(f"Wrote {args.output}")
+    if args.save_baseline:
+        _write_json(args.baseline, report)
+        print(f"Stored baseline {args.baseline}")
+    return 1 if regressions or report["query_plan_problems"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
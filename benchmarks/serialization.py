@@ -0,0 +1,122 @@
+"""Micro-benchmark of the session payload serializers on real plans.
+
+Encodes and decodes the payloads a session write and read handle: weekly
+plans generated from the shipped catalog for every goal, difficulty and a
+few equipment/injury constraints, plus the matching profiles. Each encoder
+that is installed is timed: the standard-library ``json`` the tools used
+before, ``orjson`` and ``msgpack``.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --iterations 5000
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable
+
+from my_agent_app import agent
+from my_agent_app.serialization import optional_module
+
+DEFAULT_ITERATIONS = 2000
+REPEATS = 5
+
+
+def plan_payloads() -> list:
+    """Return (profile, plan) pairs covering the plan templates."""
+    payloads = []
+    i = 0
+    for goal in agent.GOAL_EXERCISE_TYPES:
+        for age in (30, 70):
+            for injury, equipment in (("None", ""), ("bad knee", "dumbbells and bands")):
+                profile = {
+                    "profile_id": i + 1,
+                    "name": f"Member {i}",
+                    "age": age,
+                    "height": "5'10\"",
+                    "weight": 170,
+                    "exercise_goal": goal,
+                    "injury": injury,
+                }
+                payloads.append(
+                    (profile, agent.generate_weekly_workout_plan_from_profile(profile, equipment))
+                )
+                i += 1
+    return payloads
+
+
+def encoders() -> dict:
+    """Return ``{name: (dumps, loads)}`` for every installed encoder."""
+    found = {"json (stdlib)": (json.dumps, json.loads)}
+    orjson = optional_module("orjson")
+    msgpack = optional_module("msgpack")
+    if orjson is not None:
+        found["orjson"] = (orjson.dumps, orjson.loads)
+    if msgpack is not None:
+        found["msgpack"] = (
+            lambda value: msgpack.packb(value, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False),
+        )
+    return found
+
+
+def _best_per_call(func: Callable, items: list, iterations: int) -> float:
+    """Best-of-REPEATS mean seconds per call of ``func`` over ``items``."""
+    rounds = max(1, iterations // len(items))
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for item in items:
+                func(item)
+        timings.append((time.perf_counter() - started) / (rounds * len(items)))
+    return min(timings)
+
+
+def run(iterations: int = DEFAULT_ITERATIONS) -> list:
+    """Time every encoder on the plan and profile payloads.
+
+    Returns:
+        One result dictionary per (encoder, payload kind).
+    """
+    pairs = plan_payloads()
+    kinds = {"plan": [plan for _, plan in pairs], "profile": [profile for profile, _ in pairs]}
+    results = []
+    for kind, values in kinds.items():
+        for name, (dumps, loads) in encoders().items():
+            encoded = [dumps(value) for value in values]
+            assert all(loads(data) == value for data, value in zip(encoded, values))
+            results.append({
+                "encoder": name,
+                "payload": kind,
+                "encode_us": _best_per_call(dumps, values, iterations) * 1e6,
+                "decode_us": _best_per_call(loads, encoded, iterations) * 1e6,
+                "bytes": statistics.mean(len(data) for data in encoded),
+            })
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations)
+    baseline = {r["payload"]: r for r in results if r["encoder"] == "json (stdlib)"}
+    print(f"{'payload':<9}{'encoder':<16}{'encode us':>11}{'decode us':>11}{'bytes':>9}"
+          f"{'encode x':>10}{'decode x':>10}")
+    for r in results:
+        base = baseline[r["payload"]]
+        print(
+            f"{r['payload']:<9}{r['encoder']:<16}{r['encode_us']:>11.2f}{r['decode_us']:>11.2f}"
+            f"{r['bytes']:>9.0f}{base['encode_us'] / r['encode_us']:>10.1f}"
+            f"{base['decode_us'] / r['decode_us']:>10.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
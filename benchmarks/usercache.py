@@ -0,0 +1,104 @@
+"""Latency of returning members' session reads with and without the user cache.
+
+Simulates conversation starts on a scratch database of ``--session-rows``
+sessions: each turn picks a member (a small set of returning members gets
+most of the traffic), calls ``get_latest_user_session`` and
+``get_user_sessions`` for them, and every ``--write-every``-th turn refines the
+member's latest session, which invalidates their entries. The same turns are
+run with the cache disabled and enabled.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.usercache
+    python -m benchmarks.usercache --session-rows 100000 --turns 20000 --write-every 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from my_agent_app import agent, usercache
+from my_agent_app.db import close_all_connections
+from my_agent_app.schema import forget_schema
+
+from . import datasets
+
+DEFAULT_SESSION_ROWS = 20000
+DEFAULT_TURNS = 5000
+DEFAULT_WRITE_EVERY = 10
+RETURNING_MEMBERS = 200
+
+
+def _percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run_mode(mode: str, users: int, turns: int, write_every: int, seed: int = 11) -> dict:
+    """Run ``turns`` conversation starts with the cache ``mode`` ("off"/"on")."""
+    rng = random.Random(seed)
+    usercache.CACHE_SIZE = 0 if mode == "off" else 1024
+    usercache.clear()
+    before = usercache.user_cache_stats()
+    latencies = []
+    for turn in range(turns):
+        # Nine turns in ten come from the returning members.
+        member = rng.randrange(min(RETURNING_MEMBERS, users) if rng.random() < 0.9 else users)
+        name = datasets.member_name(member)
+        started = time.perf_counter()
+        latest = agent.get_latest_user_session(name)
+        agent.get_user_sessions(name, limit=5)
+        latencies.append(time.perf_counter() - started)
+        if latest["status"] != "success":
+            raise RuntimeError(f"{mode}: {latest}")
+        if write_every and turn % write_every == write_every - 1:
+            agent.add_refinement_to_session(latest["session_id"], "difficulty_increase", {"turn": turn})
+    stats = usercache.user_cache_stats()
+    lookups = stats["hits"] + stats["misses"] - before["hits"] - before["misses"]
+    return {
+        "mode": mode,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "turns_per_s": turns / sum(latencies),
+        "hit_rate": (stats["hits"] - before["hits"]) / lookups if lookups else None,
+    }
+
+
+def run(session_rows: int, turns: int, write_every: int) -> list:
+    """Measure both modes on one scratch dataset."""
+    original = (agent.DB_PATH, agent.SESSIONS_PATH, usercache.CACHE_SIZE)
+    with tempfile.TemporaryDirectory(prefix="agent-usercache-") as tmp:
+        agent.DB_PATH = os.path.join(tmp, "user_profiles.db")
+        agent.SESSIONS_PATH = os.path.join(tmp, "sessions.db")
+        try:
+            users = max(1, session_rows // datasets.SESSIONS_PER_USER)
+            datasets.populate_databases(session_rows)
+            return [run_mode(mode, users, turns, write_every) for mode in ("off", "on")]
+        finally:
+            agent.DB_PATH, agent.SESSIONS_PATH, usercache.CACHE_SIZE = original
+            usercache.clear()
+            close_all_connections()
+            forget_schema()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--session-rows", type=int, default=DEFAULT_SESSION_ROWS)
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS)
+    parser.add_argument("--write-every", type=int, default=DEFAULT_WRITE_EVERY,
+                        help="Refine the member's latest session every N turns (0: never)")
+    args = parser.parse_args(argv)
+
+    print(f"{'cache':<7}{'p50 ms':>9}{'p99 ms':>9}{'turns/s':>10}{'hit rate':>10}")
+    for r in run(args.session_rows, args.turns, args.write_every):
+        hit_rate = f"{r['hit_rate']:.1%}" if r["hit_rate"] is not None else "-"
+        print(f"{r['mode']:<7}{r['p50_ms']:>9.3f}{r['p99_ms']:>9.3f}"
+              f"{r['turns_per_s']:>10.0f}{hit_rate:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
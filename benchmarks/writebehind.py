@@ -0,0 +1,133 @@
+"""Session write throughput and tool latency, synchronous vs. write-behind.
+
+Runs ``save_session`` followed by ``add_refinement_to_session`` on the saved
+session from 1, 16 and 64 threads against scratch databases, first with a
+commit per tool call and then with ``AGENT_WRITE_BEHIND`` group commit. The
+write-behind run is timed until its queue is committed, and both runs check
+that every session and refinement was stored.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.writebehind
+    python -m benchmarks.writebehind --threads 64 --writes 200 --delay-ms 5
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from my_agent_app import agent, writebehind
+from my_agent_app.db import close_all_connections, get_connection
+from my_agent_app.schema import forget_schema
+
+from . import datasets
+
+DEFAULT_THREADS = (1, 16, 64)
+DEFAULT_WRITES = 100
+PROFILE = {
+    "profile_id": 1,
+    "name": datasets.member_name(0),
+    "age": 34,
+    "height": "5'10\"",
+    "weight": 180,
+    "exercise_goal": "Strength Building",
+    "injury": "bad knee",
+}
+
+
+def _percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run_mode(mode: str, threads: int, writes: int, delay: float) -> dict:
+    """Run ``threads`` x ``writes`` session + refinement pairs in ``mode``."""
+    plan = agent.generate_weekly_workout_plan_from_profile(PROFILE)
+    latencies = []
+    errors = []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        name = datasets.member_name(index)
+        barrier.wait()
+        for i in range(writes):
+            started = time.perf_counter()
+            saved = agent.save_session(index + 1, name, PROFILE, plan)
+            latencies.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            refined = agent.add_refinement_to_session(
+                saved.get("session_id", -1), "difficulty_increase", {"step": i}
+            )
+            latencies.append(time.perf_counter() - started)
+            for result in (saved, refined):
+                if result["status"] != "success":
+                    errors.append(result["message"])
+
+    with tempfile.TemporaryDirectory(prefix="agent-writebehind-") as tmp:
+        original = (agent.SESSIONS_PATH, writebehind.ENABLED, writebehind.MAX_DELAY)
+        agent.SESSIONS_PATH = os.path.join(tmp, "sessions.db")
+        writebehind.ENABLED = mode == "write-behind"
+        writebehind.MAX_DELAY = delay
+        try:
+            agent.init_sessions_database()
+            pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+            for thread in pool:
+                thread.start()
+            barrier.wait()
+            started = time.perf_counter()
+            for thread in pool:
+                thread.join()
+            writer_stats = None
+            if writebehind.ENABLED:
+                writer = writebehind.session_writer(agent.SESSIONS_PATH)
+                writer.flush()
+                writer_stats = writer.stats()
+            elapsed = time.perf_counter() - started
+            sessions, refinements = get_connection(agent.SESSIONS_PATH).execute(
+                "SELECT COUNT(*), COALESCE(SUM(refinement_count), 0) FROM sessions"
+            ).fetchone()
+        finally:
+            writebehind.close_writers()
+            agent.SESSIONS_PATH, writebehind.ENABLED, writebehind.MAX_DELAY = original
+            close_all_connections()
+            forget_schema()
+    expected = threads * writes
+    if errors or sessions != expected or refinements != expected:
+        raise RuntimeError(
+            f"{mode}: stored {sessions} sessions / {refinements} refinements of {expected}; "
+            f"errors: {errors[:3]}"
+        )
+    return {
+        "mode": mode,
+        "threads": threads,
+        "writes_per_s": 2 * expected / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "writer": writer_stats,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=list(DEFAULT_THREADS))
+    parser.add_argument("--writes", type=int, default=DEFAULT_WRITES,
+                        help="Session + refinement pairs per thread")
+    parser.add_argument("--delay-ms", type=float, default=writebehind.MAX_DELAY * 1000,
+                        help="Write-behind maximum delay")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<14}{'threads':>8}{'writes/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'mean batch':>12}")
+    for threads in args.threads:
+        for mode in ("synchronous", "write-behind"):
+            r = run_mode(mode, threads, args.writes, args.delay_ms / 1000)
+            batch = r["writer"]["mean_batch"] if r["writer"] else 1
+            print(f"{r['mode']:<14}{r['threads']:>8}{r['writes_per_s']:>11.0f}"
+                  f"{r['p50_ms']:>9.3f}{r['p99_ms']:>9.3f}{batch:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
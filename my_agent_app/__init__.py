@@ -1,8 +1,15 @@
-"""Exercise Planner Agent Package"""
+"""Exercise Planner Agent Package
 
-try:
-    from .agent import root_agent
-except ImportError:
-    from agent import root_agent
+``root_agent`` is resolved on first access, so importing the package (or
+one of its tool modules) neither imports ``google.adk`` nor builds the agent.
+"""
 
 __all__ = ["root_agent"]
+
+
+def __getattr__(name: str):
+    if name == "root_agent":
+        from .agent import root_agent
+
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,620 +1,427 @@
-"""ADK Exercise Planner Agent - Generates personalized workout plans.""""""ADK Sequential Agents - Exercise Planner with User Profile Database & Session Management."""
-
-
-
-import csvimport csv
-
-import osimport json
-
-from google.adk.agents.llm_agent import Agentimport os
-
-import sqlite3
+"""ADK Sequential Agents - Exercise Planner with User Profile Database & Session Management."""
 
+import os
+import threading
 from datetime import datetime
+from typing import Optional
+
+try:
+    from . import usercache
+    from .async_tools import make_async_tool
+    from .blobs import load_session_payloads, session_payload_values
+    from .cache import LRUCache
+    from .catalog import get_catalog, read_dataset_rows
+    from .constraints import allowed_mask, equipment_values, injury_tags
+    from .db import get_connection
+    from .metrics import instrument_tool
+    from .responses import compact_enabled, compact_exercise, compact_plan
+    from .retention import load_archived_sessions
+    from .schema import PROFILE_MIGRATIONS, SESSION_MIGRATIONS, ensure_schema
+    from .search import search as search_exercise_index
+    from .serialization import WRITE_FORMAT, dumps, loads
+    from .writebehind import await_pending_writes, session_writer, write_behind_enabled
+except ImportError:
+    import usercache  # type: ignore
+    from async_tools import make_async_tool  # type: ignore
+    from blobs import load_session_payloads, session_payload_values  # type: ignore
+    from cache import LRUCache  # type: ignore
+    from catalog import get_catalog, read_dataset_rows  # type: ignore
+    from constraints import allowed_mask, equipment_values, injury_tags  # type: ignore
+    from db import get_connection  # type: ignore
+    from metrics import instrument_tool  # type: ignore
+    from responses import compact_enabled, compact_exercise, compact_plan  # type: ignore
+    from retention import load_archived_sessions  # type: ignore
+    from schema import PROFILE_MIGRATIONS, SESSION_MIGRATIONS, ensure_schema  # type: ignore
+    from search import search as search_exercise_index  # type: ignore
+    from serialization import WRITE_FORMAT, dumps, loads  # type: ignore
+    from writebehind import await_pending_writes, session_writer, write_behind_enabled  # type: ignore
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), "megaGymDataset.csv")
+DB_PATH = os.path.join(os.path.dirname(__file__), "user_profiles.db")
+SESSIONS_PATH = os.path.join(os.path.dirname(__file__), "sessions.db")
+
+
+def init_database():
+    """Create or upgrade the user profiles database (once per process)."""
+    ensure_schema(DB_PATH, PROFILE_MIGRATIONS)
+
+
+def init_sessions_database():
+    """Create or upgrade the sessions database (once per process)."""
+    ensure_schema(SESSIONS_PATH, SESSION_MIGRATIONS)
+
+
+# Static profile form metadata, built once per process.
+PROFILE_FORM_FIELDS = [
+    {
+        "field_name": "name",
+        "label": "Full Name",
+        "placeholder": "e.g., John Smith",
+        "type": "text",
+        "required": True,
+        "description": "Enter your first and last name"
+    },
+    {
+        "field_name": "age",
+        "label": "Age",
+        "placeholder": "e.g., 30",
+        "type": "number",
+        "min": 13,
+        "max": 120,
+        "required": True,
+        "description": "Enter your age in years"
+    },
+    {
+        "field_name": "height",
+        "label": "Height",
+        "placeholder": "e.g., 5'10\" or 180 cm",
+        "type": "text",
+        "required": True,
+        "description": "Enter your height (e.g., 5'10\", 6'2\", 180 cm, 170 cm)"
+    },
+    {
+        "field_name": "weight",
+        "label": "Weight",
+        "placeholder": "e.g., 180",
+        "type": "number",
+        "min": 50,
+        "max": 500,
+        "required": True,
+        "description": "Enter your weight in pounds"
+    },
+    {
+        "field_name": "exercise_goal",
+        "label": "Fitness Goal",
+        "type": "select",
+        "required": True,
+        "description": "What is your primary fitness goal?",
+        "options": ["Weight Loss", "Strength Building", "Cardio"]
+    },
+    {
+        "field_name": "injury",
+        "label": "Injuries or Limitations",
+        "placeholder": "e.g., None, Knee pain, Back strain",
+        "type": "text",
+        "required": False,
+        "description": "Any current injuries or physical limitations? (Leave empty for None)"
+    }
+]
 
-DATASET_PATH = os.path.join(os.path.dirname(__file__), "megaGymDataset.csv")from google.adk.agents.llm_agent import Agent
-
-
-
-
-
-def collect_user_profile_form() -> dict:DATASET_PATH = os.path.join(os.path.dirname(__file__), "megaGymDataset.csv")
-
-    """Interactive form to collect user profile details one field at a time.DB_PATH = os.path.join(os.path.dirname(__file__), "user_profiles.db")
+PROFILE_FORM_TITLE = "📋 User Profile Registration"
+PROFILE_FORM_MESSAGE = (
+    "Please fill out your profile information below. "
+    "This helps us create a personalized workout plan just for you!"
+)
+# The compact form keeps what the model needs to ask for and validate each field.
+COMPACT_FORM_KEYS = ("field_name", "label", "type", "required", "min", "max", "options")
+COMPACT_PROFILE_FORM_FIELDS = [
+    {key: field[key] for key in COMPACT_FORM_KEYS if key in field}
+    for field in PROFILE_FORM_FIELDS
+]
 
-    SESSIONS_PATH = os.path.join(os.path.dirname(__file__), "sessions.db")
 
+def collect_user_profile_form() -> dict:
+    """Interactive form to collect user profile details one field at a time.
+    
     Returns a formatted form structure that the agent can use to collect input
-
     from the user field by field.
+    """
+    if compact_enabled():
+        return {
+            "status": "form_ready",
+            "fields": [dict(field) for field in COMPACT_PROFILE_FORM_FIELDS],
+        }
+    return {
+        "status": "form_ready",
+        "form_title": PROFILE_FORM_TITLE,
+        "fields": [dict(field) for field in PROFILE_FORM_FIELDS],
+        "message": PROFILE_FORM_MESSAGE,
+    }
 
-    """def init_database():
-
-    return {    """Initialize SQLite database with user profiles table."""
-
-        "status": "form_ready",    conn = sqlite3.connect(DB_PATH)
-
-        "form_title": "📋 User Profile Registration",    cursor = conn.cursor()
-
-        "fields": [    cursor.execute(
-
-            {        """
-
-                "field_name": "name",        CREATE TABLE IF NOT EXISTS user_profiles (
-
-                "label": "Full Name",            id INTEGER PRIMARY KEY AUTOINCREMENT,
-
-                "placeholder": "e.g., John Smith",            name TEXT NOT NULL,
-
-                "type": "text",            age INTEGER NOT NULL,
-
-                "required": True,            height TEXT NOT NULL,
-
-                "description": "Enter your first and last name"            weight INTEGER NOT NULL,
-
-            },            exercise_goal TEXT NOT NULL,
-
-            {            injury TEXT DEFAULT 'None',
-
-                "field_name": "age",            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-
-                "label": "Age",        )
-
-                "placeholder": "e.g., 30",        """
-
-                "type": "number",    )
-
-                "min": 13,    conn.commit()
-
-                "max": 120,    conn.close()
-
-                "required": True,
-
-                "description": "Enter your age in years"
-
-            },def init_sessions_database():
-
-            {    """Initialize SQLite database for session management."""
-
-                "field_name": "height",    conn = sqlite3.connect(SESSIONS_PATH)
-
-                "label": "Height",    cursor = conn.cursor()
-
-                "placeholder": "e.g., 5'10\" or 180 cm",    cursor.execute(
-
-                "type": "text",        """
-
-                "required": True,        CREATE TABLE IF NOT EXISTS sessions (
-
-                "description": "Enter your height (e.g., 5'10\", 6'2\", 180 cm, 170 cm)"            session_id INTEGER PRIMARY KEY AUTOINCREMENT,
-
-            },            user_id INTEGER NOT NULL,
-
-            {            user_name TEXT NOT NULL,
-
-                "field_name": "weight",            profile_data JSON NOT NULL,
-
-                "label": "Weight",            workout_plan JSON NOT NULL,
-
-                "placeholder": "e.g., 180",            refinement_history JSON DEFAULT '[]',
-
-                "type": "number",            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-
-                "min": 50,            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-
-                "max": 500,            FOREIGN KEY (user_id) REFERENCES user_profiles(id)
-
-                "required": True,        )
-
-                "description": "Enter your weight in pounds"        """
-
-            },    )
-
-            {    conn.commit()
-
-                "field_name": "exercise_goal",    conn.close()
-
-                "label": "Fitness Goal",
-
-                "type": "select",
-
-                "required": True,def collect_user_profile_form() -> dict:
-
-                "description": "What is your primary fitness goal?",    """Interactive form to collect user profile details one field at a time.
-
-                "options": ["Weight Loss", "Strength Building", "Cardio"]    
-
-            },    Returns a formatted form structure that the agent can use to collect input
-
-            {    from the user field by field.
-
-                "field_name": "injury",    """
-
-                "label": "Injuries or Limitations",    return {
-
-                "placeholder": "e.g., None, Knee pain, Back strain",        "status": "form_ready",
-
-                "type": "text",        "form_title": "📋 User Profile Registration",
-
-                "required": False,        "fields": [
-
-                "description": "Any current injuries or physical limitations? (Leave empty for None)"            {
-
-            }                "field_name": "name",
-
-        ],                "label": "Full Name",
-
-        "message": "Please fill out your profile information below. This helps us create a personalized workout plan just for you!"                "placeholder": "e.g., John Smith",
-
-    }                "type": "text",
-
-                "required": True,
-
-                "description": "Enter your first and last name"
-
-def validate_user_profile(            },
-
-    name: str, age: int, height: str, weight: int, exercise_goal: str, injury: str = "None"            {
-
-) -> dict:                "field_name": "age",
-
-    """Validate user profile inputs.                "label": "Age",
-
-                    "placeholder": "e.g., 30",
-
-    Args:                "type": "number",
-
-        name: User's full name.                "min": 13,
-
-        age: User's age in years.                "max": 120,
-
-        height: User's height (e.g., "5'10\"", "180 cm").                "required": True,
-
-        weight: User's weight in pounds.                "description": "Enter your age in years"
-
-        exercise_goal: Exercise goal ("Weight Loss", "Strength Building", or "Cardio").            },
-
-        injury: Any injuries or limitations (default: "None").            {
-
-                        "field_name": "height",
-
-    Returns:                "label": "Height",
-
-        A dictionary with validation status and the profile data.                "placeholder": "e.g., 5'10\" or 180 cm",
-
-    """                "type": "text",
-
-    try:                "required": True,
-
-        # Validate inputs                "description": "Enter your height (e.g., 5'10\", 6'2\", 180 cm, 170 cm)"
-
-        if not name or name.strip() == "":            },
-
-            return {"status": "error", "message": "Name cannot be empty"}            {
-
-        if age < 13 or age > 120:                "field_name": "weight",
-
-            return {"status": "error", "message": "Age must be between 13 and 120"}                "label": "Weight",
-
-        if not height or height.strip() == "":                "placeholder": "e.g., 180",
-
-            return {"status": "error", "message": "Height cannot be empty"}                "type": "number",
-
-        if weight < 50 or weight > 500:                "min": 50,
-
-            return {"status": "error", "message": "Weight must be between 50 and 500 lbs"}                "max": 500,
-
-        if exercise_goal not in ["Weight Loss", "Strength Building", "Cardio"]:                "required": True,
-
-            return {"status": "error", "message": "Invalid exercise goal"}                "description": "Enter your weight in pounds"
-
-                    },
-
-        # Use "None" if injury is empty            {
-
-        if not injury or injury.lower().strip() in ["", "none", "n/a"]:                "field_name": "exercise_goal",
-
-            injury = "None"                "label": "Fitness Goal",
-
-                        "type": "select",
-
-        return {                "required": True,
-
-            "status": "success",                "description": "What is your primary fitness goal?",
-
-            "profile": {                "options": ["Weight Loss", "Strength Building", "Cardio"]
-
-                "name": name.strip(),            },
-
-                "age": age,            {
-
-                "height": height.strip(),                "field_name": "injury",
-
-                "weight": weight,                "label": "Injuries or Limitations",
-
-                "exercise_goal": exercise_goal,                "placeholder": "e.g., None, Knee pain, Back strain",
-
-                "injury": injury.strip(),                "type": "text",
-
-                "message": (                "required": False,
-
-                    f"✅ Profile validated successfully!\n\n"                "description": "Any current injuries or physical limitations? (Leave empty for None)"
-
-                    f"**Name:** {name.strip()}\n"            }
-
-                    f"**Age:** {age} years\n"        ],
-
-                    f"**Height:** {height.strip()}\n"        "message": "Please fill out your profile information below. This helps us create a personalized workout plan just for you!"
-
-                    f"**Weight:** {weight} lbs\n"    }
-
-                    f"**Goal:** {exercise_goal}\n"
-
-                    f"**Injuries:** {injury.strip()}\n\n"
-
-                    f"Now generating your personalized workout plan..."def save_user_profile(
-
-                ),    name: str, age: int, height: str, weight: int, exercise_goal: str, injury: str = "None"
-
-            },) -> dict:
-
-        }    """Save user profile to SQLite database.
-
-    except Exception as e:    
-
-        return {"status": "error", "message": f"Failed to validate profile: {str(e)}"}    Args:
 
+def profile_validation_error(
+    name: str, age: int, height: str, weight: int, exercise_goal: str
+) -> Optional[str]:
+    """Return the validation error for profile fields, or None if they are valid."""
+    if not name or name.strip() == "":
+        return "Name cannot be empty"
+    if age < 13 or age > 120:
+        return "Age must be between 13 and 120"
+    if not height or height.strip() == "":
+        return "Height cannot be empty"
+    if weight < 50 or weight > 500:
+        return "Weight must be between 50 and 500 lbs"
+    if exercise_goal not in ["Weight Loss", "Strength Building", "Cardio"]:
+        return "Invalid exercise goal"
+    return None
+
+
+def normalize_injury(injury: str) -> str:
+    """Use "None" if injury is empty."""
+    if not injury or injury.lower().strip() in ["", "none", "n/a"]:
+        return "None"
+    return injury
+
+
+def save_user_profile(
+    name: str, age: int, height: str, weight: int, exercise_goal: str, injury: str = "None"
+) -> dict:
+    """Save user profile to SQLite database.
+    
+    Args:
         name: User's full name.
-
         age: User's age in years.
-
-def load_gym_dataset() -> list:        height: User's height (e.g., "5'10\"", "180 cm").
-
-    """Load exercises from the CSV dataset."""        weight: User's weight in pounds.
-
-    exercises = []        exercise_goal: Exercise goal ("Weight Loss", "Strength Building", or "Cardio").
-
-    try:        injury: Any injuries or limitations (default: "None").
-
-        with open(DATASET_PATH, "r", encoding="utf-8") as f:        
-
-            reader = csv.DictReader(f)    Returns:
-
-            for row in reader:        A dictionary with save status and user profile ID.
-
-                exercises.append(row)    """
-
-    except FileNotFoundError:    try:
-
-        return []        init_database()
-
-    return exercises        conn = sqlite3.connect(DB_PATH)
-
+        height: User's height (e.g., "5'10\"", "180 cm").
+        weight: User's weight in pounds.
+        exercise_goal: Exercise goal ("Weight Loss", "Strength Building", or "Cardio").
+        injury: Any injuries or limitations (default: "None").
+        
+    Returns:
+        A dictionary with save status and user profile ID.
+    """
+    try:
+        init_database()
+        conn = get_connection(DB_PATH)
         cursor = conn.cursor()
-
         
-
-def get_exercises_by_goal_and_body_part(        # Validate inputs
-
-    goal: str, body_parts: list, difficulty: str = "Intermediate"        if not name or name.strip() == "":
-
-) -> dict:            return {"status": "error", "message": "Name cannot be empty"}
-
-    """Filters exercises from the dataset based on goal and body parts."""        if age < 13 or age > 120:
-
-    exercises = load_gym_dataset()            return {"status": "error", "message": "Age must be between 13 and 120"}
-
-    filtered = {}        if not height or height.strip() == "":
-
-    goal_type_map = {            return {"status": "error", "message": "Height cannot be empty"}
-
-        "Weight Loss": ["Cardio", "Plyometrics"],        if weight < 50 or weight > 500:
-
-        "Strength Building": ["Strength"],            return {"status": "error", "message": "Weight must be between 50 and 500 lbs"}
-
-        "Cardio": ["Cardio", "Plyometrics"],        if exercise_goal not in ["Weight Loss", "Strength Building", "Cardio"]:
-
-    }            return {"status": "error", "message": "Invalid exercise goal"}
-
-    exercise_types = goal_type_map.get(goal, ["Strength"])        
-
-    for body_part in body_parts:        # Use "None" if injury is empty
-
-        matching = [        if not injury or injury.lower().strip() in ["", "none", "n/a"]:
-
-            ex            injury = "None"
-
-            for ex in exercises        
-
-            if ex.get("Type") in exercise_types        cursor.execute(
-
-            and ex.get("BodyPart") == body_part            """
-
-            and ex.get("Level") == difficulty            INSERT INTO user_profiles (name, age, height, weight, exercise_goal, injury)
-
-            and ex.get("Title")            VALUES (?, ?, ?, ?, ?, ?)
-
-        ]            """,
-
-        if matching:            (name.strip(), age, height.strip(), weight, exercise_goal, injury.strip()),
-
-            filtered[body_part] = [        )
-
-                {        conn.commit()
-
-                    "title": ex.get("Title", "Unknown"),        profile_id = cursor.lastrowid
-
-                    "description": ex.get("Desc", "No description"),        conn.close()
-
-                    "equipment": ex.get("Equipment", "Bodyweight"),        
-
-                    "rating": ex.get("Rating", "N/A"),        return {
-
-                }            "status": "success",
-
-                for ex in matching[:5]            "profile_id": profile_id,
-
-            ]            "name": name.strip(),
-
-    return filtered            "age": age,
-
+        # Validate inputs
+        error = profile_validation_error(name, age, height, weight, exercise_goal)
+        if error:
+            return {"status": "error", "message": error}
+        injury = normalize_injury(injury)
+        
+        with conn:
+            cursor.execute(
+                """
+                INSERT INTO user_profiles (name, age, height, weight, exercise_goal, injury)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (name.strip(), age, height.strip(), weight, exercise_goal, injury.strip()),
+            )
+        profile_id = cursor.lastrowid
+        usercache.invalidate(DB_PATH, None)
+        
+        return {
+            "status": "success",
+            "profile_id": profile_id,
+            "name": name.strip(),
+            "age": age,
             "height": height.strip(),
-
             "weight": weight,
+            "exercise_goal": exercise_goal,
+            "injury": injury,
+            "message": (
+                f"✅ Profile Saved Successfully!\n\n"
+                f"**Profile ID:** {profile_id}\n"
+                f"**Name:** {name.strip()}\n"
+                f"**Age:** {age} years\n"
+                f"**Height:** {height.strip()}\n"
+                f"**Weight:** {weight} lbs\n"
+                f"**Goal:** {exercise_goal}\n"
+                f"**Injuries:** {injury}\n\n"
+                f"Now generating your personalized workout plan..."
+            ),
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to save profile: {str(e)}"}
 
-def generate_weekly_workout_plan(profile: dict) -> dict:            "exercise_goal": exercise_goal,
-
-    """Generates a weekly workout plan based on user profile."""            "injury": injury,
-
-    goal = profile.get("exercise_goal", "Strength Building")            "message": (
-
-    user_age = profile.get("age", 30)                f"✅ Profile Saved Successfully!\n\n"
-
-    injury = profile.get("injury", "None")                f"**Profile ID:** {profile_id}\n"
-
-    weight = profile.get("weight", 170)                f"**Name:** {name.strip()}\n"
-
-                    f"**Age:** {age} years\n"
-
-    goal_body_parts = {                f"**Height:** {height.strip()}\n"
-
-        "Weight Loss": ["Abdominals", "Legs", "Back", "Chest"],                f"**Weight:** {weight} lbs\n"
-
-        "Strength Building": ["Back", "Chest", "Legs", "Abdominals"],                f"**Goal:** {exercise_goal}\n"
-
-        "Cardio": ["Abdominals", "Legs", "Cardiovascular"],                f"**Injuries:** {injury}\n\n"
-
-    }                f"Now generating your personalized workout plan..."
-
-    body_parts = goal_body_parts.get(goal, ["Abdominals", "Chest", "Back"])            ),
 
+def get_latest_user_profile() -> dict:
+    """Retrieve the most recently created user profile from the database."""
+    try:
+        init_database()
+        cache_key = usercache.key(DB_PATH, None, "latest_profile")
+        cached = usercache.get(cache_key)
+        if cached is not None:
+            return cached
+        conn = get_connection(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, name, age, height, weight, exercise_goal, injury
+            FROM user_profiles
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+            """
+        )
+        row = cursor.fetchone()
+        if row:
+            profile = {
+                "status": "success",
+                "profile_id": row[0],
+                "name": row[1],
+                "age": row[2],
+                "height": row[3],
+                "weight": row[4],
+                "exercise_goal": row[5],
+                "injury": row[6],
             }
+            usercache.put(cache_key, profile)
+            return profile
+        else:
+            return {"status": "error", "message": "No user profile found in database."}
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to retrieve profile: {str(e)}"}
 
-    difficulty = "Intermediate"    except Exception as e:
-
-    if user_age < 18 or weight > 250 or user_age > 60:        return {"status": "error", "message": f"Failed to save profile: {str(e)}"}
-
-        difficulty = "Beginner"
 
+def save_session(user_id: int, user_name: str, profile_data: dict, workout_plan: dict) -> dict:
+    """Save a user session with profile and workout plan.
     
-
-    exercises_by_part = get_exercises_by_goal_and_body_part(goal, body_parts, difficulty)def get_latest_user_profile() -> dict:
-
-        """Retrieve the most recently created user profile from the database."""
-
-    weekly_plan = {    try:
-
-        "user_name": profile.get("name"),        init_database()
-
-        "goal": goal,        conn = sqlite3.connect(DB_PATH)
-
-        "difficulty": difficulty,        cursor = conn.cursor()
-
-        "frequency": {        cursor.execute(
-
-            "Weight Loss": "5-6 days per week",            """
-
-            "Strength Building": "4-5 days per week",            SELECT id, name, age, height, weight, exercise_goal, injury
-
-            "Cardio": "4-6 days per week",            FROM user_profiles
-
-        }.get(goal, "4-5 days per week"),            ORDER BY created_at DESC
-
-        "weekly_schedule": {            LIMIT 1
-
-            "Monday": {            """
-
-                "focus": list(exercises_by_part.keys())[0] if exercises_by_part else "Rest",        )
-
-                "exercises": list(exercises_by_part.values())[0] if exercises_by_part else [],        row = cursor.fetchone()
-
-            },        conn.close()
-
-            "Tuesday": {        if row:
-
-                "focus": list(exercises_by_part.keys())[1] if len(exercises_by_part) > 1 else "Rest",            return {
-
-                "exercises": list(exercises_by_part.values())[1] if len(exercises_by_part) > 1 else [],                "status": "success",
-
-            },                "profile_id": row[0],
-
-            "Wednesday": {"focus": "Rest or Light Cardio", "exercises": []},                "name": row[1],
-
-            "Thursday": {                "age": row[2],
-
-                "focus": list(exercises_by_part.keys())[2] if len(exercises_by_part) > 2 else "Rest",                "height": row[3],
-
-                "exercises": list(exercises_by_part.values())[2] if len(exercises_by_part) > 2 else [],                "weight": row[4],
-
-            },                "exercise_goal": row[5],
-
-            "Friday": {                "injury": row[6],
-
-                "focus": list(exercises_by_part.keys())[3] if len(exercises_by_part) > 3 else "Rest",            }
-
-                "exercises": list(exercises_by_part.values())[3] if len(exercises_by_part) > 3 else [],        else:
-
-            },            return {"status": "error", "message": "No user profile found in database."}
-
-            "Saturday": {"focus": "Active Recovery or Light Stretching", "exercises": []},    except Exception as e:
-
-            "Sunday": {"focus": "Rest Day", "exercises": []},        return {"status": "error", "message": f"Failed to retrieve profile: {str(e)}"}
-
-        },
-
-    }
-
-    def save_session(user_id: int, user_name: str, profile_data: dict, workout_plan: dict) -> dict:
-
-    if injury and injury.lower() != "none":    """Save a user session with profile and workout plan.
-
-        weekly_plan["injury_modifications"] = (    
-
-            f"⚠️  Important: {profile.get('name')}, you have '{injury}'. "    Args:
-
-            "Please avoid high-impact exercises and consult with a physical therapist. "        user_id: User profile ID from user_profiles table.
-
-            "Low-impact alternatives recommended."        user_name: User's name.
-
-        )        profile_data: Complete user profile dictionary.
-
-            workout_plan: Generated weekly workout plan.
-
-    return weekly_plan        
-
+    Args:
+        user_id: User profile ID from user_profiles table.
+        user_name: User's name.
+        profile_data: Complete user profile dictionary.
+        workout_plan: Generated weekly workout plan.
+        
     Returns:
-
         Session save status with session ID.
+    """
+    try:
+        init_sessions_database()
+        if write_behind_enabled():
+            # Committed by the session writer thread with other queued writes.
+            session_id = session_writer(SESSIONS_PATH).save_session(
+                user_id, user_name, profile_data, workout_plan
+            )
+        else:
+            conn = get_connection(SESSIONS_PATH)
+            cursor = conn.cursor()
+            
+            # Profile and plan are stored once per content hash; the row keeps
+            # only the references and the plan's per-user fields.
+            with conn:
+                cursor.execute(
+                    """
+                    INSERT INTO sessions (user_id, user_name, profile_data, workout_plan,
+                                          profile_hash, plan_hash, payload_format)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (user_id, user_name)
+                    + session_payload_values(conn, profile_data, workout_plan, WRITE_FORMAT)
+                    + (WRITE_FORMAT,),
+                )
+            session_id = cursor.lastrowid
+        usercache.invalidate(SESSIONS_PATH, user_name)
+        
+        return {
+            "status": "success",
+            "session_id": session_id,
+            "user_id": user_id,
+            "message": f"✅ Session saved! Session ID: {session_id}",
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to save session: {str(e)}"}
 
-root_agent = Agent(    """
-
-    model="gemini-2.5-flash-lite",    try:
-
-    name="root_agent",        init_sessions_database()
-
-    description="Exercise Planner - Generates personalized weekly workout plans based on user profile and fitness goals.",        conn = sqlite3.connect(SESSIONS_PATH)
-
-    instruction=(        cursor = conn.cursor()
-
-        "You are a friendly Exercise Planner Assistant. Your role is to help users create personalized workout plans.\n\n"        
-
-        "**WORKFLOW:**\n\n"        profile_json = json.dumps(profile_data)
-
-        "**STEP 1: COLLECT USER PROFILE**\n"        plan_json = json.dumps(workout_plan)
-
-        "1. Greet the user warmly\n"        
-
-        "2. Use 'collect_user_profile_form' tool to display the form structure\n"        cursor.execute(
-
-        "3. Collect the user's responses for each field:\n"            """
-
-        "   - Full Name\n"            INSERT INTO sessions (user_id, user_name, profile_data, workout_plan)
-
-        "   - Age (13-120 years)\n"            VALUES (?, ?, ?, ?)
-
-        "   - Height (e.g., 5'10\", 180 cm)\n"            """,
-
-        "   - Weight (50-500 lbs)\n"            (user_id, user_name, profile_json, plan_json),
-
-        "   - Fitness Goal (Weight Loss, Strength Building, or Cardio)\n"        )
-
-        "   - Injuries/Limitations (optional)\n"        conn.commit()
-
-        "4. Present each field one at a time in a friendly manner\n"        session_id = cursor.lastrowid
-
-        "5. Wait for user input before moving to the next field\n\n"        conn.close()
-
-        "**STEP 2: VALIDATE PROFILE**\n"        
-
-        "Once you have all the information:\n"        return {
-
-        "1. Call 'validate_user_profile' with all the collected information\n"            "status": "success",
-
-        "2. If validation fails, ask the user to correct the invalid field\n"            "session_id": session_id,
-
-        "3. If validation succeeds, proceed to STEP 3\n\n"            "user_id": user_id,
-
-        "**STEP 3: GENERATE WORKOUT PLAN**\n"            "message": f"✅ Session saved! Session ID: {session_id}",
-
-        "1. Use 'generate_weekly_workout_plan' tool with the validated profile\n"        }
-
-        "2. Present the weekly schedule clearly with:\n"    except Exception as e:
-
-        "   - Each day's focus area\n"        return {"status": "error", "message": f"Failed to save session: {str(e)}"}
-
-        "   - Specific exercises recommended\n"
-
-        "   - Sets and reps guidance\n"
-
-        "3. Include any injury modifications if needed\n"def get_user_sessions(user_name: str) -> dict:
-
-        "4. Provide recommendations for workout frequency and recovery\n\n"    """Retrieve all sessions for a specific user by name.
-
-        "**IMPORTANT GUIDELINES:**\n"    
-
-        "- Be warm, encouraging, and supportive\n"    Args:
-
-        "- Make the process conversational and easy to follow\n"        user_name: User's name to search for sessions.
-
-        "- Ask clarifying questions if needed\n"        
-
-        "- Provide safety tips and form guidance\n"    Returns:
-
-        "- Remind users to consult a doctor if they have serious injuries\n"        List of sessions with profile and workout plan data.
-
-        "- Suggest proper warm-up and cool-down routines\n"    """
-
-        "- Emphasize the importance of rest days and recovery\n"    try:
-
-        "- Be adaptable to user questions about nutrition, recovery, etc.\n"        init_sessions_database()
-
-    ),        conn = sqlite3.connect(SESSIONS_PATH)
-
-    tools=[        cursor = conn.cursor()
-
-        collect_user_profile_form,        
-
-        validate_user_profile,        cursor.execute(
-
-        generate_weekly_workout_plan,            """
 
-    ],            SELECT session_id, user_id, profile_data, workout_plan, 
+SESSION_DETAIL_FIELDS = ("profile", "workout_plan", "refinement_history")
 
-)                   refinement_history, created_at, last_updated
 
+def get_user_sessions(user_name: str, limit: int = 10, cursor: str = "", fields: str = "") -> dict:
+    """Retrieve a page of sessions for a specific user, newest first.
+    
+    Args:
+        user_name: User's name to search for sessions.
+        limit: Maximum number of sessions to return (1-100, default 10).
+        cursor: The 'next_cursor' from a previous page; empty for the first page.
+        fields: Comma-separated detail fields to include: 'profile',
+            'workout_plan', 'refinement_history'. Empty includes all of them;
+            'summary' includes none (IDs, timestamps and refinement counts only).
+        
+    Returns:
+        A page of sessions with the requested fields and a cursor for the next page.
+    """
+    try:
+        if fields.strip().lower() == "summary":
+            selected = ()
+        elif fields.strip():
+            selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+            unknown = [f for f in selected if f not in SESSION_DETAIL_FIELDS]
+            if unknown:
+                return {"status": "error", "message": f"Unknown session fields: {', '.join(unknown)}"}
+        else:
+            selected = SESSION_DETAIL_FIELDS
+        limit = max(1, min(int(limit), 100))
+        
+        init_sessions_database()
+        # Every session write invalidates its user's entries after queueing
+        # or committing, so a hit needs no await_pending_writes.
+        cache_key = usercache.key(
+            SESSIONS_PATH, user_name, "sessions", limit, cursor, selected, compact_enabled()
+        )
+        cached = usercache.get(cache_key)
+        if cached is not None:
+            return cached
+        await_pending_writes(SESSIONS_PATH, user_name=user_name)
+        conn = get_connection(SESSIONS_PATH)
+        
+        columns = ["session_id", "user_id", "created_at", "last_updated", "refinement_count"]
+        if "profile" in selected or "workout_plan" in selected:
+            columns.append("payload_format")
+        if "profile" in selected:
+            columns += ["profile_data", "profile_hash"]
+        if "workout_plan" in selected:
+            columns += ["workout_plan", "plan_hash"]
+        where = "user_name = ?"
+        params = [user_name]
+        if cursor:
+            cursor_updated, _, cursor_session_id = cursor.rpartition("|")
+            where += " AND (last_updated < ? OR (last_updated = ? AND session_id < ?))"
+            params += [cursor_updated, cursor_updated, int(cursor_session_id)]
+        rows = conn.execute(
+            f"""
+            SELECT {", ".join(columns)}
             FROM sessions
-            WHERE user_name = ?
-            ORDER BY last_updated DESC
+            WHERE {where}
+            ORDER BY last_updated DESC, session_id DESC
+            LIMIT ?
             """,
-            (user_name,),
-        )
-        rows = cursor.fetchall()
-        conn.close()
+            params + [limit + 1],
+        ).fetchall()
         
         if rows:
+            page = rows[:limit]
+            histories = {}
+            if "refinement_history" in selected:
+                histories = _load_refinement_histories(conn, [row[0] for row in page])
+            page_values = [dict(zip(columns, row)) for row in page]
+            payloads = load_session_payloads(
+                conn,
+                [
+                    (values.get("profile_data"), values.get("workout_plan"),
+                     values.get("payload_format"), values.get("profile_hash"),
+                     values.get("plan_hash"))
+                    for values in page_values
+                ],
+            )
             sessions_list = []
-            for row in rows:
-                sessions_list.append({
-                    "session_id": row[0],
-                    "user_id": row[1],
-                    "profile": json.loads(row[2]),
-                    "workout_plan": json.loads(row[3]),
-                    "refinement_history": json.loads(row[4]),
-                    "created_at": row[5],
-                    "last_updated": row[6],
-                })
+            for row, values, (profile, plan) in zip(page, page_values, payloads):
+                session = {"session_id": row[0], "user_id": row[1]}
+                if "profile_data" in values:
+                    session["profile"] = profile
+                if "workout_plan" in values:
+                    session["workout_plan"] = compact_plan(plan) if compact_enabled() else plan
+                if "refinement_history" in selected:
+                    session["refinement_history"] = histories.get(row[0], [])
+                session["refinement_count"] = values["refinement_count"]
+                session["created_at"] = values["created_at"]
+                session["last_updated"] = values["last_updated"]
+                sessions_list.append(session)
             
-            return {
+            last = page[-1]
+            result = {
                 "status": "success",
                 "user_name": user_name,
                 "sessions_count": len(sessions_list),
                 "sessions": sessions_list,
+                "next_cursor": f"{last[3]}|{last[0]}" if len(rows) > limit else None,
             }
         else:
-            return {
+            result = {
                 "status": "not_found",
                 "message": f"No sessions found for user '{user_name}'",
             }
+        usercache.put(cache_key, result)
+        return result
     except Exception as e:
         return {"status": "error", "message": f"Failed to retrieve sessions: {str(e)}"}
 
@@ -630,46 +437,82 @@ def get_latest_user_session(user_name: str) -> dict:
     """
     try:
         init_sessions_database()
-        conn = sqlite3.connect(SESSIONS_PATH)
+        cache_key = usercache.key(SESSIONS_PATH, user_name, "latest_session", compact_enabled())
+        cached = usercache.get(cache_key)
+        if cached is not None:
+            return cached
+        await_pending_writes(SESSIONS_PATH, user_name=user_name)
+        conn = get_connection(SESSIONS_PATH)
         cursor = conn.cursor()
         
         cursor.execute(
             """
             SELECT session_id, user_id, profile_data, workout_plan, 
-                   refinement_history, created_at, last_updated
+                   created_at, last_updated, payload_format, profile_hash, plan_hash
             FROM sessions
             WHERE user_name = ?
-            ORDER BY last_updated DESC
+            ORDER BY last_updated DESC, session_id DESC
             LIMIT 1
             """,
             (user_name,),
         )
         row = cursor.fetchone()
-        conn.close()
         
         if row:
-            return {
+            histories = _load_refinement_histories(conn, [row[0]])
+            ((profile, plan),) = load_session_payloads(conn, [(row[2], row[3], row[6], row[7], row[8])])
+            result = {
                 "status": "success",
                 "session_id": row[0],
                 "user_id": row[1],
-                "profile": json.loads(row[2]),
-                "workout_plan": json.loads(row[3]),
-                "refinement_history": json.loads(row[4]),
-                "created_at": row[5],
-                "last_updated": row[6],
+                "profile": profile,
+                "workout_plan": compact_plan(plan) if compact_enabled() else plan,
+                "refinement_history": histories.get(row[0], []),
+                "created_at": row[4],
+                "last_updated": row[5],
             }
         else:
-            return {
+            result = {
                 "status": "not_found",
                 "message": f"No session found for user '{user_name}'",
             }
+        usercache.put(cache_key, result)
+        return result
     except Exception as e:
         return {"status": "error", "message": f"Failed to retrieve session: {str(e)}"}
 
 
+def _load_refinement_histories(conn, session_ids: list) -> dict:
+    """Reassemble refinement histories for several sessions in one query."""
+    histories = {}
+    if not session_ids:
+        return histories
+    placeholders = ", ".join("?" for _ in session_ids)
+    rows = conn.execute(
+        f"""
+        SELECT session_id, created_at, refinement_type, details, details_format
+        FROM session_refinements
+        WHERE session_id IN ({placeholders})
+        ORDER BY session_id, refinement_id
+        """,
+        session_ids,
+    )
+    for session_id, created_at, refinement_type, details, details_format in rows:
+        histories.setdefault(session_id, []).append({
+            "timestamp": created_at,
+            "type": refinement_type,
+            "details": loads(details, details_format),
+        })
+    return histories
+
+
 def add_refinement_to_session(session_id: int, refinement_type: str, refinement_details: dict) -> dict:
     """Add a refinement request to an existing session's history.
     
+    Refinements are appended as rows of the session_refinements table, so the
+    cost does not grow with the length of the history and concurrent
+    refinements of one session cannot overwrite each other.
+    
     Args:
         session_id: Session ID to update.
         refinement_type: Type of refinement (e.g., 'difficulty_increase', 'focus_change').
@@ -680,118 +523,406 @@ def add_refinement_to_session(session_id: int, refinement_type: str, refinement_
     """
     try:
         init_sessions_database()
-        conn = sqlite3.connect(SESSIONS_PATH)
+        if write_behind_enabled():
+            queued = session_writer(SESSIONS_PATH).add_refinement(
+                session_id, refinement_type, refinement_details
+            )
+            if queued is None:
+                return {"status": "error", "message": f"Session {session_id} not found"}
+            user_name, refinement_count = queued
+            usercache.invalidate(SESSIONS_PATH, user_name)
+            return {
+                "status": "success",
+                "session_id": session_id,
+                "refinement_count": refinement_count,
+                "message": f"✅ Refinement logged to session {session_id}",
+            }
+        conn = get_connection(SESSIONS_PATH)
         cursor = conn.cursor()
         
-        # Get current refinement history
-        cursor.execute(
-            "SELECT refinement_history FROM sessions WHERE session_id = ?",
-            (session_id,),
-        )
-        row = cursor.fetchone()
-        
-        if not row:
-            conn.close()
-            return {"status": "error", "message": f"Session {session_id} not found"}
+        with conn:
+            cursor.execute(
+                """
+                UPDATE sessions
+                SET refinement_count = refinement_count + 1,
+                    last_updated = CURRENT_TIMESTAMP
+                WHERE session_id = ?
+                """,
+                (session_id,),
+            )
+            if cursor.rowcount == 0:
+                return {"status": "error", "message": f"Session {session_id} not found"}
+            cursor.execute(
+                """
+                INSERT INTO session_refinements
+                    (session_id, created_at, refinement_type, details, details_format)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    session_id,
+                    datetime.now().isoformat(),
+                    refinement_type,
+                    dumps(refinement_details, WRITE_FORMAT),
+                    WRITE_FORMAT,
+                ),
+            )
+            cursor.execute(
+                "SELECT refinement_count, user_name FROM sessions WHERE session_id = ?",
+                (session_id,),
+            )
+            refinement_count, user_name = cursor.fetchone()
+        # The refinement also makes this the user's latest session.
+        usercache.invalidate(SESSIONS_PATH, user_name)
         
-        refinement_history = json.loads(row[0])
-        
-        # Add new refinement
-        refinement_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "type": refinement_type,
-            "details": refinement_details,
+        return {
+            "status": "success",
+            "session_id": session_id,
+            "refinement_count": refinement_count,
+            "message": f"✅ Refinement logged to session {session_id}",
         }
-        refinement_history.append(refinement_entry)
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to add refinement: {str(e)}"}
+
+
+def get_session_refinements(session_id: int, after_refinement_id: int = 0, limit: int = 20) -> dict:
+    """Page through the refinement history of a session, oldest first.
+    
+    Args:
+        session_id: Session ID whose refinements to list.
+        after_refinement_id: Return refinements after this ID (0 for the first page).
+        limit: Maximum number of refinements to return (1-100).
         
-        # Update session
-        cursor.execute(
+    Returns:
+        A page of refinements and the cursor for the next page, if any.
+    """
+    try:
+        init_sessions_database()
+        await_pending_writes(SESSIONS_PATH, session_id=session_id)
+        conn = get_connection(SESSIONS_PATH)
+        limit = max(1, min(int(limit), 100))
+        rows = conn.execute(
             """
-            UPDATE sessions
-            SET refinement_history = ?, last_updated = CURRENT_TIMESTAMP
-            WHERE session_id = ?
+            SELECT refinement_id, created_at, refinement_type, details, details_format
+            FROM session_refinements
+            WHERE session_id = ? AND refinement_id > ?
+            ORDER BY refinement_id
+            LIMIT ?
             """,
-            (json.dumps(refinement_history), session_id),
-        )
-        conn.commit()
-        conn.close()
-        
+            (session_id, after_refinement_id, limit + 1),
+        ).fetchall()
+        page = rows[:limit]
         return {
             "status": "success",
             "session_id": session_id,
-            "refinement_count": len(refinement_history),
-            "message": f"✅ Refinement logged to session {session_id}",
+            "refinements": [
+                {
+                    "refinement_id": row[0],
+                    "timestamp": row[1],
+                    "type": row[2],
+                    "details": loads(row[3], row[4]),
+                }
+                for row in page
+            ],
+            "next_after_refinement_id": page[-1][0] if len(rows) > limit else None,
         }
     except Exception as e:
-        return {"status": "error", "message": f"Failed to add refinement: {str(e)}"}
+        return {"status": "error", "message": f"Failed to retrieve refinements: {str(e)}"}
+
+
+def get_archived_sessions(user_name: str, limit: int = 5, before_session_id: int = 0) -> dict:
+    """Retrieve a user's archived (older) sessions, newest first.
+    
+    Sessions past the retention window are moved out of the live session
+    list by the retention job, except each user's most recent ones. Use this
+    when the user asks about history older than 'get_user_sessions' returns.
+    
+    Args:
+        user_name: User's name to search for archived sessions.
+        limit: Maximum number of sessions to return (1-20, default 5).
+        before_session_id: The 'next_before_session_id' from a previous page;
+            0 for the first page.
+        
+    Returns:
+        A page of archived sessions with profile, plan and refinement history.
+    """
+    try:
+        init_sessions_database()
+        conn = get_connection(SESSIONS_PATH)
+        limit = max(1, min(int(limit), 20))
+        rows = conn.execute(
+            """
+            SELECT session_id, archive_file, frame_offset
+            FROM archived_sessions
+            WHERE user_name = ? AND session_id < ?
+            ORDER BY session_id DESC
+            LIMIT ?
+            """,
+            (user_name, int(before_session_id) or 2**63 - 1, limit + 1),
+        ).fetchall()
+        if not rows:
+            return {
+                "status": "not_found",
+                "message": f"No archived sessions found for user '{user_name}'",
+            }
+        page = rows[:limit]
+        sessions_list = load_archived_sessions(SESSIONS_PATH, page)
+        if compact_enabled():
+            for session in sessions_list:
+                session["workout_plan"] = compact_plan(session["workout_plan"])
+        return {
+            "status": "success",
+            "user_name": user_name,
+            "sessions_count": len(sessions_list),
+            "sessions": sessions_list,
+            "next_before_session_id": page[-1][0] if len(rows) > limit else None,
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to retrieve archived sessions: {str(e)}"}
 
 
 def load_gym_dataset() -> list:
     """Load exercises from the CSV dataset."""
-    exercises = []
-    try:
-        with open(DATASET_PATH, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                exercises.append(row)
-    except FileNotFoundError:
-        return []
-    return exercises
+    return read_dataset_rows(DATASET_PATH)
+
+
+GOAL_EXERCISE_TYPES = {
+    "Weight Loss": ["Cardio", "Plyometrics"],
+    "Strength Building": ["Strength"],
+    "Cardio": ["Cardio", "Plyometrics"],
+}
+
+GOAL_BODY_PARTS = {
+    "Weight Loss": ["Abdominals", "Legs", "Back", "Chest"],
+    "Strength Building": ["Back", "Chest", "Legs", "Abdominals"],
+    "Cardio": ["Abdominals", "Legs", "Cardiovascular"],
+}
+
+
+def exercise_summary(ex) -> dict:
+    """Format a catalog row as the exercise entry used in workout plans.
+
+    Compact responses shorten descriptions, so in that mode the entry also
+    carries ``exercise_id`` (the row's index in the dataset), which
+    ``get_exercise_details`` accepts.
+    """
+    summary = {
+        "title": ex.get("Title", "Unknown"),
+        "description": ex.get("Desc", "No description"),
+        "equipment": ex.get("Equipment", "Bodyweight"),
+        "rating": ex.get("Rating", "N/A"),
+    }
+    if compact_enabled():
+        summary = {"exercise_id": ex.row_id, **summary}
+    return summary
 
 
 def get_exercises_by_goal_and_body_part(
-    goal: str, body_parts: list, difficulty: str = "Intermediate"
+    goal: str,
+    body_parts: list,
+    difficulty: str = "Intermediate",
+    k: int = 5,
+    min_rating: Optional[float] = None,
+    available_equipment: str = "",
+    injury: str = "",
 ) -> dict:
-    """Filters exercises from the dataset based on goal and body parts."""
-    exercises = load_gym_dataset()
+    """Select the top-rated exercises for a goal, per body part.
+    
+    Exercises are ranked by rating, highest first, with ties in dataset
+    order; unrated exercises come after rated ones.
+    
+    Args:
+        goal: Exercise goal ("Weight Loss", "Strength Building", or "Cardio").
+        body_parts: Body parts to select exercises for.
+        difficulty: Exercise level (default: "Intermediate").
+        k: Maximum number of exercises per body part (default: 5).
+        min_rating: Only include exercises rated at least this much; unrated
+            exercises are then excluded.
+        available_equipment: Equipment the user has (e.g., "dumbbells and
+            bands"); empty for any. Body-only exercises are always included.
+        injury: Injuries or limitations (e.g., "bad knee"); exercises that
+            strain the injured area are excluded.
+        
+    Returns:
+        A dictionary mapping each body part with matches to its exercises.
+    """
+    catalog = get_catalog(DATASET_PATH)
+    allowed = allowed_mask(
+        catalog, equipment_values(catalog, available_equipment), injury_tags(injury)
+    )
+    selected = select_exercises(goal, body_parts, difficulty, k, min_rating, allowed)
+    if compact_enabled():
+        return {
+            body_part: [compact_exercise(ex) for ex in exercises]
+            for body_part, exercises in selected.items()
+        }
+    return selected
+
+
+def select_exercises(
+    goal: str,
+    body_parts: list,
+    difficulty: str,
+    k: int = 5,
+    min_rating: Optional[float] = None,
+    allowed: Optional[int] = None,
+) -> dict:
+    """Select top-rated exercises per body part among the ``allowed`` catalog rows."""
+    catalog = get_catalog(DATASET_PATH)
     filtered = {}
-    goal_type_map = {
-        "Weight Loss": ["Cardio", "Plyometrics"],
-        "Strength Building": ["Strength"],
-        "Cardio": ["Cardio", "Plyometrics"],
-    }
-    exercise_types = goal_type_map.get(goal, ["Strength"])
+    exercise_types = GOAL_EXERCISE_TYPES.get(goal, ["Strength"])
     for body_part in body_parts:
-        matching = [
-            ex
-            for ex in exercises
-            if ex.get("Type") in exercise_types
-            and ex.get("BodyPart") == body_part
-            and ex.get("Level") == difficulty
-            and ex.get("Title")
-        ]
+        matching = catalog.top_rated(
+            exercise_types, body_part, difficulty, k, min_rating, allowed
+        )
         if matching:
-            filtered[body_part] = [
-                {
-                    "title": ex.get("Title", "Unknown"),
-                    "description": ex.get("Desc", "No description"),
-                    "equipment": ex.get("Equipment", "Bodyweight"),
-                    "rating": ex.get("Rating", "N/A"),
-                }
-                for ex in matching[:5]
-            ]
+            filtered[body_part] = [exercise_summary(ex) for ex in matching]
     return filtered
 
 
-def generate_weekly_workout_plan_from_profile(profile: dict) -> dict:
-    """Generates a weekly workout plan based on user profile from database."""
-    goal = profile.get("exercise_goal", "Strength Building")
+def search_exercises(
+    query: str, equipment: str = "", level: str = "", body_part: str = "", limit: int = 10
+) -> dict:
+    """Search exercise titles and descriptions with full-text ranking.
+    
+    Use this for free-form requests such as "band exercises for lower back".
+    
+    Args:
+        query: Words to look for in exercise titles and descriptions.
+        equipment: Only return exercises using this equipment (e.g., 'Bands',
+            'Dumbbell', 'Body Only'); empty for any.
+        level: Only return exercises of this level ('Beginner', 'Intermediate',
+            'Expert'); empty for any.
+        body_part: Only return exercises for this body part (e.g., 'Lower Back',
+            'Abdominals'); empty for any.
+        limit: Maximum number of exercises to return (1-50, default 10).
+        
+    Returns:
+        The best-matching exercises, most relevant first.
+    """
+    try:
+        catalog = get_catalog(DATASET_PATH)
+        results = []
+        for row_id, score in search_exercise_index(
+            DATASET_PATH, query, equipment, level, body_part, limit
+        ):
+            ex = catalog.row(row_id)
+            result = {
+                **exercise_summary(ex),
+                "type": ex.get("Type"),
+                "body_part": ex.get("BodyPart"),
+                "level": ex.get("Level"),
+                "score": round(-score, 3),
+            }
+            results.append(compact_exercise(result) if compact_enabled() else result)
+        return {
+            "status": "success" if results else "not_found",
+            "query": query,
+            "count": len(results),
+            "exercises": results,
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to search exercises: {str(e)}"}
+
+
+MAX_EXERCISE_DETAILS = 20
+
+
+def get_exercise_details(exercise_ids: list[int]) -> dict:
+    """Return the full catalog entries for exercises referenced by ID.
+    
+    Plans and search results may shorten descriptions; use this when the
+    user asks how to perform a specific exercise.
+    
+    Args:
+        exercise_ids: Integer 'exercise_id' values from a plan or search result
+            (up to 20).
+        
+    Returns:
+        The full exercise entries, plus any IDs that were not found.
+    """
+    try:
+        catalog = get_catalog(DATASET_PATH)
+        exercises = []
+        not_found = []
+        for exercise_id in list(dict.fromkeys(exercise_ids))[:MAX_EXERCISE_DETAILS]:
+            try:
+                row_id = int(exercise_id)
+            except (TypeError, ValueError):
+                not_found.append(exercise_id)
+                continue
+            if not 0 <= row_id < len(catalog):
+                not_found.append(exercise_id)
+                continue
+            ex = catalog.row(row_id)
+            exercises.append({
+                "exercise_id": row_id,
+                **exercise_summary(ex),
+                "type": ex.get("Type"),
+                "body_part": ex.get("BodyPart"),
+                "level": ex.get("Level"),
+                "rating_description": ex.get("RatingDesc"),
+            })
+        return {
+            "status": "success" if exercises else "not_found",
+            "exercises": exercises,
+            "not_found": not_found,
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to retrieve exercise details: {str(e)}"}
+
+
+PLAN_TEMPLATE_CACHE_SIZE = 64
+
+
+def plan_difficulty(profile: dict) -> str:
+    """Derive the difficulty bucket for a profile from age and weight."""
     user_age = profile.get("age", 30)
-    injury = profile.get("injury", "None")
     weight = profile.get("weight", 170)
-    goal_body_parts = {
-        "Weight Loss": ["Abdominals", "Legs", "Back", "Chest"],
-        "Strength Building": ["Back", "Chest", "Legs", "Abdominals"],
-        "Cardio": ["Abdominals", "Legs", "Cardiovascular"],
-    }
-    body_parts = goal_body_parts.get(goal, ["Abdominals", "Chest", "Back"])
-    difficulty = "Intermediate"
     if user_age < 18 or weight > 250 or user_age > 60:
-        difficulty = "Beginner"
-    exercises_by_part = get_exercises_by_goal_and_body_part(goal, body_parts, difficulty)
-    weekly_plan = {
-        "profile_id": profile.get("profile_id"),
-        "user_name": profile.get("name"),
+        return "Beginner"
+    return "Intermediate"
+
+
+def plan_body_parts(goal: str) -> list:
+    """Return the body parts a goal's weekly plan trains, in schedule order."""
+    return GOAL_BODY_PARTS.get(goal, ["Abdominals", "Chest", "Back"])
+
+
+def build_plan_template(
+    goal: str,
+    difficulty: str,
+    exercises_by_part: Optional[dict] = None,
+    equipment: Optional[tuple] = None,
+    injuries: tuple = (),
+) -> dict:
+    """Build the user-independent part of a weekly plan.
+    
+    Args:
+        goal: Exercise goal.
+        difficulty: Difficulty bucket from plan_difficulty().
+        exercises_by_part: Pre-selected exercises per body part; looked up in
+            the catalog when omitted.
+        equipment: Allowed equipment values from equipment_values() (None for any).
+        injuries: Injury tags from injury_tags() whose exercises are excluded.
+        
+    Returns:
+        The goal, difficulty, frequency, weekly schedule and, when constrained,
+        the applied constraints.
+    """
+    if exercises_by_part is None:
+        allowed = allowed_mask(get_catalog(DATASET_PATH), equipment, injuries)
+        exercises_by_part = select_exercises(
+            goal, plan_body_parts(goal), difficulty, allowed=allowed
+        )
+    training_days = list(exercises_by_part.items())
+
+    def training_day(i: int) -> dict:
+        if i < len(training_days):
+            focus, exercises = training_days[i]
+            return {"focus": focus, "exercises": exercises}
+        return {"focus": "Rest", "exercises": []}
+
+    template = {
         "goal": goal,
         "difficulty": difficulty,
         "frequency": {
@@ -800,101 +931,233 @@ def generate_weekly_workout_plan_from_profile(profile: dict) -> dict:
             "Cardio": "4-6 days per week",
         }.get(goal, "4-5 days per week"),
         "weekly_schedule": {
-            "Monday": {
-                "focus": list(exercises_by_part.keys())[0] if exercises_by_part else "Rest",
-                "exercises": list(exercises_by_part.values())[0] if exercises_by_part else [],
-            },
-            "Tuesday": {
-                "focus": list(exercises_by_part.keys())[1] if len(exercises_by_part) > 1 else "Rest",
-                "exercises": list(exercises_by_part.values())[1] if len(exercises_by_part) > 1 else [],
-            },
+            "Monday": training_day(0),
+            "Tuesday": training_day(1),
             "Wednesday": {"focus": "Rest or Light Cardio", "exercises": []},
-            "Thursday": {
-                "focus": list(exercises_by_part.keys())[2] if len(exercises_by_part) > 2 else "Rest",
-                "exercises": list(exercises_by_part.values())[2] if len(exercises_by_part) > 2 else [],
-            },
-            "Friday": {
-                "focus": list(exercises_by_part.keys())[3] if len(exercises_by_part) > 3 else "Rest",
-                "exercises": list(exercises_by_part.values())[3] if len(exercises_by_part) > 3 else [],
-            },
+            "Thursday": training_day(2),
+            "Friday": training_day(3),
             "Saturday": {"focus": "Active Recovery or Light Stretching", "exercises": []},
             "Sunday": {"focus": "Rest Day", "exercises": []},
         },
     }
+    if equipment is not None or injuries:
+        template["constraints"] = {
+            "available_equipment": list(equipment) if equipment is not None else None,
+            "injury_exclusions": list(injuries),
+        }
+    return template
+
+
+def _plan_templates() -> LRUCache:
+    """Return the plan template cache for the current catalog.
+
+    The cache lives on the catalog object, so reloading the catalog after the
+    dataset changes starts from an empty cache.
+    """
+    derived = get_catalog(DATASET_PATH).derived
+    templates = derived.get("plan_templates")
+    if templates is None:
+        templates = derived.setdefault("plan_templates", LRUCache(PLAN_TEMPLATE_CACHE_SIZE))
+    return templates
+
+
+def plan_template_cache_stats() -> dict:
+    """Return hit/miss counters for the weekly plan template cache."""
+    return _plan_templates().stats()
+
+
+def plan_constraints(profile: dict, available_equipment: str = "") -> tuple:
+    """Resolve a profile's equipment and injury text to (equipment, injury tags)."""
+    available_equipment = available_equipment or profile.get("available_equipment") or ""
+    equipment = None
+    if available_equipment:
+        equipment = equipment_values(get_catalog(DATASET_PATH), available_equipment)
+    return equipment, injury_tags(profile.get("injury", "None"))
+
+
+def generate_weekly_workout_plan_from_profile(profile: dict, available_equipment: str = "") -> dict:
+    """Generates a weekly workout plan based on user profile from database.
+    
+    Exercises that strain an injury named in the profile's 'injury' field
+    (e.g., knee, back, shoulder) are left out of the plan.
+    
+    Args:
+        profile: User profile (as returned by get_latest_user_profile).
+        available_equipment: Equipment the user has (e.g., "dumbbells and
+            bands"); empty for a fully equipped gym.
+        
+    Returns:
+        The weekly workout plan.
+    """
+    goal = profile.get("exercise_goal", "Strength Building")
+    difficulty = plan_difficulty(profile)
+    equipment, injuries = plan_constraints(profile, available_equipment)
+    
+    # The schedule depends only on goal, difficulty, constraints and the
+    # response mode; build it once per combination and overlay the per-user
+    # fields on a fresh copy.
+    compact = compact_enabled()
+    key = (goal, difficulty, equipment, injuries, compact)
+    templates = _plan_templates()
+    template = templates.get(key)
+    if template is None:
+        template = build_plan_template(goal, difficulty, equipment=equipment, injuries=injuries)
+        if compact:
+            template = compact_plan(template)
+        templates.set(key, template)
+    return plan_from_template(template, profile, compact)
+
+
+def plan_from_template(template: dict, profile: dict, compact: bool = False) -> dict:
+    """Overlay a profile's per-user fields on a copy of a plan template.
+    
+    A compact plan names the injury instead of the injury warning paragraph.
+    """
+    injury = profile.get("injury", "None")
+    weekly_plan = {
+        "profile_id": profile.get("profile_id"),
+        "user_name": profile.get("name"),
+        "goal": template["goal"],
+        "difficulty": template["difficulty"],
+        "frequency": template["frequency"],
+        "weekly_schedule": {
+            day: {"focus": entry["focus"], "exercises": [dict(ex) for ex in entry["exercises"]]}
+            for day, entry in template["weekly_schedule"].items()
+        },
+    }
+    if "constraints" in template:
+        constraints = template["constraints"]
+        weekly_plan["constraints"] = {
+            "available_equipment": (
+                list(constraints["available_equipment"])
+                if constraints["available_equipment"] is not None
+                else None
+            ),
+            "injury_exclusions": list(constraints["injury_exclusions"]),
+        }
     if injury and injury.lower() != "none":
-        weekly_plan["injury_modifications"] = (
-            f"⚠️  Important: {profile.get('name')}, you have '{injury}'. "
-            "Please avoid high-impact exercises and consult with a physical therapist. "
-            "Low-impact alternatives recommended."
-        )
+        if compact:
+            weekly_plan["injury"] = injury
+        else:
+            weekly_plan["injury_modifications"] = (
+                f"⚠️  Important: {profile.get('name')}, you have '{injury}'. "
+                "Please avoid high-impact exercises and consult with a physical therapist. "
+                "Low-impact alternatives recommended."
+            )
     return weekly_plan
 
 
-root_agent = Agent(
-    model="gemini-2.5-flash-lite",
-    name="root_agent",
-    description="Sequential Exercise Planner - Collects user profile, generates personalized workout plans, and manages session history for refinements.",
-    instruction=(
-        "You are an Exercise Planner Assistant. Your role is to help users get personalized workout plans and refine them based on feedback.\n\n"
-        "**WORKFLOW:**\n\n"
-        "**AT START: Check for Existing Sessions**\n"
-        "When a user greets you or starts a conversation:\n"
-        "1. Ask for their name\n"
-        "2. Use 'get_latest_user_session' to check if they have a previous session\n"
-        "3. If found: Show their previous profile and plan, ask if they want to refine it or create new\n"
-        "4. If not found: Proceed to STEP 1 (new profile)\n\n"
-        "**STEP 1: DISPLAY USER PROFILE FORM (New Users Only)**\n"
-        "Use the 'collect_user_profile_form' tool to display an interactive form structure.\n"
-        "Then collect the user's responses for each field:\n"
-        "- Full Name\n"
-        "- Age (13-120 years)\n"
-        "- Height (e.g., 5'10\", 180 cm)\n"
-        "- Weight (50-500 lbs)\n"
-        "- Fitness Goal (Weight Loss, Strength Building, or Cardio)\n"
-        "- Injuries/Limitations (optional, enter 'None' if no injuries)\n\n"
-        "Present each field one at a time in a clear, friendly manner.\n"
-        "Wait for the user to provide each input before moving to the next.\n\n"
-        "**STEP 2: SAVE THE PROFILE**\n"
-        "Once you have collected all fields, call 'save_user_profile' with all the information.\n"
-        "The profile will be saved to the database with validation.\n"
-        "Confirm successful save with the profile ID and summary.\n\n"
-        "**STEP 3: GENERATE PERSONALIZED PLAN**\n"
-        "After saving the profile:\n"
-        "1. Use 'get_latest_user_profile' to retrieve the saved profile from database\n"
-        "2. Use 'generate_weekly_workout_plan_from_profile' to create a personalized weekly plan\n"
-        "3. Present the weekly schedule clearly with each day, focus area, and specific exercises\n\n"
-        "**STEP 4: SAVE SESSION**\n"
-        "After generating the plan:\n"
-        "1. Call 'save_session' with the user_id, name, profile, and workout_plan\n"
-        "2. Store this session for future refinements\n\n"
-        "**STEP 5: PROVIDE GUIDANCE**\n"
-        "- Recommend workout frequency based on their goal\n"
-        "- Provide safety tips and form guidance\n"
-        "- Remind users to consult a doctor if they have serious injuries\n"
-        "- Suggest rest days and recovery strategies\n\n"
-        "**REFINEMENT WORKFLOW (Returning Users)**\n"
-        "If user wants to refine their plan:\n"
-        "1. Ask what they want to refine (difficulty, focus, goal change, injury updates)\n"
-        "2. Update profile if needed and save new profile\n"
-        "3. Generate new plan based on updated profile\n"
-        "4. Use 'add_refinement_to_session' to log the refinement\n"
-        "5. Save new session or update existing one\n\n"
-        "**IMPORTANT NOTES:**\n"
-        "- Always start by checking for existing sessions (ask for name first)\n"
-        "- For returning users, offer to show their previous plan\n"
-        "- Save sessions after every new plan generation\n"
-        "- Log refinements to track user's journey\n"
-        "- Be friendly, encouraging, and supportive throughout\n"
-        "- Make it conversational and easy to understand\n"
-    ),
-    tools=[
-        collect_user_profile_form,
-        save_user_profile,
-        get_latest_user_profile,
-        generate_weekly_workout_plan_from_profile,
-        save_session,
-        get_user_sessions,
-        get_latest_user_session,
-        add_refinement_to_session,
-    ],
-)
+def build_root_agent():
+    """Construct the ADK agent with every tool registered.
+
+    Importing ``google.adk`` dominates start-up, so it happens here, on the
+    first access to ``root_agent``, rather than when this module is imported.
+    """
+    from google.adk.agents.llm_agent import Agent
+
+    exercise_details_note = (
+        "- Exercises carry an 'exercise_id' and have shortened descriptions; call 'get_exercise_details' with the IDs when the user wants full instructions\n"
+        if compact_enabled()
+        else ""
+    )
+    return Agent(
+        model="gemini-2.5-flash-lite",
+        name="root_agent",
+        description="Sequential Exercise Planner - Collects user profile, generates personalized workout plans, and manages session history for refinements.",
+        instruction=(
+            "You are an Exercise Planner Assistant. Your role is to help users get personalized workout plans and refine them based on feedback.\n\n"
+            "**WORKFLOW:**\n\n"
+            "**AT START: Check for Existing Sessions**\n"
+            "When a user greets you or starts a conversation:\n"
+            "1. Ask for their name\n"
+            "2. Use 'get_latest_user_session' to check if they have a previous session\n"
+            "3. If found: Show their previous profile and plan, ask if they want to refine it or create new\n"
+            "4. If not found: Proceed to STEP 1 (new profile)\n\n"
+            "**STEP 1: DISPLAY USER PROFILE FORM (New Users Only)**\n"
+            "Use the 'collect_user_profile_form' tool to display an interactive form structure.\n"
+            "Then collect the user's responses for each field:\n"
+            "- Full Name\n"
+            "- Age (13-120 years)\n"
+            "- Height (e.g., 5'10\", 180 cm)\n"
+            "- Weight (50-500 lbs)\n"
+            "- Fitness Goal (Weight Loss, Strength Building, or Cardio)\n"
+            "- Injuries/Limitations (optional, enter 'None' if no injuries)\n\n"
+            "Present each field one at a time in a clear, friendly manner.\n"
+            "Wait for the user to provide each input before moving to the next.\n\n"
+            "**STEP 2: SAVE THE PROFILE**\n"
+            "Once you have collected all fields, call 'save_user_profile' with all the information.\n"
+            "The profile will be saved to the database with validation.\n"
+            "Confirm successful save with the profile ID and summary.\n\n"
+            "**STEP 3: GENERATE PERSONALIZED PLAN**\n"
+            "After saving the profile:\n"
+            "1. Use 'get_latest_user_profile' to retrieve the saved profile from database\n"
+            "2. Use 'generate_weekly_workout_plan_from_profile' to create a personalized weekly plan\n"
+            "   (pass 'available_equipment' if the user only has some equipment, e.g. 'dumbbells and bands';\n"
+            "   exercises that strain the profile's injury are left out automatically)\n"
+            "3. Present the weekly schedule clearly with each day, focus area, and specific exercises\n\n"
+            "**STEP 4: SAVE SESSION**\n"
+            "After generating the plan:\n"
+            "1. Call 'save_session' with the user_id, name, profile, and workout_plan\n"
+            "2. Store this session for future refinements\n\n"
+            "**STEP 5: PROVIDE GUIDANCE**\n"
+            "- Recommend workout frequency based on their goal\n"
+            "- Provide safety tips and form guidance\n"
+            "- Remind users to consult a doctor if they have serious injuries\n"
+            "- Suggest rest days and recovery strategies\n\n"
+            "**REFINEMENT WORKFLOW (Returning Users)**\n"
+            "If user wants to refine their plan:\n"
+            "1. Ask what they want to refine (difficulty, focus, goal change, injury updates)\n"
+            "2. Update profile if needed and save new profile\n"
+            "3. Generate new plan based on updated profile\n"
+            "4. Use 'add_refinement_to_session' to log the refinement\n"
+            "   (use 'get_session_refinements' to page through a long refinement history)\n"
+            "5. Save new session or update existing one\n\n"
+            "**IMPORTANT NOTES:**\n"
+            "- Always start by checking for existing sessions (ask for name first)\n"
+            "- For returning users, offer to show their previous plan\n"
+            "- To list past sessions, call 'get_user_sessions' with fields='summary' first and page with 'next_cursor'\n"
+            "- Older sessions may have been archived; use 'get_archived_sessions' when the user asks for history 'get_user_sessions' does not show\n"
+            "- Save sessions after every new plan generation\n"
+            "- Log refinements to track user's journey\n"
+            "- When a user asks for specific exercises (e.g. 'band exercises for lower back'), use 'search_exercises' with filters instead of guessing\n"
+            + exercise_details_note
+            + "- Be friendly, encouraging, and supportive throughout\n"
+            "- Make it conversational and easy to understand\n"
+        ),
+        # instrument_tool returns the tool unchanged unless AGENT_METRICS is set.
+        tools=[
+            instrument_tool(collect_user_profile_form),
+            # Disk-backed tools run on the bounded tool executor so a slow write
+            # in one conversation does not block the event loop for the others.
+            *[
+                make_async_tool(instrument_tool(tool))
+                for tool in (
+                    save_user_profile,
+                    get_latest_user_profile,
+                    generate_weekly_workout_plan_from_profile,
+                    save_session,
+                    get_user_sessions,
+                    get_latest_user_session,
+                    add_refinement_to_session,
+                    get_session_refinements,
+                    get_archived_sessions,
+                    search_exercises,
+                    get_exercise_details,
+                )
+            ],
+        ],
+    )
+
+
+_root_agent_lock = threading.Lock()
+
+
+def __getattr__(name: str):
+    # ``root_agent`` is built on first access (PEP 562) and then stored as a
+    # module global, so later lookups bypass this function.
+    if name == "root_agent":
+        with _root_agent_lock:
+            if "root_agent" not in globals():
+                globals()["root_agent"] = build_root_agent()
+        return globals()["root_agent"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
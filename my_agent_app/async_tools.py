@@ -0,0 +1,90 @@
+"""Async wrappers that keep blocking tool work off the ADK event loop.
+
+ADK awaits coroutine tools on its event loop. The database and catalog tools
+are synchronous, so calling them directly would stall every conversation the
+process is serving while one of them waits on disk. ``make_async_tool`` wraps
+such a function in a coroutine that runs it on a small, bounded thread pool;
+each pool thread keeps its own pooled SQLite connections (see ``db.py``).
+
+The pool size comes from ``AGENT_TOOL_WORKERS`` (default 4). SQLite accepts one
+writer at a time, so a larger pool mainly helps concurrent reads.
+``asyncio`` and the executor are imported on first use, so processes that
+call the tools synchronously never load them.
+"""
+
+import functools
+import os
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_TOOL_WORKERS = 4
+
+_executor: Optional["ThreadPoolExecutor"] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> "ThreadPoolExecutor":
+    """Return the shared tool executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                workers = int(os.environ.get("AGENT_TOOL_WORKERS", DEFAULT_TOOL_WORKERS))
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, workers), thread_name_prefix="agent-tool"
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """Run a blocking callable on the tool executor and await its result."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def make_async_tool(func: Callable) -> Callable:
+    """Wrap a blocking tool function in a coroutine function.
+
+    The wrapper keeps the wrapped function's name, docstring, annotations and
+    signature, so ADK builds the same tool declaration for it.
+
+    Args:
+        func: A synchronous tool function.
+
+    Returns:
+        An ``async def`` function that runs ``func`` on the tool executor.
+    """
+
+    @functools.wraps(func)
+    async def tool(*args, **kwargs):
+        return await run_blocking(func, *args, **kwargs)
+
+    return tool
+
+
+def _forget_executor() -> None:
+    # A forked child inherits the executor object but not its threads.
+    global _executor
+    _executor = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_executor)
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Stop the tool executor; the next async tool call starts a new one."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,252 @@
+"""Content-addressed, compressed storage for session profiles and plans.
+
+Every saved session used to carry its full profile and weekly plan as JSON
+text. Plans are built from a handful of shared templates, so most of those
+bytes were copies of each other. Session payloads are now stored in the
+``session_blobs`` table, keyed by a hash of their encoding and compressed with
+zstd when it is installed (zlib otherwise), and sessions reference them by
+hash:
+
+- ``profile_hash`` points at the session's profile;
+- ``plan_hash`` points at the plan's shared part (``SHARED_PLAN_FIELDS``:
+  goal, difficulty, frequency, schedule, constraints), while the few
+  per-member fields (name, profile ID, injury note) stay inline in the
+  ``workout_plan`` column.
+
+A payload that is already stored costs one primary-key lookup and no
+write. Each blob records its codec and serialization format (see
+``serialization.py``), so databases written with zstd or msgpack stay
+readable wherever those modules are available, and rows from before the
+migration (NULL hashes) are read as inline payloads. Decompressed blobs
+are immutable, so they are cached by hash.
+"""
+
+import hashlib
+import sqlite3
+import zlib
+from typing import Iterable
+
+try:
+    from .cache import LRUCache
+    from .serialization import dumps, loads, to_bytes
+except ImportError:
+    from cache import LRUCache  # type: ignore
+    from serialization import dumps, loads, to_bytes  # type: ignore
+
+try:  # Python 3.14+
+    from compression import zstd as _zstd
+except ImportError:  # pragma: no cover - depends on the interpreter
+    _zstd = None
+try:
+    import zstandard as _zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    _zstandard = None
+
+# Fields of a weekly plan that depend only on its template; the remaining
+# fields are per member and stay inline in the session row.
+SHARED_PLAN_FIELDS = ("goal", "difficulty", "frequency", "weekly_schedule", "constraints")
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 10
+DECODED_CACHE_SIZE = 4096
+PREFERRED_CODEC = "zstd" if (_zstd is not None or _zstandard is not None) else "zlib"
+
+_decoded = LRUCache(DECODED_CACHE_SIZE)
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    if _zstd is not None:
+        return _zstd.compress(data, level=ZSTD_LEVEL)
+    return _zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    if _zstd is not None:
+        return _zstd.decompress(data)
+    if _zstandard is not None:
+        return _zstandard.ZstdDecompressor().decompress(data)
+    raise RuntimeError("session blob is zstd-compressed but no zstd module is installed")
+
+
+def content_hash(data: bytes) -> bytes:
+    """Return the 16-byte BLAKE2b digest addressing ``data``."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def encode(data: bytes, codec: str = PREFERRED_CODEC) -> tuple:
+    """Compress ``data``, falling back to "raw" when compression does not help.
+
+    Returns:
+        A ``(codec, stored_bytes)`` tuple.
+    """
+    if codec == "zstd":
+        packed = _zstd_compress(data)
+    elif codec == "zlib":
+        packed = zlib.compress(data, ZLIB_LEVEL)
+    else:
+        return "raw", data
+    if len(packed) >= len(data):
+        return "raw", data
+    return codec, packed
+
+
+def decode(codec: str, data: bytes) -> bytes:
+    """Reverse ``encode`` for a stored blob."""
+    if codec == "raw":
+        return bytes(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        return _zstd_decompress(data)
+    raise ValueError(f"Unknown session blob codec: {codec!r}")
+
+
+def put_blob(conn: sqlite3.Connection, payload, format: str = "json") -> bytes:
+    """Store a serialized payload once and return its hash.
+
+    Runs inside the caller's write transaction, starting it (``BEGIN
+    IMMEDIATE``) if none is open yet. The existence check then holds the write
+    lock until the session row that references the blob commits, so the
+    retention job cannot delete the blob as unreferenced in between. A
+    payload that is already stored is neither compressed nor written again.
+
+    Args:
+        conn: Connection to the sessions database.
+        payload: Output of ``serialization.dumps``.
+        format: Serialization format of ``payload``.
+    """
+    data = to_bytes(payload)
+    digest = content_hash(data)
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    if conn.execute("SELECT 1 FROM session_blobs WHERE hash = ?", (digest,)).fetchone() is None:
+        codec, stored = encode(data)
+        if format == "json":
+            # "json" is the column default, which also lets migration 4 store
+            # blobs before the format column exists.
+            conn.execute(
+                "INSERT OR IGNORE INTO session_blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                (digest, codec, len(data), stored),
+            )
+        else:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO session_blobs (hash, codec, size, data, format)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (digest, codec, len(data), stored, format),
+            )
+    return digest
+
+
+def get_blobs(conn: sqlite3.Connection, hashes: Iterable[bytes]) -> dict:
+    """Return ``{hash: (format, payload)}`` for the given hashes, from cache or one query."""
+    found = {}
+    missing = []
+    for digest in dict.fromkeys(h for h in hashes if h is not None):
+        blob = _decoded.get(digest)
+        if blob is None:
+            missing.append(digest)
+        else:
+            found[digest] = blob
+    if missing:
+        placeholders = ", ".join("?" for _ in missing)
+        rows = conn.execute(
+            f"SELECT hash, codec, format, data FROM session_blobs WHERE hash IN ({placeholders})",
+            missing,
+        )
+        for digest, codec, format, data in rows:
+            blob = (format, decode(codec, data))
+            _decoded.set(digest, blob)
+            found[digest] = blob
+    return found
+
+
+def decoded_cache_stats() -> dict:
+    """Return hit/miss counters for the decoded blob cache."""
+    return _decoded.stats()
+
+
+def split_plan(plan) -> tuple:
+    """Split a plan into its shared part and its per-member overlay.
+
+    Returns:
+        ``(shared, overlay)``; ``shared`` is None when the plan has no shared
+        fields (or is not a dictionary) and must be stored inline.
+    """
+    if not isinstance(plan, dict):
+        return None, plan
+    shared = {field: plan[field] for field in SHARED_PLAN_FIELDS if field in plan}
+    if not shared:
+        return None, plan
+    overlay = {field: value for field, value in plan.items() if field not in shared}
+    return shared, overlay
+
+
+def session_payload_values(
+    conn: sqlite3.Connection, profile_data, workout_plan, format: str = "json"
+) -> tuple:
+    """Store a session's payloads and return its column values.
+
+    Must run inside the transaction that inserts the session row, which
+    records ``format`` in its ``payload_format`` column.
+
+    Returns:
+        ``(profile_data, workout_plan, profile_hash, plan_hash)`` for the
+        sessions table.
+    """
+    profile_hash = put_blob(conn, dumps(profile_data, format), format)
+    shared, overlay = split_plan(workout_plan)
+    plan_hash = put_blob(conn, dumps(shared, format), format) if shared is not None else None
+    return "", dumps(overlay, format), profile_hash, plan_hash
+
+
+def load_session_payloads(conn: sqlite3.Connection, rows: list) -> list:
+    """Resolve stored session payloads back into dictionaries.
+
+    Args:
+        conn: Connection to the sessions database.
+        rows: ``(profile_data, workout_plan, payload_format, profile_hash,
+            plan_hash)`` tuples as stored; either payload column may be None
+            when it was not selected.
+
+    Returns:
+        One ``(profile, workout_plan)`` tuple per row.
+    """
+    hashes = []
+    for profile_data, workout_plan, _, profile_hash, plan_hash in rows:
+        if profile_data is not None:
+            hashes.append(profile_hash)
+        if workout_plan is not None:
+            hashes.append(plan_hash)
+    blobs = get_blobs(conn, hashes)
+    loaded = []
+    for profile_data, workout_plan, payload_format, profile_hash, plan_hash in rows:
+        profile = plan = None
+        if profile_data is not None:
+            if profile_hash is not None:
+                profile = loads(blobs[profile_hash][1], blobs[profile_hash][0])
+            else:
+                profile = loads(profile_data, payload_format)
+        if workout_plan is not None:
+            plan = loads(workout_plan, payload_format)
+            if plan_hash is not None:
+                plan = {**plan, **loads(blobs[plan_hash][1], blobs[plan_hash][0])}
+        loaded.append((profile, plan))
+    return loaded
+
+
+def storage_stats(conn: sqlite3.Connection) -> dict:
+    """Summarize blob storage: count, stored vs. uncompressed bytes, codecs and formats."""
+    count, stored, size = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(size), 0) FROM session_blobs"
+    ).fetchone()
+    codecs = dict(conn.execute("SELECT codec, COUNT(*) FROM session_blobs GROUP BY codec"))
+    formats = dict(conn.execute("SELECT format, COUNT(*) FROM session_blobs GROUP BY format"))
+    return {
+        "blobs": count,
+        "stored_bytes": stored,
+        "payload_bytes": size,
+        "codecs": codecs,
+        "formats": formats,
+    }
+
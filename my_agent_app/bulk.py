@@ -0,0 +1,293 @@
+"""Bulk member onboarding: import profiles and generate their first plans.
+
+``save_user_profile`` validates, inserts and commits one profile per call,
+which is the right shape for a conversation but far too slow for a gym
+onboarding thousands of members at once. ``import_profiles`` validates a
+whole CSV or JSONL file in one pass, inserts the valid profiles with
+``executemany`` in chunked transactions, then generates a weekly plan for each
+one and stores the sessions the same way.
+
+Usage::
+
+    python -m my_agent_app.bulk members.csv
+    python -m my_agent_app.bulk members.jsonl --no-plans --chunk-size 5000
+    python -m my_agent_app.bulk members.csv --workers 4
+
+Input records need ``name``, ``age``, ``height``, ``weight`` and
+``exercise_goal``; ``injury`` is optional.
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+try:
+    from . import agent, prefork, usercache
+    from .blobs import session_payload_values
+    from .catalog import get_catalog
+    from .db import get_connection
+    from .serialization import WRITE_FORMAT
+except ImportError:
+    import agent  # type: ignore
+    import prefork  # type: ignore
+    import usercache  # type: ignore
+    from blobs import session_payload_values  # type: ignore
+    from catalog import get_catalog  # type: ignore
+    from db import get_connection  # type: ignore
+    from serialization import WRITE_FORMAT  # type: ignore
+
+DEFAULT_CHUNK_SIZE = 1000
+PROFILE_FIELDS = ("name", "age", "height", "weight", "exercise_goal", "injury")
+
+
+def read_profile_records(path: str) -> Iterator[tuple]:
+    """Yield ``(line_number, record)`` pairs from a CSV or JSONL profile file.
+
+    A JSONL line that is not valid JSON is yielded as the
+    ``json.JSONDecodeError`` it raised, so the caller can reject that line and
+    go on with the rest of the file.
+
+    Args:
+        path: Path to a ``.csv`` file with a header row, or a ``.jsonl`` /
+            ``.json`` file with one JSON object per line.
+    """
+    if os.path.splitext(path)[1].lower() in (".jsonl", ".json", ".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        record = e
+                    yield line_number, record
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            # Header is line 1, so the first record is line 2.
+            for line_number, record in enumerate(csv.DictReader(f), start=2):
+                yield line_number, record
+
+
+def clean_profile_record(record: dict) -> tuple:
+    """Validate and normalize one imported profile record.
+
+    Applies the same rules as ``save_user_profile``, after converting the
+    numeric fields that CSV delivers as strings.
+
+    Returns:
+        ``(row, None)`` with the insert tuple for a valid record, or
+        ``(None, error_message)`` for an invalid one (including lines that
+        are not JSON objects).
+    """
+    if isinstance(record, json.JSONDecodeError):
+        return None, f"Invalid JSON: {record.msg}"
+    if not isinstance(record, dict):
+        return None, "Record must be a JSON object"
+    try:
+        age = int(str(record.get("age", "")).strip())
+        # int() of an infinite float raises OverflowError, of NaN ValueError.
+        weight = int(float(str(record.get("weight", "")).strip()))
+    except (ValueError, OverflowError):
+        return None, "Age and weight must be numbers"
+    name = str(record.get("name") or "")
+    height = str(record.get("height") or "")
+    exercise_goal = str(record.get("exercise_goal") or "").strip()
+    error = agent.profile_validation_error(name, age, height, weight, exercise_goal)
+    if error:
+        return None, error
+    injury = agent.normalize_injury(str(record.get("injury") or "")).strip()
+    return (name.strip(), age, height.strip(), weight, exercise_goal, injury), None
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def insert_profiles(rows: list, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list:
+    """Insert validated profile rows in chunked transactions.
+
+    Each chunk is one ``BEGIN IMMEDIATE`` transaction, so AUTOINCREMENT hands
+    out a contiguous block of IDs that can be recovered without a query per
+    row.
+
+    Args:
+        rows: Insert tuples from ``clean_profile_record``.
+        chunk_size: Rows per transaction.
+
+    Returns:
+        The new profile IDs, in input order.
+    """
+    agent.init_database()
+    conn = get_connection(agent.DB_PATH)
+    profile_ids = []
+    for chunk in _chunks(rows, chunk_size):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                """
+                INSERT INTO user_profiles (name, age, height, weight, exercise_goal, injury)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                chunk,
+            )
+            last_id = conn.execute("SELECT MAX(id) FROM user_profiles").fetchone()[0]
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        usercache.invalidate(agent.DB_PATH, None)
+        profile_ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+    return profile_ids
+
+
+def create_sessions_for_profiles(
+    profiles: list, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1
+) -> int:
+    """Generate a weekly plan for each profile and store them as sessions.
+
+    Args:
+        profiles: Profile dictionaries including ``profile_id``.
+        chunk_size: Sessions per transaction.
+        workers: Processes generating plans, each loading the catalog once;
+            1 generates them in this process.
+
+    Returns:
+        The number of sessions created.
+    """
+    agent.init_sessions_database()
+    conn = get_connection(agent.SESSIONS_PATH)
+    # A plain pool: prefork.plan_pool would preload and gc.freeze() this
+    # process and write the compiled catalog and search index files.
+    pool = (
+        ProcessPoolExecutor(workers, initializer=_load_catalog, initargs=(agent.DATASET_PATH,))
+        if workers > 1
+        else None
+    )
+    try:
+        return _store_sessions(conn, profiles, chunk_size, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def _load_catalog(path: str) -> None:
+    agent.DATASET_PATH = path
+    get_catalog(path)
+
+
+def _store_sessions(conn, profiles: list, chunk_size: int, pool) -> int:
+    created = 0
+    for chunk in _chunks(profiles, chunk_size):
+        if pool is not None:
+            plans = prefork.generate_plans(chunk, pool=pool)
+        else:
+            plans = [agent.generate_weekly_workout_plan_from_profile(profile) for profile in chunk]
+        with conn:
+            rows = [
+                (profile["profile_id"], profile["name"])
+                + session_payload_values(conn, profile, plan, WRITE_FORMAT)
+                + (WRITE_FORMAT,)
+                for profile, plan in zip(chunk, plans)
+            ]
+            conn.executemany(
+                """
+                INSERT INTO sessions (user_id, user_name, profile_data, workout_plan,
+                                      profile_hash, plan_hash, payload_format)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        for name in {profile["name"] for profile in chunk}:
+            usercache.invalidate(agent.SESSIONS_PATH, name)
+        created += len(rows)
+    return created
+
+
+def import_profiles(
+    path: str,
+    generate_plans: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+) -> dict:
+    """Import a CSV/JSONL file of member profiles and optionally plan for them.
+
+    Args:
+        path: Input file (see ``read_profile_records``).
+        generate_plans: Also generate and save a weekly plan session per profile.
+        chunk_size: Rows per transaction.
+        workers: Processes generating plans.
+
+    Returns:
+        A summary with imported/rejected counts, per-record errors (capped at
+        100), elapsed seconds and profiles per second.
+    """
+    started = time.perf_counter()
+    rows = []
+    errors = []
+    rejected = 0
+    for line_number, record in read_profile_records(path):
+        row, error = clean_profile_record(record)
+        if error:
+            rejected += 1
+            if len(errors) < 100:
+                errors.append({"line": line_number, "message": error})
+        else:
+            rows.append(row)
+
+    profile_ids = insert_profiles(rows, chunk_size)
+    sessions_created = 0
+    if generate_plans:
+        profiles = [
+            dict(zip(PROFILE_FIELDS, row), profile_id=profile_id)
+            for profile_id, row in zip(profile_ids, rows)
+        ]
+        sessions_created = create_sessions_for_profiles(profiles, chunk_size, workers)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "status": "success",
+        "imported": len(profile_ids),
+        "rejected": rejected,
+        "sessions_created": sessions_created,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "profiles_per_second": round(len(profile_ids) / elapsed, 1) if elapsed else None,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command-line entry point for bulk imports."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk-import member profiles.")
+    parser.add_argument("path", help="CSV or JSONL file of profiles")
+    parser.add_argument(
+        "--no-plans", action="store_true", help="Import profiles without generating plans"
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Processes generating plans (default 1)"
+    )
+    args = parser.parse_args(argv)
+
+    report = import_profiles(
+        args.path,
+        generate_plans=not args.no_plans,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+    )
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['message']}")
+    print(
+        f"Imported {report['imported']} profiles ({report['rejected']} rejected), "
+        f"created {report['sessions_created']} sessions in "
+        f"{report['elapsed_seconds']}s ({report['profiles_per_second']} profiles/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
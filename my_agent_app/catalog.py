@@ -0,0 +1,712 @@
+"""Process-wide exercise catalog loaded from megaGymDataset.csv.
+
+The CSV is parsed once per process and indexed by (Type, BodyPart, Level) so
+that plan generation answers lookups without rescanning the dataset. The file
+is re-read only when its modification time or size changes.
+
+Rows are stored column-wise: repeated categorical values (Type, BodyPart,
+Equipment, Level, RatingDesc) are interned once and referenced by small
+integer codes, ratings live in a float array, and callers receive lightweight
+``ExerciseRow`` views instead of one dictionary per exercise.
+"""
+
+import csv
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from heapq import merge
+from itertools import islice, takewhile
+from typing import Iterable, Optional
+
+try:
+    from .metrics import timed_section
+except ImportError:
+    from metrics import timed_section  # type: ignore
+
+TEXT_FIELDS = ("Title", "Desc")
+CATEGORICAL_FIELDS = ("Type", "BodyPart", "Equipment", "Level", "RatingDesc")
+BITSET_FIELDS = ("Type", "BodyPart", "Equipment", "Level")
+
+
+@timed_section("catalog")
+def read_dataset_rows(path: str) -> list:
+    """Read raw exercise rows from the CSV dataset.
+
+    Args:
+        path: Path to the exercise CSV file.
+
+    Returns:
+        A list of row dictionaries, or an empty list if the file is missing.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    except FileNotFoundError:
+        return []
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _parse_rating(value: Optional[str]) -> float:
+    """Convert a Rating cell to float, using NaN for blank or invalid values."""
+    try:
+        return float(value) if value else math.nan
+    except ValueError:
+        return math.nan
+
+
+def _rank_key(ratings, row_id: int) -> tuple:
+    """Sort key placing rows best-rated first.
+
+    Ties keep dataset order, and rows without a rating (NaN) come after
+    every rated row, so ranked buckets are deterministic.
+    """
+    rating = ratings[row_id]
+    missing = math.isnan(rating)
+    return (missing, 0.0 if missing else -rating, row_id)
+
+
+class ExerciseRow:
+    """Read-only view of one exercise stored in an ``ExerciseCatalog``.
+
+    ``get`` accepts the CSV column names, so views can be used wherever the
+    dict rows returned by ``read_dataset_rows`` were used before.
+    """
+
+    __slots__ = ("_catalog", "row_id")
+
+    def __init__(self, catalog: "ExerciseCatalog", row_id: int):
+        self._catalog = catalog
+        self.row_id = row_id
+
+    def get(self, field: str, default=None):
+        """Return a column value by its CSV name, as a string like the raw CSV."""
+        catalog = self._catalog
+        if field in catalog.text:
+            return catalog.text[field][self.row_id]
+        if field in catalog.codes:
+            return catalog.vocab[field][catalog.codes[field][self.row_id]]
+        if field == "Rating":
+            rating = catalog.ratings[self.row_id]
+            return "" if math.isnan(rating) else str(rating)
+        return default
+
+    @property
+    def title(self) -> str:
+        return self._catalog.text["Title"][self.row_id]
+
+    @property
+    def description(self) -> str:
+        return self._catalog.text["Desc"][self.row_id]
+
+    @property
+    def equipment(self) -> str:
+        return self.get("Equipment")
+
+    @property
+    def rating(self) -> Optional[float]:
+        """Numeric rating, or None when the dataset has no rating."""
+        rating = self._catalog.ratings[self.row_id]
+        return None if math.isnan(rating) else rating
+
+    def __repr__(self) -> str:
+        return f"ExerciseRow({self.row_id}, {self.title!r})"
+
+
+class _BlobColumn:
+    """Sequence of strings stored as one UTF-8 blob plus an offsets array."""
+
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._blob[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+
+class _DedupColumn:
+    """Sequence of strings stored as per-row ids into a table of unique values."""
+
+    __slots__ = ("_values", "_ids")
+
+    def __init__(self, values, ids):
+        self._values = values
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, i: int) -> str:
+        return self._values[self._ids[i]]
+
+
+class ExerciseCatalog:
+    """Column-oriented exercise store plus a (Type, BodyPart, Level) index.
+
+    Each index bucket is a sequence of row ids in CSV order, so a lookup
+    spanning several exercise types can be merged back into dataset order
+    without touching rows outside the requested buckets. ``ranked`` holds the
+    same buckets presorted by rating (see ``_rank_key``), so the top-k
+    rated rows are a slice or a k-step merge. For arbitrary combinations of
+    constraints, ``bitsets`` keeps one integer bitset per categorical value
+    (bit ``i`` set for row ``i``), so filters resolve to ``&``/``|`` of a few
+    integers instead of scans. Columns are either
+    in-memory lists/arrays (``from_rows``) or zero-copy views over a
+    memory-mapped compiled catalog (``from_compiled``).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        signature: Optional[tuple],
+        text: dict,
+        vocab: dict,
+        codes: dict,
+        ratings,
+        index: dict,
+        ranked: dict,
+        source: str = "csv",
+        mapping: Optional[mmap.mmap] = None,
+    ):
+        self.path = path
+        self.signature = signature
+        self.text = text
+        self.vocab = vocab
+        self.codes = codes
+        self.ratings = ratings
+        self.index = index
+        self.ranked = ranked
+        self.source = source
+        self._mapping = mapping
+        # Memo space for data derived from this catalog (e.g. plan templates);
+        # it is discarded together with the catalog when the dataset reloads.
+        self.derived = {}
+
+    @classmethod
+    def from_rows(
+        cls, path: str, rows: Iterable[dict], signature: Optional[tuple] = None
+    ) -> "ExerciseCatalog":
+        """Build an in-memory catalog from CSV-style row dictionaries."""
+        text = {field: [] for field in TEXT_FIELDS}
+        vocab = {field: [] for field in CATEGORICAL_FIELDS}
+        ratings = array("d")
+        index = {}
+
+        code_lists = {field: [] for field in CATEGORICAL_FIELDS}
+        code_maps = {field: {} for field in CATEGORICAL_FIELDS}
+        for row_id, row in enumerate(rows):
+            for field in TEXT_FIELDS:
+                text[field].append(row.get(field) or "")
+            for field in CATEGORICAL_FIELDS:
+                value = sys.intern(row.get(field) or "")
+                code = code_maps[field].get(value)
+                if code is None:
+                    code = code_maps[field][value] = len(vocab[field])
+                    vocab[field].append(value)
+                code_lists[field].append(code)
+            ratings.append(_parse_rating(row.get("Rating")))
+            if row.get("Title"):
+                key = (row.get("Type"), row.get("BodyPart"), row.get("Level"))
+                index.setdefault(key, array("I")).append(row_id)
+
+        codes = {
+            field: array("B" if len(vocab[field]) <= 256 else "H", values)
+            for field, values in code_lists.items()
+        }
+        ranked = {
+            key: array("I", sorted(row_ids, key=lambda row_id: _rank_key(ratings, row_id)))
+            for key, row_ids in index.items()
+        }
+        return cls(path, signature, text, vocab, codes, ratings, index, ranked)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ExerciseCatalog":
+        """Build a catalog from the CSV at ``path``."""
+        signature = _file_signature(path)
+        return cls.from_rows(path, read_dataset_rows(path), signature)
+
+    @classmethod
+    def from_compiled(cls, path: str, compiled_path: str) -> Optional["ExerciseCatalog"]:
+        """Map a compiled catalog, or return None if it is missing or stale.
+
+        Args:
+            path: Path to the source CSV the compiled file was built from.
+            compiled_path: Path to the compiled catalog file.
+
+        Returns:
+            An ExerciseCatalog backed by the read-only mapping, or None when
+            the compiled file is absent, unreadable, or out of date.
+        """
+        try:
+            with open(compiled_path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            header = _read_compiled_header(mapping)
+            signature = _file_signature(path)
+            if header is None or not _compiled_is_fresh(header, path, signature):
+                mapping.close()
+                return None
+            return cls._from_mapping(path, signature, header, mapping)
+        except (ValueError, KeyError, TypeError, IndexError):
+            mapping.close()
+            return None
+
+    @classmethod
+    def _from_mapping(
+        cls, path: str, signature: Optional[tuple], header: dict, mapping: mmap.mmap
+    ) -> "ExerciseCatalog":
+        """Wrap the sections of a validated compiled catalog in column views."""
+        view = memoryview(mapping)
+        sections = {}
+        for name, (offset, length, typecode) in header["sections"].items():
+            section = view[offset : offset + length]
+            sections[name] = section.cast(typecode) if typecode != "bytes" else section
+
+        titles = _BlobColumn(sections["title_blob"], sections["title_offsets"])
+        text = {
+            "Title": _DedupColumn(titles, sections["title_ids"]),
+            "Desc": _BlobColumn(sections["desc_blob"], sections["desc_offsets"]),
+        }
+        vocab = {
+            field: [sys.intern(value) for value in values]
+            for field, values in header["vocab"].items()
+        }
+        codes = {field: sections["code:" + field] for field in CATEGORICAL_FIELDS}
+        index_rows = sections["index_rows"]
+        ranked_rows = sections["ranked_rows"]
+        index = {}
+        ranked = {}
+        for type_, body_part, level, start, count in header["index"]:
+            index[(type_, body_part, level)] = index_rows[start : start + count]
+            ranked[(type_, body_part, level)] = ranked_rows[start : start + count]
+        return cls(
+            path,
+            signature,
+            text,
+            vocab,
+            codes,
+            sections["ratings"],
+            index,
+            ranked,
+            source="compiled",
+            mapping=mapping,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ratings)
+
+    def row(self, row_id: int) -> ExerciseRow:
+        """Return a view of the exercise with the given row id."""
+        return ExerciseRow(self, row_id)
+
+    def mask_of(self, row_ids: Iterable[int]) -> int:
+        """Return the bitset with the bits of ``row_ids`` set."""
+        bits = bytearray((len(self) + 7) // 8)
+        for row_id in row_ids:
+            bits[row_id >> 3] |= 1 << (row_id & 7)
+        return int.from_bytes(bits, "little")
+
+    def all_mask(self) -> int:
+        """Return the bitset of every row."""
+        return (1 << len(self)) - 1
+
+    def bitsets(self, field: str) -> list:
+        """Return one bitset per code of a categorical field, built on first use."""
+        per_field = self.derived.get("bitsets")
+        if per_field is None:
+            per_field = self.derived.setdefault("bitsets", {})
+        masks = per_field.get(field)
+        if masks is None:
+            rows_by_code = [[] for _ in self.vocab[field]]
+            for row_id, code in enumerate(self.codes[field]):
+                rows_by_code[code].append(row_id)
+            masks = per_field.setdefault(field, [self.mask_of(rows) for rows in rows_by_code])
+        return masks
+
+    def value_mask(self, field: str, values: Iterable[str]) -> int:
+        """Return the bitset of rows whose ``field`` is any of ``values``."""
+        vocab = self.vocab[field]
+        masks = self.bitsets(field)
+        mask = 0
+        for value in values:
+            if value in vocab:
+                mask |= masks[vocab.index(value)]
+        return mask
+
+    def rows_in(self, mask: int) -> list:
+        """Return the row ids set in a bitset, in dataset order."""
+        row_ids = []
+        for byte_index, byte in enumerate(mask.to_bytes((len(self) + 7) // 8, "little")):
+            if byte:
+                base = byte_index << 3
+                row_ids.extend(base + bit for bit in range(8) if byte >> bit & 1)
+        return row_ids
+
+    @timed_section("catalog")
+    def lookup(
+        self,
+        exercise_types: Iterable[str],
+        body_part: str,
+        level: str,
+        limit: Optional[int] = None,
+    ) -> list:
+        """Return titled rows matching any of the types for a body part and level.
+
+        Args:
+            exercise_types: Accepted values of the ``Type`` column.
+            body_part: Required ``BodyPart`` value.
+            level: Required ``Level`` value.
+            limit: Maximum number of rows to return (default: all).
+
+        Returns:
+            Matching ``ExerciseRow`` views in dataset order.
+        """
+        buckets = [
+            self.index[key]
+            for key in ((t, body_part, level) for t in exercise_types)
+            if key in self.index
+        ]
+        if not buckets:
+            return []
+        if len(buckets) == 1:
+            row_ids = buckets[0] if limit is None else buckets[0][:limit]
+        else:
+            row_ids = islice(merge(*buckets), limit)
+        return [ExerciseRow(self, row_id) for row_id in row_ids]
+
+    @timed_section("catalog")
+    def top_rated(
+        self,
+        exercise_types: Iterable[str],
+        body_part: str,
+        level: str,
+        k: Optional[int] = None,
+        min_rating: Optional[float] = None,
+        allowed: Optional[int] = None,
+    ) -> list:
+        """Return the best-rated titled rows for the types, body part and level.
+
+        Rows are ordered by rating, highest first; ties keep dataset order.
+        Rows without a rating come last, after every rated row, and are
+        excluded whenever ``min_rating`` is given.
+
+        Args:
+            exercise_types: Accepted values of the ``Type`` column.
+            body_part: Required ``BodyPart`` value.
+            level: Required ``Level`` value.
+            k: Maximum number of rows to return (default: all).
+            min_rating: Only return rows rated at least this much.
+            allowed: Optional bitset of eligible rows (see ``bitsets``).
+
+        Returns:
+            Matching ``ExerciseRow`` views, best first.
+        """
+        buckets = [
+            self.ranked[key]
+            for key in ((t, body_part, level) for t in exercise_types)
+            if key in self.ranked
+        ]
+        if not buckets:
+            return []
+        ratings = self.ratings
+        if len(buckets) == 1 and min_rating is None and allowed is None:
+            row_ids = buckets[0] if k is None else buckets[0][:k]
+        else:
+            if len(buckets) == 1:
+                row_ids = buckets[0]
+            else:
+                row_ids = merge(*buckets, key=lambda row_id: _rank_key(ratings, row_id))
+            if min_rating is not None:
+                # NaN compares false, so the scan stops at the unrated tail.
+                row_ids = takewhile(lambda row_id: ratings[row_id] >= min_rating, row_ids)
+            if allowed is not None:
+                bits = allowed.to_bytes((len(self) + 7) // 8, "little")
+                row_ids = (r for r in row_ids if bits[r >> 3] >> (r & 7) & 1)
+            row_ids = islice(row_ids, k)
+        return [ExerciseRow(self, row_id) for row_id in row_ids]
+
+
+COMPILED_MAGIC = b"EXCATLG\0"
+COMPILED_VERSION = 2
+_COMPILED_HEADER = struct.Struct("<8sIIQQ")
+
+
+def compiled_path_for(path: str) -> str:
+    """Return the default compiled catalog path for a CSV dataset."""
+    return os.path.splitext(path)[0] + ".catalog"
+
+
+def _sha256_file(path: str) -> str:
+    """Hash a file in chunks without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_compiled_header(mapping: mmap.mmap) -> Optional[dict]:
+    """Parse the fixed header and metadata of a compiled catalog.
+
+    Returns:
+        The metadata dictionary, or None if the file is not a compatible
+        compiled catalog for this platform.
+    """
+    if len(mapping) < _COMPILED_HEADER.size:
+        return None
+    magic, version, _, meta_offset, meta_length = _COMPILED_HEADER.unpack_from(mapping)
+    if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+        return None
+    meta = json.loads(mapping[meta_offset : meta_offset + meta_length])
+    if meta.get("byteorder") != sys.byteorder:
+        return None
+    return meta
+
+
+def _compiled_is_fresh(meta: dict, path: str, signature: Optional[tuple]) -> bool:
+    """Check whether a compiled catalog still matches its source CSV.
+
+    A matching (mtime, size) is accepted directly. When only the mtime differs,
+    as after a fresh checkout, the CSV is hashed and compared instead. A
+    missing CSV leaves the compiled catalog as the only source, so it is used.
+    """
+    if signature is None:
+        return True
+    source = meta["source"]
+    if [source["mtime_ns"], source["size"]] == list(signature):
+        return True
+    return source["size"] == signature[1] and source["sha256"] == _sha256_file(path)
+
+
+def compile_catalog(path: str, compiled_path: Optional[str] = None) -> dict:
+    """Compile the CSV dataset into a memory-mappable binary catalog.
+
+    The output holds numeric ratings, a deduplicated title table, categorical
+    code columns, every index bucket and all description text in contiguous
+    sections, followed by a small JSON metadata block. Worker processes map it
+    read-only via ``ExerciseCatalog.from_compiled`` and share its pages.
+
+    Args:
+        path: Path to the source exercise CSV.
+        compiled_path: Output path (default: ``compiled_path_for(path)``).
+
+    Returns:
+        A dictionary with the output path, row count and file size.
+    """
+    compiled_path = compiled_path or compiled_path_for(path)
+    signature = _file_signature(path)
+    if signature is None:
+        raise FileNotFoundError(path)
+    catalog = ExerciseCatalog.from_csv(path)
+
+    def blob_sections(values):
+        offsets = array("Q", [0])
+        parts = []
+        for value in values:
+            encoded = value.encode("utf-8")
+            parts.append(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+        return offsets, b"".join(parts)
+
+    unique_titles = {}
+    title_ids = array("I")
+    for i in range(len(catalog)):
+        title = catalog.text["Title"][i]
+        title_ids.append(unique_titles.setdefault(title, len(unique_titles)))
+    title_offsets, title_blob = blob_sections(unique_titles)
+    desc_offsets, desc_blob = blob_sections(
+        catalog.text["Desc"][i] for i in range(len(catalog))
+    )
+
+    index_rows = array("I")
+    ranked_rows = array("I")
+    index_meta = []
+    for key, row_ids in sorted(catalog.index.items()):
+        index_meta.append([*key, len(index_rows), len(row_ids)])
+        index_rows.extend(row_ids)
+        ranked_rows.extend(catalog.ranked[key])
+
+    sections = [
+        ("title_offsets", title_offsets),
+        ("title_blob", title_blob),
+        ("title_ids", title_ids),
+        ("desc_offsets", desc_offsets),
+        ("desc_blob", desc_blob),
+        ("ratings", catalog.ratings),
+        ("index_rows", index_rows),
+        ("ranked_rows", ranked_rows),
+    ] + [("code:" + field, catalog.codes[field]) for field in CATEGORICAL_FIELDS]
+
+    section_meta = {}
+    tmp_path = compiled_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _COMPILED_HEADER.size)
+        for name, data in sections:
+            f.write(b"\0" * (-f.tell() % 8))
+            payload = data.tobytes() if isinstance(data, array) else data
+            typecode = data.typecode if isinstance(data, array) else "bytes"
+            section_meta[name] = [f.tell(), len(payload), typecode]
+            f.write(payload)
+        meta = json.dumps(
+            {
+                "byteorder": sys.byteorder,
+                "rows": len(catalog),
+                "source": {
+                    "mtime_ns": signature[0],
+                    "size": signature[1],
+                    "sha256": _sha256_file(path),
+                },
+                "vocab": catalog.vocab,
+                "index": index_meta,
+                "sections": section_meta,
+            }
+        ).encode("utf-8")
+        meta_offset = f.tell()
+        f.write(meta)
+        f.seek(0)
+        f.write(
+            _COMPILED_HEADER.pack(
+                COMPILED_MAGIC, COMPILED_VERSION, 0, meta_offset, len(meta)
+            )
+        )
+    os.replace(tmp_path, compiled_path)
+    return {
+        "path": compiled_path,
+        "rows": len(catalog),
+        "unique_titles": len(unique_titles),
+        "bytes": os.path.getsize(compiled_path),
+    }
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def load_catalog(path: str) -> ExerciseCatalog:
+    """Load a catalog, preferring a fresh compiled file over parsing the CSV."""
+    catalog = ExerciseCatalog.from_compiled(path, compiled_path_for(path))
+    return catalog if catalog is not None else ExerciseCatalog.from_csv(path)
+
+
+@timed_section("catalog")
+def get_catalog(path: str) -> ExerciseCatalog:
+    """Return the shared catalog for ``path``, reloading it if the file changed.
+
+    The compiled catalog next to the CSV is used when it is up to date;
+    otherwise the CSV is parsed. Either file changing triggers a reload.
+
+    Args:
+        path: Path to the exercise CSV file.
+
+    Returns:
+        The process-wide ExerciseCatalog for that file.
+    """
+    key = (_file_signature(path), _file_signature(compiled_path_for(path)))
+    entry = _catalogs.get(path)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    with _catalogs_lock:
+        entry = _catalogs.get(path)
+        if entry is None or entry[0] != key:
+            entry = (key, load_catalog(path))
+            _catalogs[path] = entry
+        return entry[1]
+
+
+def clear_catalog_cache() -> None:
+    """Drop every loaded catalog so the next lookup re-reads from disk."""
+    with _catalogs_lock:
+        _catalogs.clear()
+
+
+def memory_report(path: str) -> dict:
+    """Compare the retained size of dict rows against the compact catalog.
+
+    Both representations are built from the same parsed rows under
+    ``tracemalloc``, so the figures cover only the memory each one keeps alive.
+
+    Args:
+        path: Path to the exercise CSV file.
+
+    Returns:
+        A dictionary with row count and retained bytes for each layout.
+    """
+    import tracemalloc  # diagnostics only; kept off the import path
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        dict_rows = read_dataset_rows(path)
+        dict_bytes = tracemalloc.get_traced_memory()[0] - before
+
+        # Decode into fresh strings so the catalog cannot share the dict rows'.
+        with open(path, "r", encoding="utf-8") as f:
+            raw_text = f.read()
+        before = tracemalloc.get_traced_memory()[0]
+        catalog = ExerciseCatalog.from_rows(path, csv.DictReader(raw_text.splitlines(True)))
+        compact_bytes = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        if started:
+            tracemalloc.stop()
+    return {
+        "rows": len(dict_rows),
+        "dict_rows_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "ratio": round(dict_bytes / compact_bytes, 2) if compact_bytes else None,
+        "catalog_rows": len(catalog),
+    }
+
+
+def _main(argv: Optional[list] = None) -> None:
+    """Command-line entry point: ``compile`` or ``memory`` for a dataset."""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Exercise catalog utilities.")
+    parser.add_argument("command", choices=["compile", "memory"])
+    parser.add_argument(
+        "dataset",
+        nargs="?",
+        default=os.path.join(os.path.dirname(__file__), "megaGymDataset.csv"),
+    )
+    parser.add_argument("--output", help="Compiled catalog path (compile only).")
+    args = parser.parse_args(argv)
+
+    if args.command == "memory":
+        report = memory_report(args.dataset)
+    else:
+        report = compile_catalog(args.dataset, args.output)
+        started = time.perf_counter()
+        ExerciseCatalog.from_csv(args.dataset)
+        report["csv_load_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        started = time.perf_counter()
+        ExerciseCatalog.from_compiled(args.dataset, report["path"])
+        report["compiled_load_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,218 @@
+"""Equipment and injury constraints for exercise selection.
+
+Members say "I only have dumbbells and bands" or "bad knee". This module
+turns such free text into catalog constraints: a sorted tuple of allowed
+``Equipment`` values and a tuple of injury tags. Each injury tag marks the
+exercises it rules out (by title keywords, body part and type), and
+``allowed_mask`` resolves any combination of constraints to one catalog
+bitset through bitmask intersections, cached on the catalog.
+"""
+
+import functools
+import re
+from typing import Iterable, Optional, Union
+
+try:
+    from .cache import LRUCache
+    from .catalog import ExerciseCatalog
+except ImportError:
+    from cache import LRUCache  # type: ignore
+    from catalog import ExerciseCatalog  # type: ignore
+
+# Exercises needing no equipment stay available under any equipment list.
+ALWAYS_AVAILABLE_EQUIPMENT = ("Body Only", "None")
+UNRESTRICTED_EQUIPMENT = ("", "any", "all", "full gym", "gym")
+EQUIPMENT_ALIASES = {
+    "bodyweight": "Body Only",
+    "body weight": "Body Only",
+    "no equipment": "Body Only",
+    "ez bar": "E-Z Curl Bar",
+    "curl bar": "E-Z Curl Bar",
+    "swiss ball": "Exercise Ball",
+    "stability ball": "Exercise Ball",
+    "foam roller": "Foam Roll",
+    "kettlebell": "Kettlebells",
+}
+
+# tag -> (words in the member's injury text, title keywords, body parts, types)
+INJURY_RULES = {
+    "knee": (
+        ("knee", "acl", "mcl", "pcl", "meniscus", "patella", "patellar"),
+        ("squat", "lunge", "jump", "step-up", "step up", "leg extension", "pistol",
+         "hop", "bound", "skater", "leg press"),
+        (),
+        ("Plyometrics",),
+    ),
+    "back": (
+        ("back", "spine", "spinal", "lumbar", "disc", "sciatica"),
+        ("deadlift", "good morning", "hyperextension", "back extension", "bent-over",
+         "bent over", "superman", "clean", "snatch"),
+        ("Lower Back",),
+        (),
+    ),
+    "shoulder": (
+        ("shoulder", "rotator", "impingement", "labrum"),
+        ("overhead", "military", "snatch", "jerk", "upright row", "handstand", "dip",
+         "behind the neck", "arnold press", "shoulder press", "push press"),
+        ("Shoulders",),
+        (),
+    ),
+    "wrist": (
+        ("wrist", "carpal"),
+        ("push-up", "pushup", "plank", "handstand", "wrist", "front squat", "clean"),
+        ("Forearms",),
+        (),
+    ),
+    "ankle": (
+        ("ankle", "achilles", "foot", "feet", "plantar"),
+        ("jump", "hop", "sprint", "bound", "skip", "calf raise"),
+        ("Calves",),
+        ("Plyometrics",),
+    ),
+    "neck": (
+        ("neck", "cervical", "whiplash"),
+        ("neck", "shrug", "headstand"),
+        ("Neck", "Traps"),
+        (),
+    ),
+    "elbow": (
+        ("elbow", "epicondylitis"),
+        ("skull crusher", "skullcrusher", "dip", "triceps extension", "french press",
+         "close-grip"),
+        (),
+        (),
+    ),
+    "hip": (
+        ("hip", "hips", "groin"),
+        ("lunge", "split squat", "hip thrust", "pistol", "sumo"),
+        ("Adductors", "Abductors"),
+        (),
+    ),
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _singular_words(text: str) -> str:
+    """Lower-case ``text`` and drop plural endings so "Bands" matches "band"."""
+    words = _WORD.findall(text.lower().replace("-", ""))
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words)
+
+
+@functools.lru_cache(maxsize=1024)
+def injury_tags(injury: Optional[str]) -> tuple:
+    """Return the sorted injury tags mentioned in a profile's injury text.
+
+    Args:
+        injury: Free text such as "bad knee, lower back pain" or "None";
+            case and plural endings are ignored ("sore shoulders").
+
+    Returns:
+        A tuple of INJURY_RULES keys; empty when no known injury is mentioned.
+    """
+    if not injury:
+        return ()
+    words = set(_singular_words(injury).split())
+    return tuple(sorted(tag for tag, rule_words in _injury_words().items() if words & rule_words))
+
+
+@functools.lru_cache(maxsize=1)
+def _injury_words() -> dict:
+    # Normalized like the member's text, so "bad knees" matches "knee".
+    return {
+        tag: {_singular_words(word) for word in rule[0]} for tag, rule in INJURY_RULES.items()
+    }
+
+
+def equipment_values(
+    catalog: ExerciseCatalog, available_equipment: Union[str, Iterable[str], None]
+) -> Optional[tuple]:
+    """Resolve a member's equipment list to catalog ``Equipment`` values.
+
+    Matching ignores case, hyphens and plural endings, so "dumbbells and
+    resistance bands" selects Dumbbell and Bands. Body-only exercises are
+    always allowed.
+
+    Args:
+        catalog: Catalog whose vocabulary to match against.
+        available_equipment: Free text or a list of equipment names; empty
+            (or "any") means no restriction.
+
+    Returns:
+        A sorted tuple of allowed Equipment values, or None when unrestricted.
+    """
+    if available_equipment is None:
+        return None
+    if not isinstance(available_equipment, str):
+        available_equipment = ", ".join(available_equipment)
+    if available_equipment.strip().lower() in UNRESTRICTED_EQUIPMENT:
+        return None
+    resolved = catalog.derived.get("equipment_values")
+    if resolved is None:
+        resolved = catalog.derived.setdefault("equipment_values", LRUCache(256))
+    values = resolved.get(available_equipment)
+    if values is None:
+        values = _match_equipment(catalog, available_equipment)
+        resolved.set(available_equipment, values)
+    return values
+
+
+def _match_equipment(catalog: ExerciseCatalog, available_equipment: str) -> tuple:
+    text = f" {_singular_words(available_equipment)} "
+    allowed = set(ALWAYS_AVAILABLE_EQUIPMENT)
+    for value in catalog.vocab["Equipment"]:
+        key = _singular_words(value)
+        if key and key not in ("other", "none") and f" {key} " in text:
+            allowed.add(value)
+    for alias, value in EQUIPMENT_ALIASES.items():
+        if f" {_singular_words(alias)} " in text:
+            allowed.add(value)
+    return tuple(sorted(v for v in allowed if v in catalog.vocab["Equipment"]))
+
+
+def injury_mask(catalog: ExerciseCatalog, tag: str) -> int:
+    """Return the bitset of exercises an injury tag rules out (cached per catalog)."""
+    masks = catalog.derived.get("injury_masks")
+    if masks is None:
+        masks = catalog.derived.setdefault("injury_masks", {})
+    mask = masks.get(tag)
+    if mask is None:
+        _, keywords, body_parts, types = INJURY_RULES[tag]
+        pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + ")", re.IGNORECASE)
+        titles = catalog.text["Title"]
+        mask = catalog.value_mask("BodyPart", body_parts) | catalog.value_mask("Type", types)
+        mask |= catalog.mask_of(i for i in range(len(catalog)) if pattern.search(titles[i]))
+        masks[tag] = mask
+    return mask
+
+
+def allowed_mask(
+    catalog: ExerciseCatalog, equipment: Optional[tuple], tags: tuple
+) -> Optional[int]:
+    """Intersect equipment and injury constraints into one catalog bitset.
+
+    Args:
+        catalog: Catalog to select from.
+        equipment: Allowed Equipment values from ``equipment_values`` (None
+            for any).
+        tags: Injury tags from ``injury_tags``.
+
+    Returns:
+        The bitset of allowed rows, or None when nothing is constrained.
+    """
+    if equipment is None and not tags:
+        return None
+    key = (equipment, tags)
+    masks = catalog.derived.get("constraint_masks")
+    if masks is None:
+        masks = catalog.derived.setdefault("constraint_masks", LRUCache(256))
+    mask = masks.get(key)
+    if mask is None:
+        if equipment is None:
+            mask = catalog.all_mask()
+        else:
+            mask = catalog.value_mask("Equipment", equipment)
+        for tag in tags:
+            mask &= ~injury_mask(catalog, tag)
+        masks.set(key, mask)
+    return mask
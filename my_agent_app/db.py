@@ -0,0 +1,117 @@
+"""SQLite connection management for the profile and session stores.
+
+Each thread keeps one long-lived connection per database file instead of
+opening a new one on every tool call. Connections run in WAL mode so readers
+do not block on the single writer, and sqlite3's per-connection statement
+cache means the tools' SQL is prepared once and reused across calls.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+
+try:
+    from . import metrics
+except ImportError:
+    import metrics  # type: ignore
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_all_connections = []
+_all_connections_lock = threading.Lock()
+# Bumped by close_all_connections so threads drop their stale handles.
+_generation = 0
+
+
+def _configure(conn: sqlite3.Connection) -> None:
+    """Apply the pragmas every pooled connection uses."""
+    # Only takes effect on a new, empty database file; it lets the retention
+    # job (retention.py) return freed pages in bounded incremental_vacuum steps.
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL is durable across application crashes in WAL mode and avoids an
+    # fsync on every commit; only an OS crash can drop the last transactions.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+def get_connection(path: str) -> sqlite3.Connection:
+    """Return this thread's persistent connection to the database at ``path``.
+
+    Connections are created on first use, configured for WAL, and reused by
+    every later call from the same thread. After a fork the child discards
+    the connections it inherited and opens its own.
+
+    Args:
+        path: Path to the SQLite database file.
+
+    Returns:
+        An open sqlite3 connection owned by the calling thread.
+    """
+    connections = getattr(_local, "connections", None)
+    owner = (os.getpid(), _generation)
+    if connections is None or _local.owner != owner:
+        connections = _local.connections = {}
+        _local.owner = owner
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(
+            path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            # Only the owning thread uses it, but close_all_connections may
+            # close it from another thread.
+            check_same_thread=False,
+            # Times statements for the per-tool metrics when they are enabled.
+            factory=metrics.TimedConnection if metrics.ENABLED else sqlite3.Connection,
+        )
+        _configure(conn)
+        connections[path] = conn
+        with _all_connections_lock:
+            _all_connections.append(conn)
+    return conn
+
+
+def close_thread_connections() -> None:
+    """Close the calling thread's pooled connections."""
+    connections = getattr(_local, "connections", None)
+    if not connections or _local.owner != (os.getpid(), _generation):
+        _local.connections = None
+        return
+    with _all_connections_lock:
+        for conn in connections.values():
+            conn.close()
+            _all_connections.remove(conn)
+    connections.clear()
+
+
+def close_all_connections() -> None:
+    """Close every pooled connection opened by this process.
+
+    Used at interpreter exit and when database files are moved or removed.
+    Threads that use the pool afterwards transparently reconnect.
+    """
+    global _generation
+    with _all_connections_lock:
+        connections = list(_all_connections)
+        _all_connections.clear()
+        _generation += 1
+    for conn in connections:
+        conn.close()
+
+
+def _forget_inherited_connections() -> None:
+    """Drop the parent's handles in a forked child without closing them."""
+    global _all_connections_lock, _generation
+    _all_connections_lock = threading.Lock()
+    _all_connections.clear()
+    _generation += 1
+
+
+atexit.register(close_all_connections)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_connections)
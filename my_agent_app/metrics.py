@@ -0,0 +1,374 @@
+"""Opt-in per-tool metrics with a Prometheus text export.
+
+Set ``AGENT_METRICS=1`` before the agent is imported to record, for every
+tool registered on ``root_agent``: call count, errors (a raised exception or
+a ``{"status": "error"}`` result), wall time, time spent in SQLite, time
+spent in the exercise catalog, and the JSON size of the response.
+
+Export is configured with environment variables:
+
+- ``AGENT_METRICS_FILE``: path of a Prometheus text file, rewritten every
+  ``AGENT_METRICS_INTERVAL`` seconds (default 15) and at exit.
+- ``AGENT_METRICS_PORT``: serve ``/metrics`` on ``127.0.0.1`` at this port.
+
+A per-tool summary is printed to stderr at exit. The exporters start when
+the first tool is instrumented (when ``root_agent`` is built), not on import.
+
+With ``AGENT_METRICS`` unset, ``instrument_tool`` and ``timed_section``
+return the function they are given and ``db.py`` opens plain connections,
+so the hot path runs exactly the uninstrumented code.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+ENABLED = os.environ.get("AGENT_METRICS", "").strip().lower() in ("1", "true", "yes", "on")
+DEFAULT_WRITE_INTERVAL = 15.0
+WALL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SECTIONS = ("sqlite", "catalog")
+
+_local = threading.local()
+_lock = threading.Lock()
+_tools = {}
+_server = None
+_writer = None
+_exporters_started = False
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "wall", "sections", "response_bytes", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.sections = dict.fromkeys(SECTIONS, 0.0)
+        self.response_bytes = 0
+        self.buckets = [0] * len(WALL_TIME_BUCKETS)
+
+
+def _add_section_time(section: str, seconds: float) -> None:
+    """Charge ``seconds`` of ``section`` time to the tool call on this thread."""
+    call = getattr(_local, "call", None)
+    if call is not None:
+        call[section] += seconds
+
+
+def _response_size(result) -> int:
+    try:
+        return len(json.dumps(result, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _record(name: str, wall: float, sections: dict, result, failed: bool) -> None:
+    response_bytes = _response_size(result)
+    with _lock:
+        stats = _tools.get(name)
+        if stats is None:
+            stats = _tools[name] = _ToolStats()
+        stats.calls += 1
+        stats.errors += failed
+        stats.wall += wall
+        for section, seconds in sections.items():
+            stats.sections[section] += seconds
+        stats.response_bytes += response_bytes
+        for i, bound in enumerate(WALL_TIME_BUCKETS):
+            if wall <= bound:
+                stats.buckets[i] += 1
+                break
+
+
+def instrument_tool(func: Callable) -> Callable:
+    """Wrap a synchronous tool so each call is recorded (no-op when disabled).
+
+    The wrapper keeps the tool's name, docstring and signature, so ADK
+    declares it exactly like the bare function.
+    """
+    if not ENABLED:
+        return func
+    _start_exporters()
+    name = func.__name__
+
+    @functools.wraps(func)
+    def tool(*args, **kwargs):
+        outer = getattr(_local, "call", None)
+        sections = _local.call = dict.fromkeys(SECTIONS, 0.0)
+        started = time.perf_counter()
+        result = None
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = isinstance(result, dict) and result.get("status") == "error"
+            return result
+        finally:
+            wall = time.perf_counter() - started
+            _local.call = outer
+            _record(name, wall, sections, result, failed)
+
+    return tool
+
+
+def timed_section(section: str) -> Callable:
+    """Decorator charging a function's run time to ``section`` (no-op when disabled).
+
+    Nested sections of the same name are charged once, by the outermost one.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            active = getattr(_local, "sections", None)
+            if active is None:
+                active = _local.sections = set()
+            if section in active:
+                return func(*args, **kwargs)
+            active.add(section)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                active.discard(section)
+                _add_section_time(section, time.perf_counter() - started)
+
+        return timed
+
+    return decorator
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that charges statement execution and fetching to SQLite time."""
+
+    def execute(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            _add_section_time("sqlite", time.perf_counter() - started)
+
+    def executemany(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            _add_section_time("sqlite", time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _add_section_time("sqlite", time.perf_counter() - started)
+
+    def fetchmany(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(*args)
+        finally:
+            _add_section_time("sqlite", time.perf_counter() - started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _add_section_time("sqlite", time.perf_counter() - started)
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return super().__next__()
+        finally:
+            _add_section_time("sqlite", time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors and commits are charged to SQLite time.
+
+    ``db.get_connection`` uses it as the connection factory only when
+    metrics are enabled.
+    """
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # The C implementations of these shortcuts bypass cursor().
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _add_section_time("sqlite", time.perf_counter() - started)
+
+    def __exit__(self, *exc_info):
+        started = time.perf_counter()
+        try:
+            return super().__exit__(*exc_info)
+        finally:
+            _add_section_time("sqlite", time.perf_counter() - started)
+
+
+def snapshot() -> dict:
+    """Return the recorded metrics per tool as plain numbers."""
+    with _lock:
+        return {
+            name: {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "wall_seconds": stats.wall,
+                "sqlite_seconds": stats.sections["sqlite"],
+                "catalog_seconds": stats.sections["catalog"],
+                "response_bytes": stats.response_bytes,
+                "wall_buckets": list(stats.buckets),
+            }
+            for name, stats in _tools.items()
+        }
+
+
+def reset() -> None:
+    """Forget every recorded call."""
+    with _lock:
+        _tools.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """Render the metrics in the Prometheus text exposition format."""
+    tools = sorted(snapshot().items())
+    lines = []
+
+    def family(name, kind, help_text, field):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for tool, stats in tools:
+            lines.append(f'{name}{{tool="{_label(tool)}"}} {stats[field]}')
+
+    family("agent_tool_calls_total", "counter", "Tool calls.", "calls")
+    family("agent_tool_errors_total", "counter", "Tool calls that raised or returned an error status.", "errors")
+    family("agent_tool_sqlite_seconds_total", "counter", "Time spent in SQLite during tool calls.", "sqlite_seconds")
+    family("agent_tool_catalog_seconds_total", "counter", "Time spent loading or querying the exercise catalog during tool calls.", "catalog_seconds")
+    family("agent_tool_response_bytes_total", "counter", "JSON size of tool responses.", "response_bytes")
+
+    lines.append("# HELP agent_tool_wall_seconds Wall time of tool calls.")
+    lines.append("# TYPE agent_tool_wall_seconds histogram")
+    for tool, stats in tools:
+        label = _label(tool)
+        cumulative = 0
+        for bound, count in zip(WALL_TIME_BUCKETS, stats["wall_buckets"]):
+            cumulative += count
+            lines.append(f'agent_tool_wall_seconds_bucket{{tool="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'agent_tool_wall_seconds_bucket{{tool="{label}",le="+Inf"}} {stats["calls"]}')
+        lines.append(f'agent_tool_wall_seconds_sum{{tool="{label}"}} {stats["wall_seconds"]}')
+        lines.append(f'agent_tool_wall_seconds_count{{tool="{label}"}} {stats["calls"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str) -> None:
+    """Atomically write the Prometheus text export to ``path``."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1"):
+    """Serve the Prometheus export at ``http://host:port/metrics`` from a daemon thread."""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=_server.serve_forever, name="agent-metrics", daemon=True).start()
+    return _server
+
+
+def _write_periodically(path: str, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            write_prometheus(path)
+        except OSError as e:
+            print(f"agent metrics: cannot write {path}: {e}", file=sys.stderr)
+
+
+def summary() -> str:
+    """Return a per-tool summary table, slowest total wall time first."""
+    rows = sorted(snapshot().items(), key=lambda item: item[1]["wall_seconds"], reverse=True)
+    lines = [
+        f"{'tool':<44}{'calls':>7}{'errors':>7}{'mean ms':>10}"
+        f"{'sqlite ms':>11}{'catalog ms':>12}{'mean bytes':>12}"
+    ]
+    for tool, stats in rows:
+        calls = stats["calls"] or 1
+        lines.append(
+            f"{tool:<44}{stats['calls']:>7}{stats['errors']:>7}"
+            f"{stats['wall_seconds'] / calls * 1000:>10.2f}"
+            f"{stats['sqlite_seconds'] / calls * 1000:>11.2f}"
+            f"{stats['catalog_seconds'] / calls * 1000:>12.2f}"
+            f"{stats['response_bytes'] // calls:>12}"
+        )
+    return "\n".join(lines)
+
+
+def _shutdown(path: Optional[str]) -> None:
+    if _server is not None:
+        _server.shutdown()
+    if path:
+        try:
+            write_prometheus(path)
+        except OSError as e:
+            print(f"agent metrics: cannot write {path}: {e}", file=sys.stderr)
+    if _tools:
+        print("Agent tool metrics:\n" + summary(), file=sys.stderr)
+
+
+def _start_exporters() -> None:
+    global _exporters_started, _writer
+    with _lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    path = os.environ.get("AGENT_METRICS_FILE") or None
+    port = os.environ.get("AGENT_METRICS_PORT")
+    if path:
+        interval = float(os.environ.get("AGENT_METRICS_INTERVAL", DEFAULT_WRITE_INTERVAL))
+        _writer = threading.Thread(
+            target=_write_periodically, args=(path, interval), name="agent-metrics-file", daemon=True
+        )
+        _writer.start()
+    if port:
+        serve_metrics(int(port))
+    atexit.register(_shutdown, path)
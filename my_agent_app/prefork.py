@@ -0,0 +1,239 @@
+"""Pre-fork serving: load the exercise catalog once, then fork the workers.
+
+Worker processes that each load the catalog lazily pay the parse cost once
+per worker and keep a private copy of it. ``preload`` prepares everything the
+tools read in the parent instead, before any worker exists:
+
+- the catalog is served from the compiled, memory-mapped file (compiled
+  here when it is missing or stale), so its columns are read-only pages of
+  the page cache that every worker shares instead of Python objects whose
+  reference counts would dirty (and copy) their pages;
+- the derived data built on first use (value bitsets, the plan templates of
+  every goal and difficulty, the search index file) is built once;
+- ``gc.freeze()`` moves every object that exists at that point out of the
+  collector's reach, so collections in the workers do not write to (and
+  copy) the inherited pages.
+
+``serve`` forks worker processes that inherit that state and run a callable,
+e.g. a server's accept loop; ``plan_pool`` and ``generate_plans`` run plan
+generation on a process pool for batch jobs. Where ``fork`` is unavailable
+the pool falls back to ``spawn`` and each worker loads the catalog once.
+Per-worker memory and throughput for 1/4/16 workers::
+
+    python -m benchmarks.prefork
+"""
+
+import gc
+import multiprocessing
+import os
+import signal
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Optional
+
+try:
+    from . import agent
+    from .catalog import BITSET_FIELDS, compile_catalog, get_catalog
+    from .search import ensure_search_index
+except ImportError:
+    import agent  # type: ignore
+    from catalog import BITSET_FIELDS, compile_catalog, get_catalog  # type: ignore
+    from search import ensure_search_index  # type: ignore
+
+PLAN_CHUNK_SIZE = 256
+# Ages that land in each plan_difficulty bucket.
+_DIFFICULTY_AGES = (30, 70)
+
+
+def fork_available() -> bool:
+    """Return True when workers can be forked from a preloaded parent."""
+    return hasattr(os, "fork") and "fork" in multiprocessing.get_all_start_methods()
+
+
+def preload(path: Optional[str] = None, freeze: bool = True) -> dict:
+    """Load and warm everything the tools read, before forking workers.
+
+    Args:
+        path: Exercise dataset (default: ``agent.DATASET_PATH``).
+        freeze: Call ``gc.freeze()`` afterwards so workers' collections
+            leave the inherited objects alone.
+
+    Returns:
+        The catalog source ("compiled" or "csv"), its row count, the number
+        of plan templates built and the number of frozen objects.
+    """
+    path = path or agent.DATASET_PATH
+    catalog = get_catalog(path)
+    if catalog.source != "compiled":
+        try:
+            compile_catalog(path)
+            catalog = get_catalog(path)
+        except OSError:
+            # Read-only checkout: the workers share the parsed CSV columns.
+            pass
+    for field in BITSET_FIELDS:
+        catalog.bitsets(field)
+    for goal in agent.GOAL_EXERCISE_TYPES:
+        for age in _DIFFICULTY_AGES:
+            agent.generate_weekly_workout_plan_from_profile({"exercise_goal": goal, "age": age})
+    ensure_search_index(path)
+    templates = agent.plan_template_cache_stats()["size"]
+    frozen = 0
+    if freeze:
+        gc.collect()
+        gc.freeze()
+        frozen = gc.get_freeze_count()
+    return {
+        "catalog_source": catalog.source,
+        "rows": len(catalog),
+        "plan_templates": templates,
+        "frozen_objects": frozen,
+    }
+
+
+def serve(
+    target: Callable[[int], None], workers: int, path: Optional[str] = None, warm: bool = True
+) -> list:
+    """Preload the catalog, fork ``workers`` processes and wait for them.
+
+    Each worker calls ``target(worker_index)`` and exits with 0 when it
+    returns (1 if it raises). SIGINT and SIGTERM received by the parent are
+    forwarded to the workers.
+
+    Args:
+        target: What each worker runs, e.g. a server's accept loop.
+        workers: Number of worker processes.
+        path: Exercise dataset (default: ``agent.DATASET_PATH``).
+        warm: Preload before forking; False leaves the workers to load the
+            catalog lazily, as separately started processes do.
+
+    Returns:
+        The workers' exit codes, in worker order.
+    """
+    if not fork_available():
+        raise RuntimeError("pre-fork serving needs os.fork (POSIX)")
+    if warm:
+        preload(path)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pids = []
+    for index in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                target(index)
+                code = 0
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        pids.append(pid)
+
+    def forward(signum, frame):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    previous = {sig: signal.signal(sig, forward) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        return [os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) for pid in pids]
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+
+def _load_in_worker(path: str) -> None:
+    agent.DATASET_PATH = path
+    get_catalog(path)
+
+
+def plan_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Return a process pool for plan generation.
+
+    With ``fork`` the catalog is preloaded (and frozen) in this process first
+    and the workers inherit it; otherwise each ``spawn`` worker loads it once.
+    """
+    if fork_available():
+        preload()
+        return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_load_in_worker,
+        initargs=(agent.DATASET_PATH,),
+    )
+
+
+def _plan_chunk(profiles: list, available_equipment: str) -> list:
+    return [
+        agent.generate_weekly_workout_plan_from_profile(profile, available_equipment)
+        for profile in profiles
+    ]
+
+
+def generate_plans(
+    profiles: list,
+    workers: Optional[int] = None,
+    available_equipment: str = "",
+    pool: Optional[ProcessPoolExecutor] = None,
+) -> list:
+    """Generate weekly plans for many profiles on a process pool.
+
+    Args:
+        profiles: Profile dictionaries, as for
+            ``generate_weekly_workout_plan_from_profile``.
+        workers: Pool size when no ``pool`` is given (default: CPU count).
+        available_equipment: Equipment text applied to every profile.
+        pool: An existing pool from ``plan_pool`` to reuse across calls.
+
+    Returns:
+        The plans, in profile order.
+    """
+    chunks = [
+        profiles[start : start + PLAN_CHUNK_SIZE]
+        for start in range(0, len(profiles), PLAN_CHUNK_SIZE)
+    ]
+    owned = pool is None
+    if owned:
+        pool = plan_pool(workers)
+    try:
+        results = pool.map(_plan_chunk, chunks, repeat(available_equipment))
+        return [plan for chunk in results for plan in chunk]
+    finally:
+        if owned:
+            pool.shutdown()
+
+
+def memory_usage(pid: Optional[int] = None) -> dict:
+    """Return a process's memory in KiB from ``/proc/<pid>/smaps_rollup``.
+
+    ``rss`` counts every resident page, shared ones included; ``pss`` splits
+    shared pages between the processes mapping them; ``uss`` (private clean
+    plus private dirty) is what the process alone costs. Where smaps is not
+    available only the peak RSS of the calling process is reported.
+    """
+    fields = {"Rss": "rss", "Pss": "pss", "Private_Clean": "uss", "Private_Dirty": "uss"}
+    usage = {}
+    try:
+        with open(f"/proc/{pid or 'self'}/smaps_rollup", "r", encoding="ascii") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    key = fields[name]
+                    usage[key] = usage.get(key, 0) + int(value.split()[0])
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and KiB elsewhere.
+        usage["max_rss"] = peak // 1024 if sys.platform == "darwin" else peak
+    return usage
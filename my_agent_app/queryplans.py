@@ -0,0 +1,193 @@
+"""Check the query plans of the SQL the tools actually run.
+
+``capture_tool_queries`` calls every database-backed tool (and the session
+writer's ID reservation and one retention batch) against scratch databases,
+recording each statement they execute with ``set_trace_callback``, so the
+checked SQL cannot drift from the tools' own. ``check_tool_query_plans`` then
+runs ``schema.check_query_plans`` on it: a full table scan or a temporary
+sort is a regression because its cost grows with the table.
+
+Usage (exits non-zero on a regression)::
+
+    python -m my_agent_app.queryplans
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    from . import agent, retention, usercache, writebehind
+    from .db import close_all_connections, get_connection
+    from .schema import check_query_plans, forget_schema
+except ImportError:
+    import agent  # type: ignore
+    import retention  # type: ignore
+    import usercache  # type: ignore
+    import writebehind  # type: ignore
+    from db import close_all_connections, get_connection  # type: ignore
+    from schema import check_query_plans, forget_schema  # type: ignore
+
+# Statements without a query plan worth checking.
+_SKIPPED_PREFIXES = ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "CREATE", "SAVEPOINT", "RELEASE")
+
+
+@contextmanager
+def _recording(paths: dict, queries: dict, tool: list):
+    """Record statements run on this thread's connections to ``paths``."""
+
+    def recorder(database):
+        def record(sql):
+            text = " ".join(sql.split())
+            if not text.upper().startswith(_SKIPPED_PREFIXES):
+                queries[database].setdefault(text, tool[0])
+
+        return record
+
+    connections = [get_connection(path) for path in paths.values()]
+    for database, conn in zip(paths, connections):
+        conn.set_trace_callback(recorder(database))
+    try:
+        yield
+    finally:
+        for conn in connections:
+            conn.set_trace_callback(None)
+
+
+def _run_tools(tool: list) -> None:
+    """Call every database-backed tool so each query shape runs at least once."""
+
+    def call(name, function, *args, **kwargs):
+        tool[0] = name
+        result = function(*args, **kwargs)
+        if isinstance(result, dict) and result.get("status") == "error":
+            raise RuntimeError(f"{name} failed while capturing queries: {result['message']}")
+        return result
+
+    profile = call(
+        "save_user_profile", agent.save_user_profile,
+        "Sample User", 34, "5'10\"", 180, "Strength Building", "bad knee",
+    )
+    call("get_latest_user_profile", agent.get_latest_user_profile)
+    plan = agent.generate_weekly_workout_plan_from_profile(profile)
+    session_ids = [
+        call(
+            "save_session", agent.save_session, profile["profile_id"], "Sample User", profile, plan
+        )["session_id"]
+        for _ in range(3)
+    ]
+    for _ in range(3):
+        call(
+            "add_refinement_to_session", agent.add_refinement_to_session,
+            session_ids[0], "difficulty_increase", {"step": 1},
+        )
+    first = call("get_user_sessions", agent.get_user_sessions, "Sample User", limit=1)
+    call(
+        "get_user_sessions", agent.get_user_sessions,
+        "Sample User", limit=1, cursor=first["next_cursor"],
+    )
+    call("get_user_sessions", agent.get_user_sessions, "Sample User", fields="summary")
+    call("get_latest_user_session", agent.get_latest_user_session, "Sample User")
+    page = call(
+        "get_session_refinements", agent.get_session_refinements, session_ids[0], limit=1
+    )
+    call(
+        "get_session_refinements", agent.get_session_refinements,
+        session_ids[0], after_refinement_id=page["next_after_refinement_id"], limit=1,
+    )
+
+    conn = get_connection(agent.SESSIONS_PATH)
+    tool[0] = "session_writer"
+    writebehind.reserve_session_ids(conn, 1)
+    tool[0] = "retention"
+    archive_dir = retention.archive_dir_for(agent.SESSIONS_PATH)
+    os.makedirs(archive_dir, exist_ok=True)
+    retention.archive_batch(conn, archive_dir, "9999-12-31 00:00:00", 1, 0, 100)
+    first = call("get_archived_sessions", agent.get_archived_sessions, "Sample User", limit=1)
+    call(
+        "get_archived_sessions", agent.get_archived_sessions,
+        "Sample User", limit=1, before_session_id=first["next_before_session_id"],
+    )
+
+
+def capture_tool_queries(directory: Optional[str] = None) -> dict:
+    """Run the tools on scratch databases and return the SQL they executed.
+
+    The per-user cache and write-behind are switched off while the tools
+    run, so every read reaches SQLite on the calling thread.
+
+    Args:
+        directory: Where to create the scratch databases (default: a
+            temporary directory removed afterwards).
+
+    Returns:
+        ``{"profiles": [...], "sessions": [...]}`` with ``(tool, sql, ())``
+        tuples for ``schema.check_query_plans``; parameters are inlined.
+    """
+    if directory is None:
+        with tempfile.TemporaryDirectory(prefix="agent-queryplans-") as tmp:
+            return capture_tool_queries(tmp)
+    paths = {
+        "profiles": os.path.join(directory, "user_profiles.db"),
+        "sessions": os.path.join(directory, "sessions.db"),
+    }
+    queries = {database: {} for database in paths}
+    tool = [None]
+    original = (
+        agent.DB_PATH, agent.SESSIONS_PATH, usercache.CACHE_SIZE, writebehind.ENABLED,
+        os.environ.get("AGENT_ARCHIVE_DIR"),
+    )
+    agent.DB_PATH, agent.SESSIONS_PATH = paths["profiles"], paths["sessions"]
+    usercache.CACHE_SIZE = 0
+    writebehind.ENABLED = False
+    os.environ.pop("AGENT_ARCHIVE_DIR", None)
+    try:
+        agent.init_database()
+        agent.init_sessions_database()
+        with _recording(paths, queries, tool):
+            _run_tools(tool)
+    finally:
+        agent.DB_PATH, agent.SESSIONS_PATH, usercache.CACHE_SIZE, writebehind.ENABLED = original[:4]
+        if original[4] is not None:
+            os.environ["AGENT_ARCHIVE_DIR"] = original[4]
+        close_all_connections()
+        for path in paths.values():
+            forget_schema(path)
+    return {
+        database: [(name, sql, ()) for sql, name in captured.items()]
+        for database, captured in queries.items()
+    }
+
+
+def check_tool_query_plans(profiles_path: str, sessions_path: str, queries: Optional[dict] = None) -> list:
+    """Return ``(tool, plan_detail)`` for every captured query that scans or sorts.
+
+    Args:
+        profiles_path: Migrated profile database to plan against.
+        sessions_path: Migrated sessions database to plan against.
+        queries: Output of ``capture_tool_queries`` (captured when omitted).
+    """
+    queries = queries or capture_tool_queries()
+    return check_query_plans(profiles_path, queries["profiles"]) + check_query_plans(
+        sessions_path, queries["sessions"]
+    )
+
+
+def main() -> int:
+    """Capture the tools' SQL and fail if any query plan regressed."""
+    with tempfile.TemporaryDirectory(prefix="agent-queryplans-") as tmp:
+        queries = capture_tool_queries(tmp)
+        problems = check_tool_query_plans(
+            os.path.join(tmp, "user_profiles.db"), os.path.join(tmp, "sessions.db"), queries
+        )
+    for name, detail in problems:
+        print(f"{name}: {detail}")
+    if not problems:
+        count = sum(len(captured) for captured in queries.values())
+        print(f"All {count} statements the tools run are index-backed.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
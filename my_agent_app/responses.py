@@ -0,0 +1,90 @@
+"""Compact tool responses for the model's context.
+
+Tool results are serialized into the model's context on every turn, so
+their size adds input tokens and time to first token. With
+``AGENT_RESPONSE_MODE=compact`` the plan, exercise, session and form tools
+return compact responses instead of the full ones (the default, ``full``):
+
+- exercises are referenced by their ``exercise_id`` (the index column of
+  ``megaGymDataset.csv``) with the description cut to
+  ``DESCRIPTION_CHARS``; ``get_exercise_details`` returns the full text on
+  demand;
+- decorative prose (emoji titles, form placeholders and help text, the
+  injury warning paragraph) is dropped;
+- the static profile form is built once per process.
+"""
+
+import os
+
+RESPONSE_MODES = ("full", "compact")
+DESCRIPTION_CHARS = 80
+# Plan fields that are prose for the reader, not data the model needs.
+PLAN_PROSE_FIELDS = ("injury_modifications",)
+
+RESPONSE_MODE = os.environ.get("AGENT_RESPONSE_MODE", "full").strip().lower() or "full"
+if RESPONSE_MODE not in RESPONSE_MODES:
+    raise ValueError(
+        f"AGENT_RESPONSE_MODE={RESPONSE_MODE!r}; choose one of {', '.join(RESPONSE_MODES)}"
+    )
+
+
+def compact_enabled() -> bool:
+    """Return True when tools should return compact responses."""
+    return RESPONSE_MODE == "compact"
+
+
+def truncate(text: str, limit: int = DESCRIPTION_CHARS) -> str:
+    """Cut ``text`` to at most ``limit`` characters at a word boundary."""
+    if not text or len(text) <= limit:
+        return text
+    cut = text[: limit - 1]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip(" ,;:.") + "…"
+
+
+def compact_exercise(exercise: dict) -> dict:
+    """Shorten an exercise entry from ``exercise_summary`` (or a stored plan)."""
+    compact = {}
+    if "exercise_id" in exercise:
+        compact["exercise_id"] = exercise["exercise_id"]
+    compact["title"] = exercise.get("title")
+    compact["equipment"] = exercise.get("equipment")
+    rating = exercise.get("rating")
+    if rating not in (None, "", "N/A"):
+        compact["rating"] = rating
+    if exercise.get("description"):
+        compact["description"] = truncate(exercise["description"])
+    for field in ("type", "body_part", "level", "score"):
+        if field in exercise:
+            compact[field] = exercise[field]
+    return compact
+
+
+def compact_plan(plan):
+    """Return a weekly plan with compact exercises and no prose fields.
+
+    Works on freshly generated plans and on plans stored in sessions; values
+    that are not plan dictionaries are returned unchanged.
+    """
+    if not isinstance(plan, dict):
+        return plan
+    compact = {field: value for field, value in plan.items() if field not in PLAN_PROSE_FIELDS}
+    schedule = plan.get("weekly_schedule")
+    if isinstance(schedule, dict):
+        compact["weekly_schedule"] = {
+            day: (
+                {
+                    "focus": entry.get("focus"),
+                    "exercises": [
+                        compact_exercise(ex) if isinstance(ex, dict) else ex
+                        for ex in entry.get("exercises", [])
+                    ],
+                }
+                if isinstance(entry, dict)
+                else entry
+            )
+            for day, entry in schedule.items()
+        }
+    return compact
@@ -0,0 +1,414 @@
+"""Session retention: archive old sessions and compact the sessions database.
+
+Every plan and refinement adds rows to ``sessions.db`` and nothing removed
+them, so scans, backups and the page cache grew with the whole history.
+``run_retention`` moves sessions whose ``last_updated`` is older than
+``older_than_days`` into compressed, append-only archive files, except the
+``keep_latest`` most recent sessions of each user, which stay hot:
+
+- Sessions are archived in batches of ``batch_size``. Each batch is one
+  short write transaction that appends one frame to the archive file, records
+  where each session went in ``archived_sessions``, deletes the session rows
+  and their refinements, and drops profile/plan blobs that no session
+  references any more. Live tools wait at most one batch for the write lock.
+- A frame holds the batch's complete sessions (profile, plan, refinement
+  history) as JSON, compressed like the session blobs (zstd, else zlib), so
+  archives can be read without the sessions database. A frame is only
+  referenced once its batch commits. A crash leaves an unreferenced frame,
+  and the sessions are archived again on the next run.
+- The freed pages are returned to the file system with
+  ``PRAGMA incremental_vacuum`` in steps of ``vacuum_pages`` pages, pausing
+  between steps. Databases created before ``auto_vacuum=INCREMENTAL`` was set
+  need a one-time full ``VACUUM`` first (``--convert-vacuum``), which blocks
+  writers for its duration.
+
+``get_archived_sessions`` (a tool) reads archived sessions back on demand.
+Archives live in ``AGENT_ARCHIVE_DIR`` or next to the database
+(``sessions-archive/``), one file per month of archiving.
+
+Usage::
+
+    python -m my_agent_app.retention --older-than-days 90 --keep-latest 5
+    python -m my_agent_app.retention --convert-vacuum   # once, for old databases
+"""
+
+import os
+import struct
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+try:
+    from . import usercache
+    from .blobs import decode, encode, load_session_payloads
+    from .cache import LRUCache
+    from .db import get_connection
+    from .serialization import dumps, loads
+except ImportError:
+    import usercache  # type: ignore
+    from blobs import decode, encode, load_session_payloads  # type: ignore
+    from cache import LRUCache  # type: ignore
+    from db import get_connection  # type: ignore
+    from serialization import dumps, loads  # type: ignore
+
+DEFAULT_OLDER_THAN_DAYS = 90
+DEFAULT_KEEP_LATEST = 5
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_VACUUM_PAGES = 256
+DEFAULT_PAUSE = 0.01
+FRAME_CACHE_SIZE = 16
+
+FRAME_MAGIC = b"SARC"
+# magic, codec, stored length, uncompressed length, CRC-32 of the stored bytes
+_FRAME_HEADER = struct.Struct("<4s4sIII")
+
+_frames = LRUCache(FRAME_CACHE_SIZE)
+
+
+def archive_dir_for(sessions_path: str) -> str:
+    """Return the archive directory for a sessions database."""
+    configured = os.environ.get("AGENT_ARCHIVE_DIR")
+    if configured:
+        return configured
+    return os.path.splitext(sessions_path)[0] + "-archive"
+
+
+def append_frame(path: str, records: list) -> tuple:
+    """Append one compressed frame of session records to an archive file.
+
+    The frame is flushed and fsynced before returning, so it is durable
+    before the sessions it holds are deleted.
+
+    Returns:
+        ``(offset, stored_bytes)`` of the new frame.
+    """
+    data = dumps(records, "json").encode("utf-8")
+    codec, stored = encode(data)
+    header = _FRAME_HEADER.pack(
+        FRAME_MAGIC, codec.encode("ascii").ljust(4, b"\0"), len(stored), len(data),
+        zlib.crc32(stored),
+    )
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.write(header + stored)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset, len(header) + len(stored)
+
+
+def read_frame(path: str, offset: int) -> list:
+    """Read the session records of the frame at ``offset`` (cached)."""
+    key = (path, offset)
+    records = _frames.get(key)
+    if records is None:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            magic, codec, length, size, crc = _FRAME_HEADER.unpack(f.read(_FRAME_HEADER.size))
+            stored = f.read(length)
+        if magic != FRAME_MAGIC or len(stored) != length or zlib.crc32(stored) != crc:
+            raise ValueError(f"corrupt archive frame at {path}:{offset}")
+        data = decode(codec.rstrip(b"\0").decode("ascii"), stored)
+        if len(data) != size:
+            raise ValueError(f"corrupt archive frame at {path}:{offset}")
+        records = loads(data, "json")
+        _frames.set(key, records)
+    return records
+
+
+def load_archived_sessions(sessions_path: str, rows: list) -> list:
+    """Read archived sessions given ``(session_id, archive_file, frame_offset)`` rows.
+
+    Returns:
+        The archived session records, in the order of ``rows``; a session
+        missing from its frame is skipped.
+    """
+    directory = archive_dir_for(sessions_path)
+    by_frame = {}
+    for session_id, archive_file, frame_offset in rows:
+        by_frame.setdefault((archive_file, frame_offset), []).append(session_id)
+    found = {}
+    for (archive_file, frame_offset), session_ids in by_frame.items():
+        wanted = set(session_ids)
+        for record in read_frame(os.path.join(directory, archive_file), frame_offset):
+            if record["session_id"] in wanted:
+                found[record["session_id"]] = record
+    return [found[row[0]] for row in rows if row[0] in found]
+
+
+def _cutoff(older_than_days: float) -> str:
+    # Same format and time zone (UTC) as SQLite's CURRENT_TIMESTAMP.
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    return cutoff.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _archive_records(conn, sessions: list) -> list:
+    """Build complete archive records for session rows."""
+    ids = [row[0] for row in sessions]
+    placeholders = ", ".join("?" for _ in ids)
+    histories = {}
+    for session_id, created_at, refinement_type, details, details_format in conn.execute(
+        f"""
+        SELECT session_id, created_at, refinement_type, details, details_format
+        FROM session_refinements
+        WHERE session_id IN ({placeholders})
+        ORDER BY session_id, refinement_id
+        """,
+        ids,
+    ):
+        histories.setdefault(session_id, []).append({
+            "timestamp": created_at,
+            "type": refinement_type,
+            "details": loads(details, details_format),
+        })
+    payloads = load_session_payloads(conn, [row[6:11] for row in sessions])
+    return [
+        {
+            "session_id": row[0],
+            "user_id": row[1],
+            "user_name": row[2],
+            "created_at": row[3],
+            "last_updated": row[4],
+            "refinement_count": row[5],
+            "profile": profile,
+            "workout_plan": plan,
+            "refinement_history": histories.get(row[0], []),
+        }
+        for row, (profile, plan) in zip(sessions, payloads)
+    ]
+
+
+def archive_batch(
+    conn, archive_dir: str, cutoff: str, keep_latest: int, after_session_id: int, batch_size: int
+) -> dict:
+    """Archive the next batch of eligible sessions in one write transaction.
+
+    Returns:
+        Counts for the batch, the ``users`` whose sessions were archived and
+        ``next_session_id``, the scan position for the following batch (None
+        when the table has been scanned).
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        candidates = conn.execute(
+            """
+            SELECT session_id, user_name FROM sessions
+            WHERE session_id > ? AND last_updated < ?
+            ORDER BY session_id
+            LIMIT ?
+            """,
+            (after_session_id, cutoff, batch_size),
+        ).fetchall()
+        if not candidates:
+            conn.rollback()
+            return {
+                "archived": 0, "bytes": 0, "blobs_deleted": 0, "users": [], "next_session_id": None
+            }
+        kept = set()
+        for user_name in {user_name for _, user_name in candidates}:
+            kept.update(
+                session_id
+                for (session_id,) in conn.execute(
+                    """
+                    SELECT session_id FROM sessions
+                    WHERE user_name = ?
+                    ORDER BY last_updated DESC, session_id DESC
+                    LIMIT ?
+                    """,
+                    (user_name, keep_latest),
+                )
+            )
+        ids = [session_id for session_id, _ in candidates if session_id not in kept]
+        archived = frame_bytes = blobs_deleted = 0
+        users = []
+        if ids:
+            placeholders = ", ".join("?" for _ in ids)
+            sessions = conn.execute(
+                f"""
+                SELECT session_id, user_id, user_name, created_at, last_updated,
+                       refinement_count, profile_data, workout_plan, payload_format,
+                       profile_hash, plan_hash
+                FROM sessions
+                WHERE session_id IN ({placeholders})
+                ORDER BY session_id
+                """,
+                ids,
+            ).fetchall()
+            archive_file = "sessions-" + datetime.now(timezone.utc).strftime("%Y-%m") + ".archive"
+            offset, frame_bytes = append_frame(
+                os.path.join(archive_dir, archive_file), _archive_records(conn, sessions)
+            )
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO archived_sessions
+                    (session_id, user_name, created_at, last_updated, refinement_count,
+                     archive_file, frame_offset)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(row[0], row[2], row[3], row[4], row[5], archive_file, offset) for row in sessions],
+            )
+            conn.execute(f"DELETE FROM session_refinements WHERE session_id IN ({placeholders})", ids)
+            conn.execute(f"DELETE FROM sessions WHERE session_id IN ({placeholders})", ids)
+            hashes = {h for row in sessions for h in row[9:11] if h is not None}
+            for digest in hashes:
+                referenced = conn.execute(
+                    """
+                    SELECT 1 FROM sessions WHERE profile_hash = ?
+                    UNION ALL
+                    SELECT 1 FROM sessions WHERE plan_hash = ?
+                    LIMIT 1
+                    """,
+                    (digest, digest),
+                ).fetchone()
+                if referenced is None:
+                    conn.execute("DELETE FROM session_blobs WHERE hash = ?", (digest,))
+                    blobs_deleted += 1
+            archived = len(sessions)
+            users = sorted({row[2] for row in sessions})
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return {
+        "archived": archived,
+        "bytes": frame_bytes,
+        "blobs_deleted": blobs_deleted,
+        "users": users,
+        "next_session_id": candidates[-1][0],
+    }
+
+
+def incremental_vacuum(
+    conn, step_pages: int = DEFAULT_VACUUM_PAGES, pause: float = DEFAULT_PAUSE,
+    max_seconds: Optional[float] = None,
+) -> int:
+    """Return free pages to the file system in bounded steps.
+
+    Each step frees at most ``step_pages`` pages in its own short write
+    transaction, then sleeps ``pause`` seconds so live writers get the lock.
+
+    Returns:
+        The number of pages freed; 0 when the database does not use
+        ``auto_vacuum=INCREMENTAL`` (see ``convert_to_incremental_vacuum``).
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    freed = 0
+    deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+    while True:
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if before == 0 or (deadline is not None and time.monotonic() >= deadline):
+            return freed
+        conn.execute(f"PRAGMA incremental_vacuum({int(step_pages)})").fetchall()
+        freed += before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        time.sleep(pause)
+
+
+def convert_to_incremental_vacuum(conn) -> None:
+    """Switch an existing database to ``auto_vacuum=INCREMENTAL`` (full VACUUM, blocking)."""
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def run_retention(
+    sessions_path: str,
+    older_than_days: float = DEFAULT_OLDER_THAN_DAYS,
+    keep_latest: int = DEFAULT_KEEP_LATEST,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    vacuum_pages: int = DEFAULT_VACUUM_PAGES,
+    pause: float = DEFAULT_PAUSE,
+    max_seconds: Optional[float] = None,
+) -> dict:
+    """Archive old sessions and compact the sessions database.
+
+    Args:
+        sessions_path: Sessions database (already migrated).
+        older_than_days: Archive sessions last updated before this many days ago.
+        keep_latest: Sessions per user that stay hot regardless of age.
+        batch_size: Sessions examined per write transaction.
+        vacuum_pages: Pages freed per incremental_vacuum step.
+        pause: Seconds to sleep between batches and vacuum steps.
+        max_seconds: Stop archiving (and vacuuming) after this long; the
+            next run continues where this one stopped.
+
+    Returns:
+        Counts of archived sessions, archive bytes written, deleted blobs,
+        freed pages and the file size before and after.
+    """
+    started = time.monotonic()
+    deadline = started + max_seconds if max_seconds is not None else None
+    conn = get_connection(sessions_path)
+    archive_dir = archive_dir_for(sessions_path)
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = _cutoff(older_than_days)
+    size_before = os.path.getsize(sessions_path)
+    report = {"archived": 0, "archive_bytes": 0, "blobs_deleted": 0, "batches": 0}
+    after = 0
+    while after is not None and (deadline is None or time.monotonic() < deadline):
+        batch = archive_batch(conn, archive_dir, cutoff, keep_latest, after, batch_size)
+        report["archived"] += batch["archived"]
+        report["archive_bytes"] += batch["bytes"]
+        report["blobs_deleted"] += batch["blobs_deleted"]
+        for user_name in batch["users"]:
+            usercache.invalidate(sessions_path, user_name)
+        report["batches"] += 1
+        after = batch["next_session_id"]
+        if after is not None:
+            time.sleep(pause)
+    report["complete"] = after is None
+    report["free_pages"] = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    report["incremental_vacuum"] = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+    report["pages_freed"] = incremental_vacuum(conn, vacuum_pages, pause, remaining)
+    report["bytes_before"] = size_before
+    report["bytes_after"] = os.path.getsize(sessions_path)
+    report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    return report
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command-line entry point for the retention job."""
+    import argparse
+
+    try:
+        from . import agent
+    except ImportError:
+        import agent  # type: ignore
+
+    parser = argparse.ArgumentParser(description="Archive old sessions and compact sessions.db.")
+    parser.add_argument("--sessions-db", default=agent.SESSIONS_PATH)
+    parser.add_argument("--older-than-days", type=float, default=DEFAULT_OLDER_THAN_DAYS)
+    parser.add_argument("--keep-latest", type=int, default=DEFAULT_KEEP_LATEST,
+                        help="Sessions per user kept hot regardless of age")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--vacuum-pages", type=int, default=DEFAULT_VACUUM_PAGES,
+                        help="Pages freed per incremental_vacuum step")
+    parser.add_argument("--pause-ms", type=float, default=DEFAULT_PAUSE * 1000,
+                        help="Sleep between batches and vacuum steps")
+    parser.add_argument("--max-seconds", type=float, help="Stop after this long")
+    parser.add_argument("--convert-vacuum", action="store_true",
+                        help="Enable incremental vacuum on an existing database (full VACUUM)")
+    args = parser.parse_args(argv)
+
+    agent.SESSIONS_PATH = args.sessions_db
+    agent.init_sessions_database()
+    if args.convert_vacuum:
+        convert_to_incremental_vacuum(get_connection(args.sessions_db))
+    report = run_retention(
+        args.sessions_db,
+        older_than_days=args.older_than_days,
+        keep_latest=args.keep_latest,
+        batch_size=args.batch_size,
+        vacuum_pages=args.vacuum_pages,
+        pause=args.pause_ms / 1000,
+        max_seconds=args.max_seconds,
+    )
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    if not report["incremental_vacuum"] and report["free_pages"]:
+        print("sessions.db does not use incremental vacuum; run once with --convert-vacuum")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,372 @@
+"""Versioned schema migrations for the profile and session databases.
+
+Each database records the migrations applied to it in a ``schema_version``
+table. ``ensure_schema`` applies any missing steps in order the first time a
+process touches a database file and is a set lookup afterwards, so tools no
+longer run ``CREATE TABLE`` on every call. Files created before versioning
+existed upgrade in place because the first migration only creates what is
+missing.
+
+To change a schema, append a ``(version, description, step)`` tuple to the
+relevant list; never edit or reorder a migration that has shipped.
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Optional
+
+try:
+    from .blobs import session_payload_values
+    from .db import get_connection
+except ImportError:
+    from blobs import session_payload_values  # type: ignore
+    from db import get_connection  # type: ignore
+
+
+def _create_user_profiles(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            age INTEGER NOT NULL,
+            height TEXT NOT NULL,
+            weight INTEGER NOT NULL,
+            exercise_goal TEXT NOT NULL,
+            injury TEXT DEFAULT 'None',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def _create_sessions(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            user_name TEXT NOT NULL,
+            profile_data JSON NOT NULL,
+            workout_plan JSON NOT NULL,
+            refinement_history JSON DEFAULT '[]',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES user_profiles(id)
+        )
+        """
+    )
+
+
+def _index_user_profiles_created_at(conn: sqlite3.Connection) -> None:
+    # id is the rowid, so the index also orders ties by id.
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_user_profiles_created_at
+        ON user_profiles (created_at)
+        """
+    )
+
+
+def _index_sessions_user_last_updated(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_sessions_user_last_updated
+        ON sessions (user_name, last_updated)
+        """
+    )
+
+
+def _create_session_refinements(conn: sqlite3.Connection) -> None:
+    """Move refinement history out of the sessions JSON column into its own table."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS session_refinements (
+            refinement_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            refinement_type TEXT NOT NULL,
+            details JSON NOT NULL,
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_session_refinements_session
+        ON session_refinements (session_id, refinement_id)
+        """
+    )
+    conn.execute(
+        "ALTER TABLE sessions ADD COLUMN refinement_count INTEGER NOT NULL DEFAULT 0"
+    )
+
+    last_session_id = 0
+    while True:
+        batch = conn.execute(
+            """
+            SELECT session_id, refinement_history FROM sessions
+            WHERE session_id > ? AND refinement_history NOT IN ('', '[]')
+            ORDER BY session_id
+            LIMIT 500
+            """,
+            (last_session_id,),
+        ).fetchall()
+        if not batch:
+            break
+        for session_id, history_json in batch:
+            try:
+                history = json.loads(history_json) or []
+            except (TypeError, ValueError):
+                history = []
+            conn.executemany(
+                """
+                INSERT INTO session_refinements (session_id, created_at, refinement_type, details)
+                VALUES (?, ?, ?, ?)
+                """,
+                [
+                    (
+                        session_id,
+                        entry.get("timestamp") or "",
+                        entry.get("type") or "",
+                        json.dumps(entry.get("details")),
+                    )
+                    for entry in history
+                    if isinstance(entry, dict)
+                ],
+            )
+            conn.execute(
+                """
+                UPDATE sessions SET refinement_history = '[]', refinement_count = ?
+                WHERE session_id = ?
+                """,
+                (len(history), session_id),
+            )
+        last_session_id = batch[-1][0]
+
+
+def _create_session_blobs(conn: sqlite3.Connection) -> None:
+    """Store profiles and shared plan parts once per content hash (see blobs.py)."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS session_blobs (
+            hash BLOB PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("ALTER TABLE sessions ADD COLUMN profile_hash BLOB")
+    conn.execute("ALTER TABLE sessions ADD COLUMN plan_hash BLOB")
+
+    last_session_id = 0
+    while True:
+        batch = conn.execute(
+            """
+            SELECT session_id, profile_data, workout_plan FROM sessions
+            WHERE session_id > ?
+            ORDER BY session_id
+            LIMIT 500
+            """,
+            (last_session_id,),
+        ).fetchall()
+        if not batch:
+            break
+        for session_id, profile_json, plan_json in batch:
+            try:
+                profile, plan = json.loads(profile_json), json.loads(plan_json)
+            except (TypeError, ValueError):
+                continue
+            conn.execute(
+                """
+                UPDATE sessions
+                SET profile_data = ?, workout_plan = ?, profile_hash = ?, plan_hash = ?
+                WHERE session_id = ?
+                """,
+                session_payload_values(conn, profile, plan) + (session_id,),
+            )
+        last_session_id = batch[-1][0]
+
+
+def _add_payload_formats(conn: sqlite3.Connection) -> None:
+    """Tag stored payloads with their serialization format (see serialization.py)."""
+    conn.execute("ALTER TABLE session_blobs ADD COLUMN format TEXT NOT NULL DEFAULT 'json'")
+    conn.execute("ALTER TABLE sessions ADD COLUMN payload_format TEXT NOT NULL DEFAULT 'json'")
+    conn.execute(
+        "ALTER TABLE session_refinements ADD COLUMN details_format TEXT NOT NULL DEFAULT 'json'"
+    )
+
+
+def _create_archived_sessions(conn: sqlite3.Connection) -> None:
+    """Index sessions moved to archive files (see retention.py) and blob references."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archived_sessions (
+            session_id INTEGER PRIMARY KEY,
+            user_name TEXT NOT NULL,
+            created_at TIMESTAMP,
+            last_updated TIMESTAMP,
+            refinement_count INTEGER NOT NULL DEFAULT 0,
+            archive_file TEXT NOT NULL,
+            frame_offset INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_archived_sessions_user
+        ON archived_sessions (user_name, session_id)
+        """
+    )
+    # Let the retention job find out whether a blob is still referenced
+    # without scanning the sessions table.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_profile_hash ON sessions (profile_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_plan_hash ON sessions (plan_hash)")
+
+
+PROFILE_MIGRATIONS = [
+    (1, "create user_profiles", _create_user_profiles),
+    (2, "index user_profiles by created_at", _index_user_profiles_created_at),
+]
+
+SESSION_MIGRATIONS = [
+    (1, "create sessions", _create_sessions),
+    (2, "index sessions by user_name, last_updated", _index_sessions_user_last_updated),
+    (3, "append-only session_refinements table", _create_session_refinements),
+    (4, "content-addressed session_blobs for profiles and plans", _create_session_blobs),
+    (5, "per-row serialization format tags", _add_payload_formats),
+    (6, "archived_sessions index and blob reference indexes", _create_archived_sessions),
+]
+
+_ensured = set()
+_ensured_lock = threading.Lock()
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Return the highest migration version applied to a database (0 if none)."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection, migrations: list) -> int:
+    """Apply pending migrations to a database in version order.
+
+    All pending steps run in one ``BEGIN IMMEDIATE`` transaction, so processes
+    starting at the same time apply them exactly once and a failing step
+    leaves the database at its previous version.
+
+    Args:
+        conn: Connection to the database to upgrade.
+        migrations: ``(version, description, step)`` tuples; ``step`` is
+            called with the connection.
+
+    Returns:
+        The schema version after migrating.
+    """
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = schema_version(conn)
+        for version, description, step in sorted(migrations, key=lambda m: m[0]):
+            if version <= current:
+                continue
+            step(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            current = version
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return current
+
+
+def ensure_schema(path: str, migrations: list) -> None:
+    """Bring the database at ``path`` up to date once per process.
+
+    Args:
+        path: Path to the SQLite database file.
+        migrations: Migration list for that database.
+    """
+    if path in _ensured:
+        return
+    with _ensured_lock:
+        if path not in _ensured:
+            migrate(get_connection(path), migrations)
+            _ensured.add(path)
+
+
+def check_query_plans(path: str, queries: list) -> list:
+    """Report hot queries whose plan falls back to a full scan or a sort.
+
+    Runs ``EXPLAIN QUERY PLAN`` for each query. A plan step that scans a
+    table without an index, or builds a temporary B-tree to sort, counts
+    as a regression because its cost grows with the table. Scans of
+    ``sqlite_sequence`` (one row per AUTOINCREMENT table) are allowed.
+
+    A dedicated connection is used because cached ``EXPLAIN`` statements are
+    not re-planned after the schema changes.
+
+    Args:
+        path: Path to a migrated database file.
+        queries: ``(name, sql, params)`` tuples, e.g. from
+            ``queryplans.capture_tool_queries``.
+
+    Returns:
+        A list of ``(name, plan_detail)`` tuples, empty when every query is
+        index-backed.
+    """
+    problems = []
+    conn = sqlite3.connect(path)
+    try:
+        for name, sql, params in queries:
+            for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+                detail = row[-1]
+                full_scan = (
+                    detail.startswith("SCAN ")
+                    and " USING " not in detail
+                    and detail != "SCAN sqlite_sequence"
+                )
+                if full_scan or "TEMP B-TREE" in detail:
+                    problems.append((name, detail))
+    finally:
+        conn.close()
+    return problems
+
+
+def forget_schema(path: Optional[str] = None) -> None:
+    """Make the next ``ensure_schema`` call re-check a database (or all of them).
+
+    Needed when a database file is replaced or deleted while the process runs.
+    """
+    with _ensured_lock:
+        if path is None:
+            _ensured.clear()
+        else:
+            _ensured.discard(path)
+
+
+def _main() -> int:
+    """Check the tools' query plans (see queryplans.py)."""
+    try:
+        from .queryplans import main
+    except ImportError:
+        from queryplans import main  # type: ignore
+    return main()
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
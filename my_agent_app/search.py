@@ -0,0 +1,287 @@
+"""Full-text exercise search over an SQLite FTS5 index.
+
+The exercise catalog only answers exact (Type, BodyPart, Level) lookups.
+``search`` ranks exercises by BM25 over their titles, category tags and
+descriptions, with optional exact filters on equipment, level and body part,
+so a request like "band exercises for lower back" is answered in
+milliseconds.
+
+The index is a small SQLite file next to the dataset
+(``megaGymDataset.search.db``). It is built from the loaded catalog on first
+use and rebuilt when the dataset changes; its rowids are catalog row ids, so
+results are returned as regular catalog rows. Each thread reads it through
+its own read-only connection, outside the profile/session connection pool.
+To build it ahead of time and try a query::
+
+    python my_agent_app/search.py "band exercises for lower back"
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Optional
+from urllib.request import pathname2url
+
+try:
+    from .catalog import _file_signature, compiled_path_for, get_catalog
+    from . import metrics
+except ImportError:
+    from catalog import _file_signature, compiled_path_for, get_catalog  # type: ignore
+    import metrics  # type: ignore
+
+INDEX_VERSION = 1
+# BM25 column weights: a term in the title counts more than one in the
+# category tags (type, body part, equipment), which counts more than one in
+# the description.
+TITLE_WEIGHT = 5.0
+TAGS_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+MAX_RESULTS = 50
+# Words that appear in most descriptions or carry no meaning in a request;
+# matching on them would rank nearly every exercise.
+STOPWORDS = frozenset(
+    "a an and are as at be by exercise exercises for from i in is it me my of on or "
+    "some that the this to with workout workouts".split()
+)
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+_fresh = {}
+_fresh_lock = threading.Lock()
+_local = threading.local()
+
+
+def search_index_path_for(path: str) -> str:
+    """Return the default search index path for a CSV dataset."""
+    return os.path.splitext(path)[0] + ".search.db"
+
+
+def _dataset_signature(path: str) -> str:
+    """Identify the dataset version the catalog (and so the index) is built from."""
+    signature = _file_signature(path) or _file_signature(compiled_path_for(path))
+    return json.dumps([INDEX_VERSION, signature])
+
+
+def _index_signature(index_path: str) -> Optional[str]:
+    if not os.path.exists(index_path):
+        return None
+    conn = sqlite3.connect(index_path)
+    try:
+        row = conn.execute("SELECT value FROM index_meta WHERE key = 'signature'").fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def build_search_index(path: str, index_path: Optional[str] = None) -> dict:
+    """Build the FTS5 index for the dataset at ``path``.
+
+    The index is written to a temporary file and moved into place, so
+    readers never see a partial index.
+
+    Args:
+        path: Path to the exercise CSV file.
+        index_path: Output path (default: ``search_index_path_for(path)``).
+
+    Returns:
+        A dictionary with the index path and number of indexed exercises.
+    """
+    index_path = index_path or search_index_path_for(path)
+    signature = _dataset_signature(path)
+    catalog = get_catalog(path)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(
+            """
+            CREATE TABLE index_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE exercises (
+                row_id INTEGER PRIMARY KEY,
+                equipment TEXT NOT NULL,
+                level TEXT NOT NULL,
+                body_part TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE exercise_fts USING fts5(
+                title, tags, description, tokenize = 'porter unicode61'
+            );
+            """
+        )
+        text = catalog.text
+        with conn:
+            conn.executemany(
+                "INSERT INTO exercises (row_id, equipment, level, body_part) VALUES (?, ?, ?, ?)",
+                (
+                    (row.row_id, row.get("Equipment"), row.get("Level"), row.get("BodyPart"))
+                    for row in map(catalog.row, range(len(catalog)))
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO exercise_fts (rowid, title, tags, description) VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        i,
+                        text["Title"][i],
+                        " ".join(catalog.row(i).get(f) for f in ("Type", "BodyPart", "Equipment")),
+                        text["Desc"][i],
+                    )
+                    for i in range(len(catalog))
+                ),
+            )
+            conn.execute(
+                "INSERT INTO index_meta (key, value) VALUES ('signature', ?)", (signature,)
+            )
+        conn.execute("INSERT INTO exercise_fts (exercise_fts) VALUES ('optimize')")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, index_path)
+    return {"path": index_path, "exercises": len(catalog)}
+
+
+def ensure_search_index(path: str) -> str:
+    """Return the path of an up-to-date search index, building it if needed.
+
+    After the first call a process only compares the dataset's file
+    signature. When the dataset changed, each thread reopens its index
+    connection on its next search (see ``_index_connection``).
+    """
+    index_path = search_index_path_for(path)
+    signature = _dataset_signature(path)
+    if _fresh.get(index_path) == signature:
+        return index_path
+    with _fresh_lock:
+        if _fresh.get(index_path) != signature:
+            if _index_signature(index_path) != signature:
+                build_search_index(path, index_path)
+            _fresh[index_path] = signature
+    return index_path
+
+
+def _index_connection(index_path: str) -> sqlite3.Connection:
+    """Return this thread's read-only connection to the current index file.
+
+    The index is a shipped, rebuild-only artifact, so it is opened with
+    ``mode=ro`` instead of through ``db.get_connection``: no WAL or
+    auto_vacuum pragmas and no ``-wal``/``-shm`` files next to the dataset.
+    A connection opened before the index was rebuilt still reads the
+    replaced file, so it is closed and reopened by the thread that owns it.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None or _local.pid != os.getpid():
+        # After a fork the parent's handles are dropped, not closed.
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+    signature = _fresh.get(index_path)
+    opened = connections.get(index_path)
+    if opened is not None and opened[0] == signature:
+        return opened[1]
+    if opened is not None:
+        opened[1].close()
+    conn = sqlite3.connect(
+        f"file:{pathname2url(os.path.abspath(index_path))}?mode=ro",
+        uri=True,
+        factory=metrics.TimedConnection if metrics.ENABLED else sqlite3.Connection,
+    )
+    connections[index_path] = (signature, conn)
+    return conn
+
+
+def match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query matching any of its words.
+
+    Each word is quoted, so FTS5 operators and punctuation in user input are
+    treated as plain text; BM25 ranks rows matching more (and rarer) words
+    first. Stopwords are dropped unless the query has nothing else.
+    """
+    terms = _TERM.findall(query.lower())
+    terms = [term for term in terms if term not in STOPWORDS] or terms
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+
+def search(
+    path: str,
+    query: str,
+    equipment: str = "",
+    level: str = "",
+    body_part: str = "",
+    limit: int = 10,
+) -> list:
+    """Rank exercises for ``query`` with BM25, applying exact filters.
+
+    Args:
+        path: Path to the exercise CSV file.
+        query: Free-text query over titles and descriptions.
+        equipment: Required equipment (case-insensitive); empty for any.
+        level: Required level (case-insensitive); empty for any.
+        body_part: Required body part (case-insensitive); empty for any.
+        limit: Maximum number of results (1-50).
+
+    Returns:
+        ``(row_id, score)`` pairs, best first; lower BM25 scores rank higher.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    where = ["exercise_fts MATCH ?"]
+    params = [expression]
+    for column, value in (("equipment", equipment), ("level", level), ("body_part", body_part)):
+        if value and value.strip():
+            where.append(f"e.{column} = ? COLLATE NOCASE")
+            params.append(value.strip())
+    params.append(max(1, min(int(limit), MAX_RESULTS)))
+    conn = _index_connection(ensure_search_index(path))
+    return conn.execute(
+        f"""
+        SELECT exercise_fts.rowid, bm25(exercise_fts, {TITLE_WEIGHT}, {TAGS_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score
+        FROM exercise_fts
+        JOIN exercises e ON e.row_id = exercise_fts.rowid
+        WHERE {" AND ".join(where)}
+        ORDER BY score, exercise_fts.rowid
+        LIMIT ?
+        """,
+        params,
+    ).fetchall()
+
+
+def _main(argv: Optional[list] = None) -> None:
+    """Command-line entry point: rebuild the index and run a query against it."""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build and query the exercise search index.")
+    parser.add_argument("query", nargs="?", default="")
+    parser.add_argument(
+        "--dataset", default=os.path.join(os.path.dirname(__file__), "megaGymDataset.csv")
+    )
+    parser.add_argument("--equipment", default="")
+    parser.add_argument("--level", default="")
+    parser.add_argument("--body-part", default="")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    report = build_search_index(args.dataset)
+    print(f"Indexed {report['exercises']} exercises into {report['path']} "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+    if args.query:
+        catalog = get_catalog(args.dataset)
+        started = time.perf_counter()
+        results = search(
+            args.dataset, args.query, args.equipment, args.level, args.body_part, args.limit
+        )
+        print(f"{len(results)} results in {(time.perf_counter() - started) * 1000:.2f} ms")
+        for row_id, score in results:
+            row = catalog.row(row_id)
+            print(f"{-score:8.3f}  {row.title}  [{row.get('BodyPart')}, {row.get('Equipment')}, "
+                  f"{row.get('Level')}]")
+
+
+if __name__ == "__main__":
+    _main()
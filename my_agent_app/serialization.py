@@ -0,0 +1,120 @@
+"""Pluggable serializer for session payloads.
+
+Profiles, plans and refinement details are encoded on every session write
+and decoded on every read. ``dumps`` and ``loads`` pick the fastest encoder
+installed for a format:
+
+- ``"json"``: JSON text, encoded and decoded with ``orjson`` when it is
+  installed and with the standard library otherwise. Both produce the same
+  compact, UTF-8 text for plan payloads, so rows (and content hashes) do
+  not depend on which one wrote them.
+- ``"msgpack"``: MessagePack bytes, available when ``msgpack`` is installed.
+
+Every stored payload carries its format tag, so rows written in different
+formats coexist and stay readable. New rows use ``WRITE_FORMAT``: the
+``AGENT_SESSION_FORMAT`` environment variable when set, otherwise
+``"json"`` when ``orjson`` is installed (or nothing faster is),
+``"msgpack"`` when only ``msgpack`` is.
+
+The optional encoders are imported on first use (``orjson`` alone costs
+more than 10 ms of start-up), so importing this module stays cheap.
+"""
+
+import importlib
+import importlib.util
+import json
+import os
+from typing import Union
+
+FORMATS = ("json", "msgpack")
+
+_modules = {}
+
+
+def optional_module(name: str):
+    """Import an optional encoder module on first use; None if not installed."""
+    try:
+        return _modules[name]
+    except KeyError:
+        pass
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        module = None
+    _modules[name] = module
+    return module
+
+
+def _installed(name: str) -> bool:
+    if name in _modules:
+        return _modules[name] is not None
+    return importlib.util.find_spec(name) is not None
+
+
+def available_formats() -> tuple:
+    """Return the formats this process can read and write."""
+    return tuple(f for f in FORMATS if f != "msgpack" or _installed("msgpack"))
+
+
+def _write_format() -> str:
+    default = "msgpack" if not _installed("orjson") and _installed("msgpack") else "json"
+    requested = os.environ.get("AGENT_SESSION_FORMAT", "").strip().lower() or default
+    if requested not in available_formats():
+        raise ValueError(
+            f"AGENT_SESSION_FORMAT={requested!r} is not available; "
+            f"choose one of {', '.join(available_formats())}"
+        )
+    return requested
+
+
+WRITE_FORMAT = _write_format()
+
+
+def _json_dumps(value) -> str:
+    orjson = optional_module("orjson")
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            # Non-string keys or types orjson rejects; the standard library
+            # coerces keys to strings as the tools always have.
+            pass
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps(value, format: str = WRITE_FORMAT) -> Union[str, bytes]:
+    """Encode a payload.
+
+    Args:
+        value: JSON-compatible value.
+        format: "json" (returns text) or "msgpack" (returns bytes).
+
+    Returns:
+        The encoded payload.
+    """
+    if format == "json":
+        return _json_dumps(value)
+    if format == "msgpack":
+        msgpack = optional_module("msgpack")
+        if msgpack is None:
+            raise ValueError("msgpack format requested but msgpack is not installed")
+        return msgpack.packb(value, use_bin_type=True)
+    raise ValueError(f"Unknown serialization format: {format!r}")
+
+
+def loads(data: Union[str, bytes], format: str = "json"):
+    """Decode a payload written by ``dumps`` in ``format``."""
+    if format == "json":
+        orjson = optional_module("orjson")
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    if format == "msgpack":
+        msgpack = optional_module("msgpack")
+        if msgpack is None:
+            raise ValueError("payload is msgpack-encoded but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    raise ValueError(f"Unknown serialization format: {format!r}")
+
+
+def to_bytes(data: Union[str, bytes]) -> bytes:
+    """Return an encoded payload as bytes (for hashing and compression)."""
+    return data.encode("utf-8") if isinstance(data, str) else data
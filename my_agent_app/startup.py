@@ -0,0 +1,184 @@
+"""Start-up profiler: what each phase of a cold start costs.
+
+Every run starts a fresh interpreter and times, in order:
+
+1. ``import my_agent_app`` (the package ADK discovers);
+2. ``import my_agent_app.agent`` (the tool functions);
+3. building ``root_agent`` (imports ``google.adk``; skipped if missing);
+4. the first exercise catalog load;
+5. the first database use (schema check on scratch copies, so the real
+   ``user_profiles.db`` / ``sessions.db`` are never touched);
+6. the first plan generation.
+
+It also checks that the imports opened no database connection and created
+no database file. The median of several runs is reported; ``--importtime``
+adds the slowest modules from ``python -X importtime``.
+
+Usage (from the repository root)::
+
+    python -m my_agent_app.startup
+    python -m my_agent_app.startup --runs 10 --importtime 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional
+
+PHASES = (
+    "import my_agent_app",
+    "import my_agent_app.agent",
+    "build root_agent",
+    "first catalog load",
+    "first database use",
+    "first plan",
+)
+SAMPLE_PROFILE = {
+    "profile_id": 1,
+    "name": "Startup Probe",
+    "age": 35,
+    "height": "5'10\"",
+    "weight": 170,
+    "exercise_goal": "Strength Building",
+    "injury": "None",
+}
+
+
+def _measure_phases() -> dict:
+    """Time each start-up phase in this (fresh) interpreter."""
+    import importlib.util
+    import tempfile
+
+    timings = {}
+    started = time.perf_counter()
+    import my_agent_app  # noqa: F401
+
+    timings["import my_agent_app"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    from my_agent_app import agent, db
+
+    timings["import my_agent_app.agent"] = time.perf_counter() - started
+    side_effects = {
+        "database_files": [
+            path for path in (agent.DB_PATH, agent.SESSIONS_PATH) if os.path.exists(path)
+        ],
+        "open_connections": len(db._all_connections),
+        "google_adk_imported": "google.adk" in sys.modules,
+    }
+
+    if importlib.util.find_spec("google") and importlib.util.find_spec("google.adk"):
+        started = time.perf_counter()
+        agent.build_root_agent()
+        timings["build root_agent"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    agent.get_catalog(agent.DATASET_PATH)
+    timings["first catalog load"] = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent.DB_PATH = os.path.join(tmp, "user_profiles.db")
+        agent.SESSIONS_PATH = os.path.join(tmp, "sessions.db")
+        started = time.perf_counter()
+        agent.init_database()
+        agent.init_sessions_database()
+        timings["first database use"] = time.perf_counter() - started
+        db.close_all_connections()
+
+    started = time.perf_counter()
+    agent.generate_weekly_workout_plan_from_profile(SAMPLE_PROFILE)
+    timings["first plan"] = time.perf_counter() - started
+    return {"timings": timings, "side_effects": side_effects}
+
+
+def _root_dir() -> str:
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_child(args: list) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=_root_dir(), capture_output=True, text=True, check=True
+    )
+
+
+def profile_startup(runs: int = 5) -> dict:
+    """Run the phases in ``runs`` fresh interpreters.
+
+    Returns:
+        Median seconds per phase, the total, and the import side effects
+        seen in the first run.
+    """
+    samples = []
+    for _ in range(runs):
+        child = _run_child(["-m", "my_agent_app.startup", "--child"])
+        samples.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    phases = {
+        phase: statistics.median(s["timings"][phase] for s in samples)
+        for phase in PHASES
+        if phase in samples[0]["timings"]
+    }
+    return {
+        "runs": runs,
+        "phases": phases,
+        "total": sum(phases.values()),
+        "side_effects": samples[0]["side_effects"],
+    }
+
+
+def importtime_summary(top: int = 15, module: str = "my_agent_app.agent") -> list:
+    """Return the ``top`` slowest imports of ``module`` by cumulative time.
+
+    Returns:
+        ``(module, self_seconds, cumulative_seconds)`` tuples, slowest first.
+    """
+    child = _run_child(["-X", "importtime", "-c", f"import {module}"])
+    rows = []
+    for line in child.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:top]
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile the agent's cold start.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", type=int, metavar="N", default=0,
+                        help="also list the N slowest imports of my_agent_app.agent")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_measure_phases()))
+        return 0
+
+    report = profile_startup(max(1, args.runs))
+    print(f"Cold start, median of {report['runs']} fresh interpreters:")
+    for phase, seconds in report["phases"].items():
+        print(f"  {phase:<28}{seconds * 1000:>9.1f} ms")
+    if "build root_agent" not in report["phases"]:
+        print(f"  {'build root_agent':<28}{'skipped':>9}  (google.adk is not installed)")
+    print(f"  {'total':<28}{report['total'] * 1000:>9.1f} ms")
+    effects = report["side_effects"]
+    print(
+        "Import side effects: "
+        f"{effects['open_connections']} database connections, "
+        f"database files present: {', '.join(effects['database_files']) or 'none'}, "
+        f"google.adk imported: {'yes' if effects['google_adk_imported'] else 'no'}"
+    )
+    if args.importtime:
+        print("\nSlowest imports of my_agent_app.agent (python -X importtime):")
+        print(f"  {'module':<44}{'self ms':>9}{'cumulative ms':>15}")
+        for name, self_seconds, cumulative in importtime_summary(args.importtime):
+            print(f"  {name:<44}{self_seconds * 1000:>9.1f}{cumulative * 1000:>15.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
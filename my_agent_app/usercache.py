@@ -0,0 +1,149 @@
+"""Per-user cache of decoded session and profile reads.
+
+A returning member's conversation starts with ``get_latest_user_session``
+(and often ``get_user_sessions``), each a query plus the decode of a full
+plan, even when nothing changed since the previous turn. The tools keep
+their responses here, in one size-bounded, thread-safe LRU cache
+(``AGENT_USER_CACHE_SIZE`` entries, default 1024; 0 disables it) whose
+entries expire after ``AGENT_USER_CACHE_TTL`` seconds (default 30).
+
+Responses are stored pickled and unpickled on every hit, so each caller
+gets its own objects and cannot change what later callers read. Unpickling
+a session is several times cheaper than a ``copy.deepcopy`` of it.
+
+Invalidation is write-through: every write of a user's sessions or profile
+(``save_session``, ``add_refinement_to_session``, ``save_user_profile``,
+bulk imports, the retention job) calls ``invalidate`` once the write is
+committed or queued for the write-behind writer. Each entry is keyed by the
+user's generation number at the time its read started, and ``invalidate``
+moves the user to a new generation, so:
+
+- entries cached before a write are never returned after it (they age out
+  of the LRU);
+- a read that raced a write stores its result under the old generation,
+  where no later lookup finds it.
+
+Users without a recorded generation share the default one. A user's record
+is dropped once every entry cached under an older generation has expired
+(twice the TTL after the write), and at most ``GENERATION_LIMIT`` records
+are kept; dropping a record any earlier moves the default to a new
+generation, which invalidates every user without a record.
+
+Writes made by other processes are only seen once an entry expires, so the
+TTL bounds how stale a multi-process deployment can read.
+"""
+
+import itertools
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+try:
+    from .cache import LRUCache
+except ImportError:
+    from cache import LRUCache  # type: ignore
+
+CACHE_SIZE = int(os.environ.get("AGENT_USER_CACHE_SIZE", "1024"))
+TTL = float(os.environ.get("AGENT_USER_CACHE_TTL", "30"))
+GENERATION_LIMIT = 65536
+
+_cache = LRUCache(max(CACHE_SIZE, 1), ttl=TTL if TTL > 0 else None)
+# (path, user_name) -> (generation, monotonic time of the write), oldest first.
+_generations = OrderedDict()
+_next_generation = itertools.count(1)
+_default_generation = 0
+_lock = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    """Return True when the per-user cache is in use."""
+    return CACHE_SIZE > 0
+
+
+def key(path: str, user_name: Optional[str], *parts: Hashable) -> tuple:
+    """Return the cache key of a read of ``user_name`` in database ``path``.
+
+    Take the key before running the query the result comes from: it pins
+    the user's current generation, so a write in between makes the result
+    unreachable instead of stale.
+
+    Args:
+        path: Database the read goes to.
+        user_name: User the read is about; None for reads that are not
+            about one user (the latest profile).
+        parts: What is read and with which arguments.
+    """
+    user = (path, user_name)
+    record = _generations.get(user)
+    return (user, record[0] if record is not None else _default_generation) + parts
+
+
+def get(cache_key: tuple):
+    """Return a fresh copy of the value cached under ``cache_key``, or None."""
+    if not cache_enabled():
+        return None
+    data = _cache.get(cache_key)
+    return pickle.loads(data) if data is not None else None
+
+
+def put(cache_key: tuple, value) -> None:
+    """Cache a copy of ``value``."""
+    if cache_enabled():
+        _cache.set(cache_key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def invalidate(path: str, user_name: Optional[str]) -> None:
+    """Forget every cached read of ``user_name`` in database ``path``."""
+    global _default_generation
+    user = (path, user_name)
+    now = time.monotonic()
+    # Entries under older generations are unreachable until they expire;
+    # reads in flight during the write may still store one, hence twice.
+    horizon = 2 * _cache.ttl if _cache.ttl is not None else None
+    with _lock:
+        _generations[user] = (next(_next_generation), now)
+        _generations.move_to_end(user)
+        while _generations:
+            _, written_at = next(iter(_generations.values()))
+            expired = horizon is not None and now - written_at > horizon
+            if not expired and len(_generations) <= GENERATION_LIMIT:
+                break
+            _generations.popitem(last=False)
+            if not expired:
+                _default_generation = next(_next_generation)
+
+
+def clear() -> None:
+    """Drop every cached read; counters are kept."""
+    global _default_generation
+    with _lock:
+        _generations.clear()
+        _default_generation = next(_next_generation)
+        _cache.clear()
+
+
+def user_cache_stats() -> dict:
+    """Return hit/miss/eviction counters and the hit rate of the user cache."""
+    with _lock:
+        generations = len(_generations)
+    return {
+        **_cache.stats(),
+        "enabled": cache_enabled(),
+        "ttl": _cache.ttl,
+        "generations": generations,
+    }
+
+
+def _reset_after_fork() -> None:
+    # A forked worker would otherwise keep serving the parent's entries and
+    # could inherit the cache's lock while another thread held it.
+    global _cache, _lock
+    _cache = LRUCache(max(CACHE_SIZE, 1), ttl=TTL if TTL > 0 else None)
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
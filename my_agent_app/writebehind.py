@@ -0,0 +1,432 @@
+"""Optional write-behind queue for session writes, with group commit.
+
+By default ``save_session`` and ``add_refinement_to_session`` commit their
+own transaction while the user waits, and concurrent writers queue up on
+SQLite's single write lock. With ``AGENT_WRITE_BEHIND=1`` the tools hand their
+writes to one writer thread per sessions database and return at once; the
+writer commits whatever has queued up, in order, as one transaction as soon
+as ``AGENT_WRITE_BEHIND_DELAY_MS`` (default 20) has passed since the first
+queued write or ``AGENT_WRITE_BEHIND_BATCH`` writes (default 500) are waiting.
+
+- Session IDs are handed out before the insert, from blocks reserved in
+  ``sqlite_sequence``, so other processes writing the same database never
+  get the same IDs.
+- Reads see pending writes: a read of a user or session with queued writes
+  first has the writer commit everything queued so far (``wait_for``).
+- ``close`` (also run at exit) commits the queue before the process ends. A
+  write that still fails in its own transaction is reported on stderr and
+  counted in ``stats()``; the tool that queued it has already returned, so
+  write-behind trades the durability of the last few milliseconds of writes
+  for latency, as ``synchronous=NORMAL`` does for the last transactions.
+- If the writer thread itself dies, every later queued write and flush
+  raises, so the tools report errors instead of returning IDs that are
+  never written.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+try:
+    from .blobs import session_payload_values
+    from .db import get_connection
+    from .serialization import WRITE_FORMAT, dumps
+except ImportError:
+    from blobs import session_payload_values  # type: ignore
+    from db import get_connection  # type: ignore
+    from serialization import WRITE_FORMAT, dumps  # type: ignore
+
+ENABLED = os.environ.get("AGENT_WRITE_BEHIND", "").strip().lower() in ("1", "true", "yes", "on")
+MAX_DELAY = float(os.environ.get("AGENT_WRITE_BEHIND_DELAY_MS", "20")) / 1000
+MAX_BATCH = int(os.environ.get("AGENT_WRITE_BEHIND_BATCH", "500"))
+ID_BLOCK_SIZE = 256
+MAX_ID_BLOCK_SIZE = 4096
+# How often a waiting flush checks that the writer thread is still running.
+_ALIVE_CHECK_INTERVAL = 0.5
+
+_STOP = object()
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+class _Flush:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def _raise_session_sequence(conn: sqlite3.Connection, count: int) -> range:
+    """Move the ``sessions`` AUTOINCREMENT counter past ``count`` new IDs.
+
+    Must run inside a write transaction.
+    """
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sessions'").fetchone()
+    highest = conn.execute("SELECT COALESCE(MAX(session_id), 0) FROM sessions").fetchone()[0]
+    first = max(seq[0] if seq else 0, highest) + 1
+    if seq is None:
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('sessions', ?)", (first + count - 1,)
+        )
+    else:
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = ? WHERE name = 'sessions'", (first + count - 1,)
+        )
+    return range(first, first + count)
+
+
+def reserve_session_ids(conn: sqlite3.Connection, count: int) -> range:
+    """Reserve ``count`` session IDs that no other insert will be given."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ids = _raise_session_sequence(conn, count)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return ids
+
+
+class SessionWriter:
+    """Single writer thread that group-commits queued session writes.
+
+    Args:
+        path: Sessions database (already migrated).
+        max_delay: Seconds a write may wait for others to join its batch.
+        max_batch: Writes committed per transaction at most.
+    """
+
+    def __init__(self, path: str, max_delay: float = MAX_DELAY, max_batch: int = MAX_BATCH):
+        self.path = path
+        self.max_delay = max_delay
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._ids = iter(())
+        # Next block of IDs, reserved by the writer inside a batch transaction
+        # so that callers rarely have to reserve one themselves.
+        self._spare_ids = None
+        # Doubles whenever a caller has to reserve IDs itself.
+        self._id_block_size = ID_BLOCK_SIZE
+        self._ids_lock = threading.Lock()
+        # Held while the writer commits, so an ID reservation waits on it
+        # instead of sleeping in SQLite's busy handler.
+        self._commit_lock = threading.Lock()
+        self._pending_users = Counter()
+        self._pending_sessions = Counter()
+        # session_id -> [user_name, refinement_count] for sessions with queued writes
+        self._known = {}
+        self._closed = False
+        # Set if the writer thread dies; every later write and flush raises.
+        self._error = None
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+        self.commit_seconds = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name="agent-session-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _next_session_id(self) -> int:
+        with self._ids_lock:
+            session_id = next(self._ids, None)
+            if session_id is None:
+                if self._spare_ids is not None:
+                    self._ids, self._spare_ids = iter(self._spare_ids), None
+                else:
+                    with self._commit_lock:
+                        ids = reserve_session_ids(get_connection(self.path), self._id_block_size)
+                    self._ids = iter(ids)
+                    self._id_block_size = min(2 * self._id_block_size, MAX_ID_BLOCK_SIZE)
+                session_id = next(self._ids)
+            return session_id
+
+    def _enqueue(self, op: tuple, user_name: str, session_id: int) -> None:
+        # Called with self._lock held.
+        if self._closed:
+            raise RuntimeError("session writer is closed")
+        self._check_alive()
+        self._pending_users[user_name] += 1
+        self._pending_sessions[session_id] += 1
+        self._queue.put(op)
+
+    def save_session(self, user_id: int, user_name: str, profile_data: dict, workout_plan: dict) -> int:
+        """Queue a new session and return its ID."""
+        session_id = self._next_session_id()
+        with self._lock:
+            self._known[session_id] = [user_name, 0]
+            self._enqueue(
+                ("session", session_id, user_name, user_id, profile_data, workout_plan),
+                user_name,
+                session_id,
+            )
+        return session_id
+
+    def add_refinement(self, session_id: int, refinement_type: str, details: dict) -> Optional[tuple]:
+        """Queue a refinement; return the session's user and new refinement count.
+
+        Returns:
+            ``(user_name, refinement_count)`` with the count including this
+            refinement, or None when the session exists neither in the queue
+            nor in the database.
+        """
+        # One critical section: the writer drops a session from _known when
+        # its last queued write commits, so the entry looked up (or loaded
+        # from the database) must be the one this refinement is counted on.
+        with self._lock:
+            known = self._known.get(session_id)
+            if known is None:
+                row = get_connection(self.path).execute(
+                    "SELECT user_name, refinement_count FROM sessions WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                if row is None:
+                    return None
+                known = self._known[session_id] = list(row)
+            self._enqueue(
+                (
+                    "refinement", session_id, known[0], datetime.now().isoformat(),
+                    refinement_type, details,
+                ),
+                known[0],
+                session_id,
+            )
+            known[1] += 1
+            return known[0], known[1]
+
+    def pending(self, user_name: Optional[str] = None, session_id: Optional[int] = None) -> bool:
+        """Return True if writes for the user or session are still queued."""
+        with self._lock:
+            return bool(
+                (user_name is not None and self._pending_users[user_name])
+                or (session_id is not None and self._pending_sessions[session_id])
+            )
+
+    def wait_for(self, user_name: Optional[str] = None, session_id: Optional[int] = None) -> None:
+        """Commit now if writes for the user or session are queued, and wait."""
+        if self.pending(user_name, session_id):
+            self.flush()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Commit everything queued so far; return False on timeout.
+
+        Raises:
+            RuntimeError: The writer thread died, so queued writes were lost.
+        """
+        self._check_alive()
+        if self._closed and not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait = _ALIVE_CHECK_INTERVAL
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            done = marker.done.wait(wait)
+            self._check_alive()
+            if done:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def _check_alive(self) -> None:
+        if self._error is not None or not (self._closed or self._thread.is_alive()):
+            raise RuntimeError(
+                f"session writer thread has stopped ({self._error!r}); queued writes were lost"
+            )
+
+    def close(self) -> None:
+        """Commit the queue and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        """Return batch and write counters for the writer."""
+        with self._lock:
+            queued = sum(self._pending_sessions.values())
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed": self.failed,
+            "queued": queued,
+            "mean_batch": round(self.writes / self.batches, 2) if self.batches else None,
+            "mean_commit_ms": (
+                round(self.commit_seconds / self.batches * 1000, 3) if self.batches else None
+            ),
+        }
+
+    def _run(self) -> None:
+        try:
+            self._write_batches()
+        except BaseException as e:
+            self._error = e
+            raise
+
+    def _write_batches(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch, markers = [], []
+            deadline = time.monotonic() + self.max_delay
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, _Flush):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or markers or len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._commit(batch)
+            finally:
+                # Waiting flushes find out from _check_alive if this raised.
+                for marker in markers:
+                    marker.done.set()
+
+    def _commit(self, batch: list) -> None:
+        with self._commit_lock:
+            self._commit_batch(batch)
+        with self._lock:
+            for op in batch:
+                session_id, user_name = op[1], op[2]
+                self._pending_users[user_name] -= 1
+                if not self._pending_users[user_name]:
+                    del self._pending_users[user_name]
+                self._pending_sessions[session_id] -= 1
+                if not self._pending_sessions[session_id]:
+                    del self._pending_sessions[session_id]
+                    self._known.pop(session_id, None)
+
+    def _commit_batch(self, batch: list) -> None:
+        conn = get_connection(self.path)
+        started = time.perf_counter()
+        try:
+            with conn:
+                for op in batch:
+                    self._apply(conn, op)
+                # Only this thread sets the spare block, and only while it is
+                # empty; callers (under _ids_lock) only take it. Taking
+                # _ids_lock here, under _commit_lock, could deadlock with a
+                # caller reserving IDs.
+                spare = None
+                if self._spare_ids is None:
+                    sessions = sum(1 for op in batch if op[0] == "session")
+                    spare = _raise_session_sequence(conn, max(self._id_block_size, 4 * sessions))
+            if spare is not None:
+                self._spare_ids = spare
+        except Exception:
+            # One bad write must not take the rest of the batch with it.
+            for op in batch:
+                try:
+                    with conn:
+                        self._apply(conn, op)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"session writer: {op[0]} for session {op[1]} failed: {e}", file=sys.stderr)
+        self.commit_seconds += time.perf_counter() - started
+        self.batches += 1
+        self.writes += len(batch)
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, op: tuple) -> None:
+        if op[0] == "session":
+            _, session_id, user_name, user_id, profile_data, workout_plan = op
+            conn.execute(
+                """
+                INSERT INTO sessions (session_id, user_id, user_name, profile_data, workout_plan,
+                                      profile_hash, plan_hash, payload_format)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (session_id, user_id, user_name)
+                + session_payload_values(conn, profile_data, workout_plan, WRITE_FORMAT)
+                + (WRITE_FORMAT,),
+            )
+            return
+        _, session_id, _, created_at, refinement_type, details = op
+        updated = conn.execute(
+            """
+            UPDATE sessions
+            SET refinement_count = refinement_count + 1,
+                last_updated = CURRENT_TIMESTAMP
+            WHERE session_id = ?
+            """,
+            (session_id,),
+        ).rowcount
+        if updated == 0:
+            raise LookupError("session no longer exists")
+        conn.execute(
+            """
+            INSERT INTO session_refinements
+                (session_id, created_at, refinement_type, details, details_format)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (session_id, created_at, refinement_type, dumps(details, WRITE_FORMAT), WRITE_FORMAT),
+        )
+
+
+def write_behind_enabled() -> bool:
+    """Return True when session writes go through the write-behind queue."""
+    return ENABLED
+
+
+def session_writer(path: str) -> SessionWriter:
+    """Return the writer for the sessions database at ``path``, starting it on first use."""
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = _writers[path] = SessionWriter(path)
+    return writer
+
+
+def await_pending_writes(
+    path: str, user_name: Optional[str] = None, session_id: Optional[int] = None
+) -> None:
+    """Make queued writes for a user or session visible before reading them."""
+    writer = _writers.get(path)
+    if writer is not None:
+        writer.wait_for(user_name, session_id)
+
+
+def close_writers() -> None:
+    """Commit every queue and stop the writer threads (run at exit)."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+def _forget_inherited_writers() -> None:
+    """A forked child has copies of the parent's queues but not its threads."""
+    global _writers_lock
+    _writers_lock = threading.Lock()
+    _writers.clear()
+
+
+atexit.register(close_writers)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_writers)
@@ -0,0 +1,38 @@
+"""Cohort plans must equal the per-profile plans in every response mode."""
+
+import pytest
+
+from my_agent_app import agent, responses
+from my_agent_app.cohort import generate_cohort_plans
+
+GOALS = ["Strength Building", "Cardio", "Weight Loss", "Strength Building"]
+AGES = [30, 70, 16, 45]
+WEIGHTS = [170, 160, 140, 260]
+NAMES = ["Ana", "Ben", "Cy", "Dee"]
+INJURIES = ["None", "bad knees", "sore shoulders", ""]
+EQUIPMENT = ["", "dumbbells and bands", "", "body weight"]
+
+
+@pytest.mark.parametrize("mode", ["full", "compact"])
+def test_cohort_plans_match_per_profile_plans(monkeypatch, mode):
+    monkeypatch.setattr(responses, "RESPONSE_MODE", mode)
+    plans = generate_cohort_plans(
+        GOALS, AGES, WEIGHTS, names=NAMES, injuries=INJURIES, equipment=EQUIPMENT
+    )
+
+    assert len(plans) == len(GOALS)
+    for i, plan in enumerate(plans):
+        expected = agent.generate_weekly_workout_plan_from_profile(plans.profile(i))
+        assert plan == expected
+
+
+def test_compact_cohort_plan_is_shortened(monkeypatch):
+    full = generate_cohort_plans(["Strength Building"], [30], [170])[0]
+    monkeypatch.setattr(responses, "RESPONSE_MODE", "compact")
+    compact = generate_cohort_plans(["Strength Building"], [30], [170])[0]
+
+    full_exercise = full["weekly_schedule"]["Monday"]["exercises"][0]
+    compact_exercise = compact["weekly_schedule"]["Monday"]["exercises"][0]
+    assert "exercise_id" not in full_exercise
+    assert "exercise_id" in compact_exercise
+    assert len(compact_exercise["description"]) < len(full_exercise["description"])
@@ -0,0 +1,36 @@
+"""Injury text must select its exclusions however the member phrases it."""
+
+import pytest
+
+from my_agent_app import agent
+from my_agent_app.constraints import injury_tags
+
+
+@pytest.mark.parametrize(
+    "injury, tags",
+    [
+        ("bad knee", ("knee",)),
+        ("bad knees", ("knee",)),
+        ("Sore Shoulders", ("shoulder",)),
+        ("wrists", ("wrist",)),
+        ("sprained ankles", ("ankle",)),
+        ("both elbows", ("elbow",)),
+        ("herniated discs", ("back",)),
+        ("torn Achilles", ("ankle",)),
+        ("lateral epicondylitis", ("elbow",)),
+        ("knee's swollen, hips ache", ("hip", "knee")),
+        ("None", ()),
+        ("", ()),
+    ],
+)
+def test_injury_tags(injury, tags):
+    assert injury_tags(injury) == tags
+
+
+def test_plural_injury_excludes_exercises():
+    profile = {"name": "Sam", "exercise_goal": "Strength Building", "age": 30}
+    singular = agent.generate_weekly_workout_plan_from_profile({**profile, "injury": "bad knee"})
+    plural = agent.generate_weekly_workout_plan_from_profile({**profile, "injury": "bad knees"})
+
+    assert plural["constraints"]["injury_exclusions"] == ["knee"]
+    assert plural["weekly_schedule"] == singular["weekly_schedule"]
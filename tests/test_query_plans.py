@@ -0,0 +1,26 @@
+"""The SQL the tools execute must stay index-backed."""
+
+import sqlite3
+
+from my_agent_app.queryplans import capture_tool_queries, check_tool_query_plans
+from my_agent_app.schema import check_query_plans
+
+
+def test_tool_queries_are_index_backed(tmp_path):
+    queries = capture_tool_queries(str(tmp_path))
+    tools = {name for captured in queries.values() for name, _, _ in captured}
+    assert {"get_user_sessions", "get_latest_user_session", "get_archived_sessions"} <= tools
+
+    problems = check_tool_query_plans(
+        str(tmp_path / "user_profiles.db"), str(tmp_path / "sessions.db"), queries
+    )
+    assert problems == []
+
+
+def test_full_scan_is_reported(tmp_path):
+    path = str(tmp_path / "scan.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE sessions (session_id INTEGER PRIMARY KEY, user_name TEXT)")
+    queries = [("unindexed", "SELECT session_id FROM sessions WHERE user_name = ?", ("x",))]
+
+    assert check_query_plans(path, queries) == [("unindexed", "SCAN sessions")]
@@ -0,0 +1,35 @@
+"""The search index is read-only and rebuilding it leaves the connection pool alone."""
+
+import os
+import shutil
+
+from my_agent_app import agent, search
+from my_agent_app.db import get_connection
+
+
+def _dataset(tmp_path):
+    path = str(tmp_path / "megaGymDataset.csv")
+    shutil.copy(agent.DATASET_PATH, path)
+    return path
+
+
+def test_index_is_opened_read_only(tmp_path):
+    path = _dataset(tmp_path)
+
+    assert search.search(path, "band exercises for lower back")
+    index_path = search.search_index_path_for(path)
+    assert not os.path.exists(index_path + "-wal")
+    assert not os.path.exists(index_path + "-shm")
+
+
+def test_rebuild_keeps_pooled_connections_open(tmp_path):
+    path = _dataset(tmp_path)
+    pooled = get_connection(str(tmp_path / "sessions.db"))
+    search.search(path, "push up")
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    os.utime(path, (1, 1))
+
+    assert search.search(path, "push up")
+    assert pooled.execute("SELECT 1").fetchone() == (1,)